@@ -1,74 +1,467 @@
+import time
 import numpy as np
-import random
 import gurobipy as gp
-from gurobipy import GRB, quicksum
+from gurobipy import GRB
 
 from utils import *
+from subsets import *
+from solver_config import SolverConfig, SolveResult, optimize
+from presolve import presolve_projects
+from telemetry import timer
+from backends import fromlist
 
 
+# -------- Selection constraints -------- #
+
+def add_selection_constraints(m, n, p, costs, utilities, budget=None):
+    """
+    Adds the variables and constraints of the project selection problem to the model m, and returns
+    the selection variables z, the budget constraint and the score variables s of the objectives.
+
+    :type m: gurobipy.Model
+    :type n: int
+    :type p: int
+    :type costs: ndarray[int]
+    :type utilities: ndarray[int]
+    :type budget: float
+
+    :rtype: gurobipy.MVar, gurobipy.MConstr, gurobipy.MVar
+    """
+
+    with timer(m, "variables"):
+        # z: binary variables z to indicate whether a project is selected or not
+        z = m.addMVar(shape=p, vtype=GRB.BINARY, name="x")
+
+        # s: score of the selected projects on each objective, built once and shared by all the subsets
+        s = m.addMVar(shape=n, vtype=GRB.CONTINUOUS, name="s")
+
+    with timer(m, "constraints"):
+        # The sum of the costs of the selected projects must be within the budget
+        if budget is None:
+            budget = sum(costs) / 2
+        budget_constraint = m.addConstr(costs @ z <= budget, name="budget")
+
+        m.addConstr(utilities @ z - s == 0, name="score")
+
+    return z, budget_constraint, s
+
 # -------- Choquet LP -------- #
 
-def choquet_lp(n, p, costs, utilities, mobius_masses, combinations=None):
+def choquet_lp(n, p, costs, utilities, mobius_masses, combinations=None, config=None, budget=None, presolve=True,
+               linking="pairs"):
 
     """
     :param n: number of objectives
     :param p: number of projects
     :param costs: costs for each project: [c1, ..., ck] with k in {1, ..., p}
     :param utilities: U
-    :param mobius_masses: Mobius masses
-    :param combinations: list of combinations of objectives
+    :param mobius_masses: Mobius masses, either as a dense vector (in the order of combinations) or as a sparse dict {subset: mass}
+    :param combinations: bitmasks of the combinations of objectives, in the order of a dense vector of Mobius masses
+    :param config: printing, export and Gurobi settings (default: SolverConfig())
+    :param budget: maximal total cost of the selected projects (default: half of the total cost)
+    :param presolve: remove the projects that an optimal selection can do without before building the model
+        (see presolve.presolve_projects)
+    :param linking: constraints bounding the variables y_A by the scores, "pairs" or "chain" (see MobiusSolver)
 
     :type n: int
     :type p: int
     :type costs: ndarray[int]
     :type utilities: ndarray[int]
-    :type mobius_masses: ndarray[float]
-    :type combinations: list[tuple[int]]
+    :type mobius_masses: ndarray[float] | dict
+    :type combinations: ndarray[int]
+    :type config: SolverConfig
+    :type budget: float
+    :type presolve: bool
+    :type linking: str
 
-    :return solution: x
-    :rtype: ndarray[int]
+    :return result: selected projects (solution), objective, runtime...
+    :rtype: SolveResult
     """
 
-    if combinations == None:  
-        # Avoir toutes les combinaisons de projets possibles
-        objectives_list = [i for i in range(n)]
-        combinations = powerset(objectives_list)
+    config = SolverConfig() if config is None else config
+    if budget is None:
+        budget = sum(costs) / 2
+
+    if presolve:
+        utilities, costs, reduction = presolve_projects(utilities, costs, budget)
+        p = len(costs)
+        if config.verbose:
+            print(reduction)
+        config = reduction.restore_incumbents(config)
 
     try:
-        # Create a new model
-        m = gp.Model("Choquet")
+        solver = ChoquetSolver(n, p, costs, utilities, budget, config, linking)
+        solver.set_mobius_masses(mobius_masses, combinations)
+        result = solver.solve()
 
-        # y: variables that indicate value obtained for each combinations of objectives
-        y = m.addMVar(shape=2**n, vtype=GRB.CONTINUOUS, name="y")
+    except gp.GurobiError as e:
+        print('Error code ' + str(e.errno) + ": " + str(e))
+        result = SolveResult(None, None, None, None)
 
-        # Set objective
-        m.setObjective(mobius_masses @ y, GRB.MAXIMIZE)
+    if presolve:
+        result = reduction.restore_result(result, ["z"], solution=True)
 
-        # z: binary variables z to indicate whether a project is selected or not
-        z = m.addMVar(shape=p, vtype=GRB.BINARY, name="x")
+    return result
 
-        # The sum of the costs of the selected projects must be within the budget
-        b = sum(costs) / 2  # budget
-        m.addConstr(costs @ z <= b, name="budget")
+def choquet_budget_curve(n, p, costs, utilities, mobius_masses, budgets, combinations=None, config=None,
+                         linking="pairs"):
+    """
+    Trade-off between the budget and the Choquet value of the best selection of projects,
+    solved with a single model (see ChoquetSolver.budget_sweep).
+
+    :param budgets: budgets for which to solve the problem
+    (other parameters as in choquet_lp)
+
+    :return results: result (see choquet_lp) for each budget, in the order of budgets
+    :rtype: list[SolveResult]
+    """
 
-        # The value y_A of a subset of objectives A is the sum of the utilities of the selected projects for those objectives
-        for subset_index, subset_obj in enumerate(combinations):
-            for i in subset_obj:
-                m.addConstr(quicksum(utilities[i][j] * z[j] for j in range(p)) >= y[subset_index], name="y_"+str(subset_index)+"_"+str(i))
+    try:
+        solver = ChoquetSolver(n, p, costs, utilities, config=config, linking=linking)
+        solver.set_mobius_masses(mobius_masses, combinations)
+        results = solver.budget_sweep(budgets)
 
-        m.write("choquet.lp")
+    except gp.GurobiError as e:
+        print('Error code ' + str(e.errno) + ": " + str(e))
+        results = [SolveResult(None, None, None, None) for budget in budgets]
 
-        # Optimize model
-        m.optimize()
+    return results
 
-        print("Z: ", z.X)
-        print("Y: ", y.X)
-        print('Obj: %g' % m.objVal)
+
+def choquet_core_lp(n, p, costs, utilities, mobius_masses, combinations=None, config=None, budget=None,
+                    presolve=True):
+    """
+    Same problem as choquet_lp for belief functions (non-negative Mobius masses), solved without the variables y_A
+    of the subsets by adding cuts on the core of the capacity lazily (see ChoquetCoreSolver).
+    Parameters and result as in choquet_lp.
+    """
+
+    combinations, mobius_masses = sparse_mobius_masses(mobius_masses, n, combinations)
+    config = SolverConfig() if config is None else config
+
+    if np.any(mobius_masses < 0):
+        print("Error: the core formulation requires non-negative Mobius masses, using choquet_lp instead.")
+        return choquet_lp(n, p, costs, utilities, mobius_masses, combinations, config, budget, presolve)
+    if config.backend != "gurobi":
+        print("Error: the core formulation requires the lazy constraints of Gurobi, using choquet_lp instead.")
+        return choquet_lp(n, p, costs, utilities, mobius_masses, combinations, config, budget, presolve)
+
+    if budget is None:
+        budget = sum(costs) / 2
+
+    if presolve:
+        utilities, costs, reduction = presolve_projects(utilities, costs, budget)
+        p = len(costs)
+        if config.verbose:
+            print(reduction)
+        config = reduction.restore_incumbents(config)
+
+    try:
+        solver = ChoquetCoreSolver(n, p, costs, utilities, budget, config)
+        solver.set_mobius_masses(mobius_masses, combinations)
+        result = solver.solve()
 
     except gp.GurobiError as e:
         print('Error code ' + str(e.errno) + ": " + str(e))
+        result = SolveResult(None, None, None, None)
+
+    if presolve:
+        result = reduction.restore_result(result, ["z"], solution=True)
+
+    return result
+
+def core_vertex(scores, masks, masses):
+    """
+    Vertex w of the core of the (supermodular) capacity of non-negative Mobius masses that minimises w @ scores,
+    so that w @ scores is the Choquet integral of the scores: with the scores in increasing order,
+    w_(i) = v({(i), ..., (n)}) - v({(i+1), ..., (n)}).
+    Sorting the scores is O(n log n), and the n capacities needed cost O(n * len(masks)).
+
+    :param scores: score on each objective
+    :param masks: bitmasks of the subsets with a non-zero mass
+    :param masses: their Mobius masses
+
+    :rtype: ndarray[float]
+    """
+
+    scores = np.asarray(scores, dtype=float)
+    order = np.argsort(scores, kind="stable")
+
+    # Bitmask of the objectives at least as satisfied as the i-th least satisfied one (and the empty set)
+    upper_sets = np.append(np.cumsum((1 << order)[::-1])[::-1], 0)
+
+    # v(A) is the sum of the masses of the subsets of A
+    capacities = ((masks[None, :] & ~upper_sets[:, None]) == 0) @ masses
+
+    w = np.empty(len(scores))
+    w[order] = capacities[:-1] - capacities[1:]
+
+    return w
+
+
+# -------- Persistent solvers -------- #
+
+class MobiusSolver:
+    """
+    Persistent model maximising sum_A m(A) y_A, with y_A <= s_i for every i in A, over the scores s
+    of a set of decision variables. The constraints are built once; the variables y_A are created the first time
+    subset A has a non-zero Mobius mass, and only the objective coefficients change between two solves.
+
+    linking chooses how y_A is bounded by the scores of A:
+    "pairs" adds y_A <= s_i for every i in A (|A| rows per subset, n * 2^(n-1) rows for all the subsets),
+    "chain" adds y_A <= s_j and y_A <= y_(A minus j) for the largest element j of A (at most two rows per subset),
+    creating the variables of the subsets A minus j with a zero mass if needed (see subsets.chain_linking_matrices).
+    Both give y_A <= min_{i in A} s_i and the same optima when the Mobius masses are non-negative; with negative
+    masses both are relaxations of the Choquet integral, the chain being the tighter one.
+
+    Subclasses create the constraints of their problem in their constructor, and set the attributes
+    s (scores of the n criteria), decisions (variables to warm-start from), solution (variables returned by solve)
+    and variables (main variables of the model by name, kept in the results along with y).
+    """
+
+    def __init__(self, name, n, config=None, linking="pairs"):
+        if linking not in ("pairs", "chain"):
+            raise ValueError("unknown linking " + str(linking))
+
+        self.config = SolverConfig() if config is None else config
+        self.m = self.config.new_model(name)
+        self.m.ModelSense = GRB.MAXIMIZE
+        self.n = n
+        self.linking = linking
+        self.subsets = dict()  # bitmask -> variable y_A
+        self.mobius_masses = dict()  # bitmask -> mass of the current objective
+        self.build_time = 0
+
+    @property
+    def y(self):
+        """
+        Variables y_A of all the subsets in the model, in the order in which they were created.
+        """
+
+        return fromlist(list(self.subsets.values()))
+
+    def add_subsets(self, combinations):
+        """
+        Adds the variables y_A (and their linking constraints) of the given subsets that are not yet in the model.
+        """
+
+        build_start = time.perf_counter()
+
+        if self.linking == "chain":
+            combinations = chain_closure(combinations, self.n)
+        new_combinations = np.array([mask for mask in dict.fromkeys(np.asarray(combinations).tolist())
+                                     if mask not in self.subsets], dtype=np.int64)
+        if len(new_combinations) > 0:
+            # y: variables that indicate value obtained for each combination
+            with timer(self.m, "variables"):
+                y = self.m.addMVar(shape=len(new_combinations), vtype=GRB.CONTINUOUS,
+                                   name=["y_" + str(mask) for mask in new_combinations])
+
+            self.subsets.update(zip(new_combinations.tolist(), y.tolist()))
+
+            # The value y_A of a subset A is at most the score of each of its elements
+            with timer(self.m, "constraints"):
+                if self.linking == "chain":
+                    Y, S = chain_linking_matrices(new_combinations, self.n, list(self.subsets.keys()))
+                    self.m.addConstr(Y @ self.y - S @ self.s <= 0, name="y")
+                else:
+                    Y, S = linking_matrices(new_combinations, self.n)
+                    self.m.addConstr(Y @ y - S @ self.s <= 0, name="y")
+
+        self.build_time += time.perf_counter() - build_start
+
+    def set_mobius_masses(self, mobius_masses, combinations=None):
+        """
+        Replaces the objective by the Choquet integral for the given Mobius masses (dense or sparse, as in choquet_lp).
+        """
+
+        combinations, mobius_masses = sparse_mobius_masses(mobius_masses, self.n, combinations)
+        self.add_subsets(combinations)
+
+        build_start = time.perf_counter()
+
+        with timer(self.m, "objective"):
+            all_y = list(self.subsets.values())
+            self.m.setAttr("Obj", all_y, [0] * len(all_y))
+            self.m.setAttr("Obj", [self.subsets[mask] for mask in combinations.tolist()], mobius_masses.tolist())
+        self.mobius_masses = dict(zip(combinations.tolist(), mobius_masses.tolist()))
+
+        self.build_time += time.perf_counter() - build_start
+
+    def set_score_start(self, scores):
+        """
+        Gives the scores s of a start solution, and the values y_A = min_{i in A} s_i that they determine.
+        """
+
+        scores = np.asarray(scores, dtype=float)
+        self.s.Start = scores
+
+        if len(self.subsets) > 0:
+            masks = np.array(list(self.subsets.keys()), dtype=np.int64)
+            self.y.Start = np.where(membership_matrix(masks, self.n), scores[None, :], np.inf).min(axis=1)
+
+    def solve(self):
+        """
+        Optimizes the model, starting from the previous optimal solution if there is one.
+
+        :rtype: SolveResult
+        """
+
+        if self.m.SolCount > 0:
+            self.decisions.Start = self.decisions.X
+
+        variables = dict(self.variables)
+        if len(self.subsets) > 0:
+            variables["y"] = self.y
+
+        return optimize(self.m, self.config, self.solution, variables, self.build_time)
+
+    def sweep(self, all_mobius_masses):
+        """
+        Solves the model for each vector of Mobius masses, reusing the model (and the previous solution) each time.
+
+        :return results: list of results (see solve) for each vector of Mobius masses
+        """
+
+        results = []
+        for mobius_masses in all_mobius_masses:
+            self.set_mobius_masses(mobius_masses)
+            results.append(self.solve())
+
+        return results
+
+
+class ChoquetSolver(MobiusSolver):
+    """
+    Persistent Choquet project selection model (see choquet_lp), for solving with several Mobius masses
+    or several budgets.
+    """
+
+    def __init__(self, n, p, costs, utilities, budget=None, config=None, linking="pairs"):
+        super().__init__("Choquet", n, config, linking)
+
+        build_start = time.perf_counter()
+
+        self.z, self.budget, self.s = add_selection_constraints(self.m, n, p, costs, utilities, budget)
+
+        self.decisions = self.solution = self.z
+        self.variables = {"z": self.z}
+
+        self.build_time += time.perf_counter() - build_start
+
+    def set_budget(self, budget):
+        """
+        Replaces the budget (right-hand side of the budget constraint), keeping the rest of the model.
+        """
+
+        self.budget.RHS = budget
+
+    def budget_sweep(self, budgets):
+        """
+        Solves the model for each budget, reusing the model each time. The budgets are solved in increasing order,
+        so that the previous selection is always a feasible start for the next one.
+
+        :return results: list of results (see solve) for each budget, in the order of budgets
+        """
+
+        results = [None] * len(budgets)
+        for i in np.argsort(budgets, kind="stable"):
+            self.set_budget(budgets[i])
+            results[i] = self.solve()
+
+        return results
+
+
+class ChoquetCoreSolver(ChoquetSolver):
+    """
+    Choquet project selection model for belief functions (non-negative Mobius masses), without the variables y_A.
+    The capacity is then supermodular, and its Choquet integral is the minimum of w @ s over the vertices w of its
+    core: the objective is a variable t, and the cuts t <= w @ s are added lazily by a callback, separating a
+    solution s by sorting it (see core_vertex). The size of the model does not depend on the number of subsets.
+    """
+
+    def __init__(self, n, p, costs, utilities, budget=None, config=None):
+        if config is not None and config.backend != "gurobi":
+            raise ValueError("the core formulation requires the gurobi backend (lazy constraints)")
+
+        super().__init__(n, p, costs, utilities, budget, config)
+
+        build_start = time.perf_counter()
+
+        self.m.ModelName = "Choquet_core"
+        self.m.Params.LazyConstraints = 1
+
+        # t: Choquet integral of the scores
+        with timer(self.m, "variables"):
+            self.t = self.m.addVar(lb=-GRB.INFINITY, obj=1, vtype=GRB.CONTINUOUS, name="t")
+
+        self.totals = np.sum(utilities, axis=1)
+        self.initial_cut = None
+        self.nb_cuts = 0
+
+        self.build_time += time.perf_counter() - build_start
+
+    def cut(self, w):
+        """
+        Constraint t <= w @ s for a vertex w of the core.
+        """
+
+        return self.t <= gp.LinExpr(w.tolist(), self.s.tolist())
+
+    def set_mobius_masses(self, mobius_masses, combinations=None):
+        """
+        Replaces the objective by the Choquet integral for the given non-negative Mobius masses.
+        """
+
+        build_start = time.perf_counter()
+
+        self.masks, self.masses = sparse_mobius_masses(mobius_masses, self.n, combinations)
+        if np.any(self.masses < 0):
+            raise ValueError("the core formulation requires non-negative Mobius masses")
+        self.mobius_masses = dict(zip(self.masks.tolist(), self.masses.tolist()))
+
+        # The cut of the order of the total utilities of the objectives bounds t from the start
+        with timer(self.m, "constraints"):
+            if self.initial_cut is not None:
+                self.m.remove(self.initial_cut)
+            self.initial_cut = self.m.addConstr(self.cut(core_vertex(self.totals, self.masks, self.masses)),
+                                                name="core")
+
+        self.build_time += time.perf_counter() - build_start
+
+    def callback(self, model, where):
+        """
+        Adds the cut of the core vertex of the current (integer or node relaxation) scores if it is violated.
+
+        :return rejected: whether a cut was added
+        """
+
+        if where == GRB.Callback.MIPSOL:
+            scores = np.array(model.cbGetSolution(self.s.tolist()))
+            t = model.cbGetSolution(self.t)
+        elif where == GRB.Callback.MIPNODE and model.cbGet(GRB.Callback.MIPNODE_STATUS) == GRB.OPTIMAL:
+            scores = np.array(model.cbGetNodeRel(self.s.tolist()))
+            t = model.cbGetNodeRel(self.t)
+        else:
+            return False
+
+        w = core_vertex(scores, self.masks, self.masses)
+        if t > w @ scores + 1e-6 * max(1, abs(t)):
+            model.cbLazy(self.cut(w))
+            self.nb_cuts += 1
+            return True
+
+        return False
+
+    def solve(self):
+        """
+        Optimizes the model, starting from the previous optimal solution if there is one.
+
+        :rtype: SolveResult
+        """
 
-    except AttributeError:
-        print('Encountered an attribute error')
+        if self.m.SolCount > 0:
+            self.decisions.Start = self.decisions.X
 
-    return z.X, m.Runtime
+        return optimize(self.m, self.config, self.solution, {"z": self.z, "s": self.s}, self.build_time,
+                        self.callback)
@@ -1,86 +1,305 @@
+import time
+import heapq
 import numpy as np
-import random
+import scipy.sparse as sp
+from scipy.sparse.csgraph import dijkstra
 import gurobipy as gp
-from gurobipy import GRB, quicksum
+from gurobipy import GRB
 
-from utils import *
+from solver_config import SolveResult
+from evaluation import choquet_values
+from Choquet import MobiusSolver
+from telemetry import timer
 
-##############################
-###### Does not work yet #####
-##############################
+# -------- Graph -------- #
+
+class Graph:
+    """
+    Directed graph given by its list of arcs, with a traveling time for each arc in each scenario.
+
+    :param nb_nodes: number of nodes
+    :param tails: node from which each arc leaves
+    :param heads: node to which each arc goes
+    :param times: traveling time of each arc in each scenario, of shape (n, nb_arcs)
+
+    :type nb_nodes: int
+    :type tails: ndarray[int]
+    :type heads: ndarray[int]
+    :type times: ndarray[float]
+    """
+
+    def __init__(self, nb_nodes, tails, heads, times):
+        self.nb_nodes = nb_nodes
+        self.tails = np.asarray(tails, dtype=np.int64)
+        self.heads = np.asarray(heads, dtype=np.int64)
+        self.times = np.atleast_2d(np.asarray(times, dtype=float))
+
+        # Arcs sorted by tail, and index of the first arc leaving each node in that order (as in a CSR matrix)
+        self.out_arcs = np.argsort(self.tails, kind="stable")
+        self.out_start = np.concatenate([[0], np.cumsum(np.bincount(self.tails, minlength=nb_nodes))])
+
+    @property
+    def nb_arcs(self):
+        return len(self.tails)
+
+    @property
+    def nb_scenarios(self):
+        return len(self.times)
+
+    @classmethod
+    def from_dense(cls, traveling_time, missing=999):
+        """
+        Graph of dense matrices of traveling times (one nb_nodes x nb_nodes matrix per scenario),
+        where missing arcs have the time missing in every scenario. The diagonal is ignored.
+        """
+
+        traveling_time = np.asarray(traveling_time)
+        nb_nodes = traveling_time.shape[-1]
+
+        arcs = np.any(traveling_time != missing, axis=0) & ~np.eye(nb_nodes, dtype=bool)
+        tails, heads = np.nonzero(arcs)
+
+        return cls(nb_nodes, tails, heads, traveling_time[:, tails, heads])
+
+    @classmethod
+    def from_csr(cls, matrices):
+        """
+        Graph of sparse matrices of traveling times (one per scenario), whose stored entries are the arcs.
+        All the matrices must store the same entries.
+        """
+
+        matrices = [sp.csr_matrix(matrix) for matrix in matrices]
+        for matrix in matrices:
+            matrix.sort_indices()
+        tails = np.repeat(np.arange(matrices[0].shape[0]), np.diff(matrices[0].indptr))
+
+        return cls(matrices[0].shape[0], tails, matrices[0].indices, [matrix.data for matrix in matrices])
+
+    def incidence_matrix(self):
+        """
+        Sparse node-arc incidence matrix: +1 at the tail and -1 at the head of each arc.
+        """
+
+        arcs = np.arange(self.nb_arcs)
+        return sp.csr_matrix((np.concatenate([np.ones(self.nb_arcs), -np.ones(self.nb_arcs)]),
+                              (np.concatenate([self.tails, self.heads]), np.concatenate([arcs, arcs]))),
+                             shape=(self.nb_nodes, self.nb_arcs))
+
+    def distances_to(self, target):
+        """
+        Shortest traveling time from each node to the target in each scenario (inf if the target cannot be reached),
+        of shape (n, nb_nodes).
+        """
+
+        distances = np.empty((self.nb_scenarios, self.nb_nodes))
+        for scenario in range(self.nb_scenarios):
+            # Fastest of the parallel arcs, on the reversed graph
+            order = np.lexsort((self.times[scenario], self.tails, self.heads))
+            first = np.ones(self.nb_arcs, dtype=bool)
+            first[1:] = (np.diff(self.heads[order]) != 0) | (np.diff(self.tails[order]) != 0)
+            arcs = order[first]
+
+            reversed_graph = sp.csr_matrix((self.times[scenario, arcs], (self.heads[arcs], self.tails[arcs])),
+                                           shape=(self.nb_nodes, self.nb_nodes))
+            distances[scenario] = dijkstra(reversed_graph, indices=target)
+
+        return distances
+
+    def arcs_from(self, node):
+        """
+        Arcs leaving the given node.
+        """
+
+        return self.out_arcs[self.out_start[node]:self.out_start[node + 1]]
 
 # -------- Choquet Graph LP -------- #
 
-def choquet_graph_lp(n, traveling_time, mobius_masses, combinations=None):
+def choquet_graph_lp(n, traveling_time, mobius_masses, combinations=None, config=None, source=0, target=None,
+                     linking="pairs"):
     """
-    :param n: number of objectives
-    :param p: number of projects
-    :param costs: costs for each project: [c1, ..., ck] with k in {1, ..., p}
-    :param utilities: U
-    :param mobius_masses: Mobius masses
-    :param combinations: list of combinations of objectives
+    Path from source to target maximising the Choquet integral of the opposites of its traveling times
+    in the n scenarios (robust shortest path).
+
+    :param n: number of scenarios (objectives)
+    :param traveling_time: Graph, or dense traveling times (one nb_nodes x nb_nodes matrix per scenario, 999 for
+        missing arcs)
+    :param mobius_masses: Mobius masses, either as a dense vector (in the order of combinations) or as a sparse dict {subset: mass}
+    :param combinations: bitmasks of the combinations of objectives, in the order of a dense vector of Mobius masses
+    :param config: printing, export and Gurobi settings (default: SolverConfig())
+    :param source: first node of the path
+    :param target: last node of the path (default: the last node)
+    :param linking: constraints bounding the variables y_A by the scores, "pairs" or "chain"
+        (see Choquet.MobiusSolver)
 
     :type n: int
-    :type p: int
-    :type costs: ndarray[int]
-    :type utilities: ndarray[int]
-    :type mobius_masses: ndarray[float]
-    :type combinations: list[tuple[int]]
-
-    :return solution: x
-    :rtype: ndarray[int]
+    :type traveling_time: Graph | ndarray[int]
+    :type mobius_masses: ndarray[float] | dict
+    :type combinations: ndarray[int]
+    :type config: SolverConfig
+    :type source: int
+    :type target: int
+    :type linking: str
+
+    :return result: arcs taken (solution, one value per arc of the graph), objective, runtime...
+    :rtype: SolveResult
     """
 
+    graph = traveling_time if isinstance(traveling_time, Graph) else Graph.from_dense(traveling_time)
 
-    nb_nodes = len(traveling_time[0])
+    try:
+        solver = ChoquetGraphSolver(graph, source, target, config, linking)
+        solver.set_mobius_masses(mobius_masses, combinations)
+        result = solver.solve()
 
-    if combinations == None:  
-        # Avoir toutes les combinaisons de projets possibles
-        objectives_list = [i for i in range(n)]
-        combinations = powerset(objectives_list)
+    except gp.GurobiError as e:
+        print('Error code ' + str(e.errno) + ": " + str(e))
+        result = SolveResult(None, None, None, None)
 
-    try:
-        # Create a new model
-        m = gp.Model("ChoquetGraph")
+    return result
 
-        # y: variables that indicate value obtained for each combination of scenarios
-        y = m.addMVar(shape=2**n, vtype=GRB.CONTINUOUS, name="y")
 
-        # Set objective
-        m.setObjective(mobius_masses @ y, GRB.MAXIMIZE)
+class ChoquetGraphSolver(MobiusSolver):
+    """
+    Persistent Choquet shortest path model (see choquet_graph_lp), with one binary variable per arc
+    and flow conservation constraints.
+    """
 
-        # x: binary decision variables to indicate when an arc is taken
-        x = m.addMVar(shape=(nb_nodes, nb_nodes), vtype=GRB.BINARY, name="x")
+    def __init__(self, graph, source=0, target=None, config=None, linking="pairs"):
+        super().__init__("Choquet_graph", graph.nb_scenarios, config, linking)
 
-        # Path constraints
-        m.addConstrs((x[i,:] == x[:,i] for i in range(nb_nodes)), name="path")
-        m.addConstr(x[1,:] * np.ones(nb_nodes) == 1)
-        m.addConstr(x[:,nb_nodes-1] * np.ones(nb_nodes) == 1)
+        build_start = time.perf_counter()
 
-        # z: score in each scenario
-        z = m.addMVar(shape=n)
-        for n in range(n):
-            m.addConstrs((z[n] == - x[i] @ traveling_time[n][i] for i in range(nb_nodes)), name="score")
+        if target is None:
+            target = graph.nb_nodes - 1
+        self.graph = graph
 
-        # The value y_A of a subset of objectives A is the sum of the utilities of the selected projects for those objectives
-        for subset_index, subset_obj in enumerate(combinations):
-            for i in subset_obj:
-                m.addConstr(z[i] >= y[subset_index], name="y_"+str(subset_index)+"_"+str(i))
+        with timer(self.m, "variables"):
+            # x: binary decision variables to indicate when an arc is taken
+            self.x = self.m.addMVar(shape=graph.nb_arcs, vtype=GRB.BINARY, name="x")
 
-        m.write("choquet_graph.lp")
+            # s: score in each scenario (opposite of the traveling time)
+            self.s = self.m.addMVar(shape=graph.nb_scenarios, lb=-GRB.INFINITY, vtype=GRB.CONTINUOUS, name="s")
 
-        # Optimize model
-        m.optimize()
+        with timer(self.m, "constraints"):
+            # One unit of flow leaves the source and reaches the target
+            supplies = np.zeros(graph.nb_nodes)
+            supplies[source] += 1
+            supplies[target] -= 1
+            self.m.addConstr(graph.incidence_matrix() @ self.x == supplies, name="path")
 
-        print("X: ", x.X)
-        print("Z: ", z.X)
-        print('Obj: %g' % m.objVal)
+            self.m.addConstr(graph.times @ self.x + self.s == 0, name="score")
 
-    except gp.GurobiError as e:
-        print('Error code ' + str(e.errno) + ": " + str(e))
+        self.decisions = self.solution = self.x
+        self.variables = {"x": self.x, "s": self.s}
+
+        self.build_time += time.perf_counter() - build_start
+
+    def add_subsets(self, combinations):
+        # The scores are negative, so the variables y_A must be free
+        super().add_subsets(combinations)
+        with timer(self.m, "variables"):
+            for y_A in self.subsets.values():
+                y_A.LB = -GRB.INFINITY
+
+# -------- Label setting -------- #
+
+def pareto_paths(graph, source=0, target=None):
+    """
+    Pareto-optimal paths from source to target (minimising the traveling time in every scenario),
+    with the label-setting algorithm of Martins: the temporary label that is lexicographically smallest is made
+    permanent and extended along the arcs leaving its node, and a new label is discarded if it is dominated by a
+    label of its node, or if completing it with the shortest time to the target in each scenario (computed once
+    with Dijkstra) is dominated by a label of the target. Otherwise, it removes the temporary labels of its node
+    that it dominates. The traveling times must be non-negative.
+
+    :type graph: Graph
+    :type source: int
+    :type target: int
+
+    :return paths, times: arcs of each Pareto-optimal path (in order), and its traveling time in each scenario
+    :rtype: list[ndarray[int]], ndarray[float]
+    """
+
+    if target is None:
+        target = graph.nb_nodes - 1
+
+    # Lower bounds on the traveling time from each node to the target
+    distances = graph.distances_to(target)
+
+    # Labels: traveling times, previous label and arc used to reach it
+    label_times = [np.zeros(graph.nb_scenarios)]
+    label_previous = [-1]
+    label_arcs = [-1]
+    removed = [False]
+
+    # Labels of each node (permanent or temporary), and their traveling times
+    node_labels = [np.zeros(0, dtype=np.int64) for node in range(graph.nb_nodes)]
+    node_times = [np.zeros((0, graph.nb_scenarios)) for node in range(graph.nb_nodes)]
+    node_labels[source] = np.array([0])
+    node_times[source] = label_times[0][None, :]
+
+    queue = [(tuple(label_times[0]), 0, source)]
+    while queue:
+        key, label, node = heapq.heappop(queue)
+        if removed[label] or node == target:
+            continue
+
+        for arc in graph.arcs_from(node):
+            head = graph.heads[arc]
+            times = label_times[label] + graph.times[:, arc]
+
+            # Dominated (or equalled) by a label of the head, or cannot lead to a path that is not dominated
+            if np.any(np.all(node_times[head] <= times, axis=1)):
+                continue
+            if np.any(np.all(node_times[target] <= times + distances[:, head], axis=1)) \
+                    or np.any(np.isinf(distances[:, head])):
+                continue
+
+            # Temporary labels of the head dominated by the new label
+            dominated = np.all(times <= node_times[head], axis=1)
+            for other in node_labels[head][dominated]:
+                removed[other] = True
+
+            new_label = len(label_times)
+            label_times.append(times)
+            label_previous.append(label)
+            label_arcs.append(arc)
+            removed.append(False)
+            node_labels[head] = np.append(node_labels[head][~dominated], new_label)
+            node_times[head] = np.vstack([node_times[head][~dominated], times])
+
+            heapq.heappush(queue, (tuple(times), new_label, head))
+
+    paths = []
+    for label in node_labels[target]:
+        arcs = []
+        while label_previous[label] >= 0:
+            arcs.append(label_arcs[label])
+            label = label_previous[label]
+        paths.append(np.array(arcs[::-1], dtype=np.int64))
+
+    return paths, node_times[target]
+
+def choquet_shortest_path(graph, mobius_masses, combinations=None, source=0, target=None):
+    """
+    Same problem as choquet_graph_lp, solved by scoring the Pareto-optimal paths (see pareto_paths) with the Choquet
+    integral, which is exact for monotone capacities.
+
+    :return result: arcs taken (solution, one value per arc of the graph), objective, runtime...
+    :rtype: SolveResult
+    """
+
+    start = time.perf_counter()
+
+    paths, times = pareto_paths(graph, source, target)
+    if len(paths) == 0:
+        return SolveResult(None, None, time.perf_counter() - start, GRB.INFEASIBLE)
 
-    except AttributeError:
-        print('Encountered an attribute error')
+    values = choquet_values(-times, mobius_masses, combinations)
+    best = np.argmax(values)
 
-    return x.X, m.Runtime
+    x = np.zeros(graph.nb_arcs)
+    x[paths[best]] = 1
 
+    return SolveResult(x, values[best], time.perf_counter() - start, GRB.OPTIMAL, None, {"x": x, "s": -times[best]},
+                       bound=values[best], gap=0)
@@ -1,87 +1,318 @@
+import time
 import numpy as np
+import scipy.sparse as sp
 
 import gurobipy as gp
 from gurobipy import GRB
 
+from solver_config import SolverConfig, SolveResult, optimize
+from evaluation import OWA_values
+from heuristics import heuristic_allocation
+from presolve import presolve_items
+from telemetry import timer
+
+# -------- Assignment constraints -------- #
+
+def add_assignment_constraints(m, n, p, utilities, one_to_one=True):
+    """
+    Adds the variables and constraints of the original allocation problem (without linearisation)
+    to the model m, in matrix form, and returns the variables x (flattened row by row) and z.
+
+    :type m: gurobipy.Model
+    :type n: int
+    :type p: int
+    :type utilities: ndarray[int]
+    :type one_to_one: bool
+
+    :rtype: gurobipy.MVar, gurobipy.MVar
+    """
+
+    with timer(m, "variables"):
+        # Create binary variables x_ij (if x_ij is 1, the item j is attributed to agent i), x_ij at index i*p + j
+        x = m.addMVar(shape=n*p, vtype=GRB.BINARY, name="x")
+
+        # For all agents, we sum the value of the items they are attributed
+        z = m.addMVar(shape=n, vtype=GRB.CONTINUOUS, name="z")
+
+    with timer(m, "constraints"):
+        U = sp.kron(sp.eye(n), np.ones((1, p))).multiply(np.asarray(utilities).reshape(1, -1)).tocsr()
+        U.eliminate_zeros()
+        m.addConstr(U @ x - z == 0, name="c_z")
+
+        # We ensure that each item is only attributed once
+        items_incidence = sp.kron(np.ones((1, n)), sp.eye(p)).tocsr()
+        m.addConstr(items_incidence @ x <= np.ones(p), name="c_nbattitems")
+
+        if one_to_one:
+            # We ensure that each agent receives only one item
+            agents_incidence = sp.kron(sp.eye(n), np.ones((1, p))).tocsr()
+            m.addConstr(agents_incidence @ x <= np.ones(n), name="c_nbattagents")
+
+    return x, z
+
 # -------- OWA LP -------- #
 
-def OWA_LP(n, p, utilities, weights, one_to_one=True):
+def OWA_formulation(weights, formulation, config):
+    """
+    Formulation of the OWA with the given weights that the backend of config can solve: the compact formulation
+    requires non-increasing weights, and the backends other than Gurobi only support the compact formulation.
+
+    :return formulation: "big_M" or "compact", None if no formulation fits (increasing weights on another backend)
+    :rtype: str
+    """
+
+    increasing = np.any(np.diff(weights) > 1e-12)
+
+    if config.backend != "gurobi":
+        if increasing:
+            if config.verbose:
+                print("Error: increasing weights require the big_M formulation, which requires the gurobi backend.")
+            return None
+        if formulation == "big_M" and config.verbose:
+            print("Error: the big_M formulation requires the gurobi backend, using the compact formulation instead.")
+        return "compact"
+
+    if formulation == "compact" and increasing:
+        if config.verbose:
+            print("Error: the compact formulation requires non-increasing weights, "
+                  "using the big_M formulation instead.")
+        return "big_M"
+
+    return formulation
+
+def OWA_LP(n, p, utilities, weights, one_to_one=True, formulation="big_M", config=None, warm_start=True,
+           presolve=True):
     """
     :param n: nb_agents
     :param p: nb_items
     :param utilities: U
     :param weights: [w_1, w_2, ..., w_n] in order of increasing ordered components (decreasing weights)
     :param one_to_one: indicates whether only one item is to be attributed per agent
+    :param formulation: linearisation of the OWA operator:
+        "big_M" sorts the satisfactions with n*n binary variables,
+        "compact" uses the LP formulation of Ogryczak and Sliwinski (cumulative ordered sums, no extra binaries),
+        which requires non-increasing weights; the backends other than Gurobi only support the compact formulation
+        (see OWA_formulation: with increasing weights, they return a result without solution)
+    :param config: printing, export and Gurobi settings (default: SolverConfig())
+    :param warm_start: start branch-and-bound from a heuristic allocation (see OWASolver.warm_start)
+    :param presolve: remove the items that an optimal allocation can do without before building the model
+        (see presolve.presolve_items)
 
     :type nb_agents: int
     :type nb_items: int
     :type utilities: ndarray[int]
     :type weights: ndarray[int]
     :type one_to_one: bool
+    :type formulation: str
+    :type config: SolverConfig
+    :type warm_start: bool
+    :type presolve: bool
 
-    :return solution: x
-    :rtype: ndarray[int]
+    :return result: satisfaction of each agent (solution), objective, runtime...
+    :rtype: SolveResult
     """
 
+    weights = np.asarray(weights, dtype=float)
+    config = SolverConfig() if config is None else config
+
+    formulation = OWA_formulation(weights, formulation, config)
+    if formulation is None:
+        return SolveResult(None, None, None, None)
+
+    if presolve:
+        utilities, reduction = presolve_items(utilities, one_to_one)
+        p = utilities.shape[1]
+        if config.verbose:
+            print(reduction)
+
     try:
+        solver = OWASolver(n, p, utilities, one_to_one, formulation, config)
+        solver.set_weights(weights)
+        if warm_start:
+            solver.warm_start()
+        result = solver.solve()
 
-        # Create a new model
-        m = gp.Model("OWA")
+    except gp.GurobiError as e:
+        print('Error code ' + str(e.errno) + ": " + str(e))
+        result = SolveResult(None, None, None, None)
 
-        # Create variables y_1, y_2, ..., y_n
-        y = m.addMVar(shape=n, vtype=GRB.CONTINUOUS, name="y")
+    if presolve:
+        result = reduction.restore_result(result, ["x"])
 
-        # Set objective
-        obj = weights @ y
-        m.setObjective(obj, GRB.MAXIMIZE)
+    return result
 
-        #### Constraints of the original problem (without linearisation) ####
 
-        # Create binary variables x_ij (if x_ij is 1, the item j is attributed to agent i)
-        x = m.addMVar(shape=(n,p), vtype=GRB.BINARY, name="x")
+# -------- Persistent solver -------- #
 
-        # For all agents, we sum the value of the items they are attributed
-        z = m.addMVar(shape=n, vtype=GRB.CONTINUOUS, name="z")
-        m.addConstrs((z[i] == x[i] @ utilities[i] for i in range(n)), name="c_z")
+class OWASolver:
+    """
+    Persistent OWA allocation model (see OWA_LP): the constraints are built once,
+    and only the objective coefficients change when solving for other weights.
+    """
 
-        # We ensure that each item is only attributed once
-        nb_attributions_per_item = np.ones(p)
-        m.addConstrs((sum(x[:,j]) <= nb_attributions_per_item[j] for j in range(p)), name="c_nbattitems")
+    def __init__(self, n, p, utilities, one_to_one=True, formulation="big_M", config=None):
+        if formulation == "big_M" and config is not None and config.backend != "gurobi":
+            # With the integrality tolerance of HiGHS, the big-M rows can give wrong optima reported as optimal
+            raise ValueError("the big_M formulation requires the gurobi backend, use the compact formulation")
 
-        if one_to_one:
-            # We ensure that each agent receives only one item
-            nb_attributions_per_agent = np.ones(n)
-            m.addConstrs((sum(x[i]) <= nb_attributions_per_agent[i] for i in range(n)), name="c_nbattagents")
+        build_start = time.perf_counter()
+
+        self.n = n
+        self.p = p
+        self.utilities = np.asarray(utilities)
+        self.one_to_one = one_to_one
+        self.formulation = formulation
+        self.weights = None
+        self.config = SolverConfig() if config is None else config
+
+        # Create a new model
+        self.m = self.config.new_model("OWA")
+        self.m.ModelSense = GRB.MAXIMIZE
+
+        #### Constraints of the original problem (without linearisation) ####
+
+        self.x, self.z = add_assignment_constraints(self.m, n, p, utilities, one_to_one)
 
         #### OWA and linearisation constraints ####
 
-        # Impose order of y_i variables (y_1 <= y_2 <= ... <= y_n)
-        for i in range(1, n):
-            m.addConstr(y[i-1] <= y[i], name="c_y_"+str(i))
+        # Matrices that repeat each of the n components of a vector n times (R), or the whole vector n times (T),
+        # to write constraints indexed by (k, i) at index k*n + i
+        R = sp.kron(sp.eye(n), np.ones((n, 1))).tocsr()
+        T = sp.kron(np.ones((n, 1)), sp.eye(n)).tocsr()
 
-        # Calculate value of M to use (has to be larger than any value y_i or z_i could take)
-        M = np.sum(utilities) * 10 
+        if formulation == "compact":
+            # OWA(z) = sum_k w'_k L_k(z), with w'_k = w_k - w_{k+1} >= 0 and L_k(z) the sum of the k smallest z_i
+            # L_k(z) = max k*r_k - sum_i d_ik  s.t.  d_ik >= r_k - z_i, d_ik >= 0
+            with timer(self.m, "variables"):
+                self.r = self.m.addMVar(shape=n, lb=-GRB.INFINITY, vtype=GRB.CONTINUOUS, name="r")
+                self.d = self.m.addMVar(shape=n*n, vtype=GRB.CONTINUOUS, name="d")
 
-        # Constraints that associate z_i and y_i variables
-        b = m.addMVar(shape=(n,n), vtype=GRB.BINARY, name="b")
-        m.addConstrs((y[k] * np.ones(n) <= z + M * b[k,:] for k in range(n)), name="c_yz")
-        m.addConstrs((b[k,:] @ np.ones(n) == k for k in range(n)), name="c_b")
+            with timer(self.m, "constraints"):
+                self.m.addConstr(self.d - R @ self.r + T @ self.z >= 0, name="c_rd")
 
-        m.write("owa.lp")
+        else:
+            # Create variables y_1, y_2, ..., y_n, and b_ki (see c_yz)
+            with timer(self.m, "variables"):
+                self.y = self.m.addMVar(shape=n, vtype=GRB.CONTINUOUS, name="y")
+                self.b = self.m.addMVar(shape=n*n, vtype=GRB.BINARY, name="b")
 
-        # Optimize model
-        m.optimize()
+            with timer(self.m, "constraints"):
+                # Impose order of y_i variables (y_1 <= y_2 <= ... <= y_n)
+                if n > 1:
+                    D = sp.eye(n-1, n) - sp.eye(n-1, n, k=1)
+                    self.m.addConstr(D.tocsr() @ self.y <= 0, name="c_y")
 
-        print("X: ", x.X)
-        print("Y: ", y.X)
-        print("Z: ", z.X)
-        print("B: ", b.X)
-        print('Obj: %g' % m.objVal)
+                # Calculate value of M to use (has to be larger than any value y_i or z_i could take): the largest
+                # satisfaction of an agent, as small as possible so that the integrality tolerance of the solver
+                # (Gurobi or HiGHS) cannot give b_ki a fractional value of order 1/M that loosens the constraint
+                positive_utilities = np.maximum(np.asarray(utilities), 0)
+                if one_to_one:
+                    M = np.max(positive_utilities, initial=0)
+                else:
+                    M = np.max(np.sum(positive_utilities, axis=1), initial=0)
+                M = max(M, 1)
 
-    except gp.GurobiError as e:
-        print('Error code ' + str(e.errno) + ": " + str(e))
+                # Constraints that associate z_i and y_i variables: y_k <= z_i + M*b_ki
+                self.m.addConstr(R @ self.y - T @ self.z - M * self.b <= 0, name="c_yz")
+                self.m.addConstr(R.T @ self.b == np.arange(n), name="c_b")
+
+        self.build_time = time.perf_counter() - build_start
+
+    def set_weights(self, weights):
+        """
+        Replaces the objective by the OWA with the given weights (non-increasing for the compact formulation).
+        """
+
+        weights = np.asarray(weights, dtype=float)
+        if self.formulation == "compact" and np.any(np.diff(weights) > 1e-12):
+            raise ValueError("the compact formulation requires non-increasing weights")
+        self.weights = weights
+
+        with timer(self.m, "objective"):
+            if self.formulation == "compact":
+                # Rounding errors can make equal weights increase slightly, which makes r unbounded for HiGHS
+                weights_differences = weights - np.append(weights[1:], 0)
+                weights_differences[np.abs(weights_differences) <= 1e-12] = 0
+                self.r.Obj = weights_differences * np.arange(1, self.n+1)
+                self.d.Obj = -np.repeat(weights_differences, self.n)
+
+            else:
+                self.y.Obj = weights
+
+    def set_start(self, x):
+        """
+        Gives the allocation x (binary matrix of shape (n, p)) as a MIP start,
+        along with the values of the other variables that it determines.
+        """
+
+        x = np.asarray(x)
+        z = np.sum(x * self.utilities, axis=1)
+
+        self.x.Start = x.reshape(-1)
+        self.z.Start = z
+
+        # Satisfactions in increasing order
+        order = np.argsort(z, kind="stable")
+        sorted_z = z[order]
+
+        if self.formulation == "compact":
+            self.r.Start = sorted_z
+            self.d.Start = np.maximum(sorted_z[:, None] - z[None, :], 0).reshape(-1)
+        else:
+            self.y.Start = sorted_z
+            # b_ki = 1 for the k least satisfied agents, which y_k does not need to be below
+            ranks = np.empty(self.n, dtype=int)
+            ranks[order] = np.arange(self.n)
+            self.b.Start = (ranks[None, :] < np.arange(self.n)[:, None]).astype(int).reshape(-1)
+
+    def warm_start(self):
+        """
+        Computes a heuristic allocation for the current weights (maximin assignment or greedy allocation,
+        improved by local search on the OWA, see heuristics.heuristic_allocation) and gives it as a MIP start.
+
+        :return x: heuristic allocation
+        :rtype: ndarray[int]
+        """
+
+        weights = self.weights
+        with timer(self.m, "start"):
+            x = heuristic_allocation(self.utilities, lambda satisfactions: OWA_values(satisfactions, weights),
+                                     self.one_to_one)
+            self.set_start(x)
+
+        return x
+
+    def solve(self):
+        """
+        Optimizes the model, starting from the previous optimal allocation if there is one.
+
+        :return result: satisfaction of each agent (solution), objective, runtime...
+        :rtype: SolveResult
+        """
+
+        if self.m.SolCount > 0:
+            self.x.Start = self.x.X
+
+        variables = {"x": self.x.reshape(self.n, self.p)}
+        if self.formulation == "compact":
+            variables["r"] = self.r
+        else:
+            variables["y"] = self.y
+            variables["b"] = self.b.reshape(self.n, self.n)
+        variables["z"] = self.z
+
+        return optimize(self.m, self.config, self.z, variables, self.build_time)
+
+    def sweep(self, all_weights):
+        """
+        Solves the model for each vector of weights, reusing the model (and the previous solution) each time.
+
+        :return results: list of results (see solve) for each vector of weights
+        """
 
-    except AttributeError:
-        print('Encountered an attribute error')
+        results = []
+        for weights in all_weights:
+            self.set_weights(weights)
+            results.append(self.solve())
 
-    return z.X, m.Runtime
\ No newline at end of file
+        return results
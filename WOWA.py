@@ -1,82 +1,276 @@
+import time
 import numpy as np
+import scipy.sparse as sp
 
 import gurobipy as gp
-from gurobipy import GRB, quicksum
+from gurobipy import GRB
 
-from utils import *
+from OWA import add_assignment_constraints
+from Choquet import MobiusSolver
+from solver_config import SolverConfig, SolveResult, optimize
+from evaluation import choquet_values, WOWA_values
+from heuristics import heuristic_allocation
+from presolve import presolve_items
+from telemetry import timer
 
 # -------- WOWA LP -------- #
 
-def WOWA_LP(n, p, utilities, mobius_masses, one_to_one=True):
+def WOWA_LP(n, p, utilities, mobius_masses, one_to_one=True, config=None, warm_start=True, presolve=True,
+            linking="pairs"):
     """
     :param n: nb_agents
     :param p: nb_items
     :param utilities: U
-    :param weights: [p_1, p_2, ..., p_n] corresponding to importance of each agent
+    :param mobius_masses: Mobius masses of the WOWA capacity, either as a dense vector (in the order of powerset)
+        or as a sparse dict {subset: mass}
     :param one_to_one: indicates whether only one item is to be attributed per agent
+    :param config: printing, export and Gurobi settings (default: SolverConfig())
+    :param warm_start: start branch-and-bound from a heuristic allocation (see WOWASolver.warm_start)
+    :param presolve: remove the items that an optimal allocation can do without before building the model
+        (see presolve.presolve_items)
+    :param linking: constraints bounding the variables y_A by the satisfactions, "pairs" or "chain"
+        (see Choquet.MobiusSolver)
 
     :type nb_agents: int
     :type nb_items: int
     :type utilities: ndarray[int]
-    :type weights: ndarray[int]
+    :type mobius_masses: ndarray[float] | dict
     :type one_to_one: bool
+    :type config: SolverConfig
+    :type warm_start: bool
+    :type presolve: bool
+    :type linking: str
 
-    :return solution: x
-    :rtype: ndarray[int]
+    :return result: satisfaction of each agent (solution), objective, runtime...
+    :rtype: SolveResult
     """
 
-    agents_list = [i for i in range(n)]
-    combinations = powerset(agents_list)
+    config = SolverConfig() if config is None else config
+    if presolve:
+        utilities, reduction = presolve_items(utilities, one_to_one)
+        p = utilities.shape[1]
+        if config.verbose:
+            print(reduction)
 
     try:
-        # Create a new model
-        m = gp.Model("WOWA")
+        solver = WOWASolver(n, p, utilities, one_to_one, config, linking)
+        solver.set_mobius_masses(mobius_masses)
+        if warm_start:
+            solver.warm_start()
+        result = solver.solve()
 
-        # y: variables that indicate value obtained for each combination of agents
-        y = m.addMVar(shape=2**n, vtype=GRB.CONTINUOUS, name="y")
+    except gp.GurobiError as e:
+        print('Error code ' + str(e.errno) + ": " + str(e))
+        result = SolveResult(None, None, None, None)
 
-        # Set objective
-        m.setObjective(mobius_masses @ y, GRB.MAXIMIZE)
+    if presolve:
+        result = reduction.restore_result(result, ["x"])
 
-        #### Constraints of the original problem (without linearisation) ####
+    return result
+
+
+# -------- Compact WOWA LP -------- #
+
+# Largest number of breakpoints looked for by exact_nb_breakpoints
+MAX_EXACT_BREAKPOINTS = 1000
+
+def on_breakpoints(importance_weights, nb_breakpoints):
+    """
+    Indicates whether every importance weight is a multiple of 1/nb_breakpoints.
+    """
+
+    scaled = nb_breakpoints * np.asarray(importance_weights, dtype=float)
+    return np.allclose(scaled, np.round(scaled), rtol=0, atol=1e-9 * nb_breakpoints)
+
+def exact_nb_breakpoints(importance_weights, max_breakpoints=MAX_EXACT_BREAKPOINTS):
+    """
+    Smallest number of breakpoints m for which every importance weight is a multiple of 1/m, so that the
+    interpolation of phi in WOWA_compact_LP is exact for any phi.
+
+    :return m: number of breakpoints, None if there is none up to max_breakpoints
+    :rtype: int
+    """
+
+    for m in range(1, max_breakpoints + 1):
+        if on_breakpoints(importance_weights, m):
+            return m
+
+    return None
+
+def WOWA_compact_LP(n, p, utilities, importance_weights, alpha=None, phi=None, nb_breakpoints=None, one_to_one=True,
+                    config=None, presolve=True):
+    """
+    WOWA model of Ogryczak and Sliwinski, built directly from the importance weights and phi
+    with O(n * nb_breakpoints) variables instead of one variable per subset of agents.
+
+    phi is interpolated linearly on the breakpoints k/nb_breakpoints, as in Torra's definition of the WOWA:
+    the model is exact when every importance weight is a multiple of 1/nb_breakpoints (e.g. uniform importance
+    weights with nb_breakpoints = n) or when phi is linear (alpha = 1). Otherwise it optimises a different
+    aggregation, which converges to the WOWA of WOWA_LP as nb_breakpoints grows, and a warning is printed:
+    the allocation found may then not be optimal for the WOWA.
+
+    :param n: nb_agents
+    :param p: nb_items
+    :param utilities: U
+    :param importance_weights: [p_1, p_2, ..., p_n] corresponding to importance of each agent
+    :param alpha: value to be used in phi(x) = x^alpha (ignored if phi is given)
+    :param phi: vectorized convex function on [0, 1] with phi(0) = 0 and phi(1) = 1
+    :param nb_breakpoints: number of linear pieces used for phi (default: n if alpha = 1, otherwise the smallest
+        number that makes the model exact, see exact_nb_breakpoints, or n if there is none)
+    :param one_to_one: indicates whether only one item is to be attributed per agent
+    :param config: printing, export and Gurobi settings (default: SolverConfig())
+    :param presolve: remove the items that an optimal allocation can do without before building the model
+        (see presolve.presolve_items)
+
+    :type nb_agents: int
+    :type nb_items: int
+    :type utilities: ndarray[int]
+    :type importance_weights: ndarray[float]
+    :type alpha: float
+    :type phi: function
+    :type nb_breakpoints: int
+    :type one_to_one: bool
+    :type config: SolverConfig
+    :type presolve: bool
+
+    :return result: satisfaction of each agent (solution), objective, runtime... The objective is the WOWA of the
+        allocation (see evaluation.WOWA_values), and surrogate_objective the objective of the model, which differs
+        from it when the model is not exact (bound and gap refer to the latter)
+    :rtype: SolveResult
+    """
+
+    if config is None:
+        config = SolverConfig()
+
+    if presolve:
+        utilities, reduction = presolve_items(utilities, one_to_one)
+        p = utilities.shape[1]
+        if config.verbose:
+            print(reduction)
+
+    linear = phi is None and alpha == 1
+    if phi is None:
+        phi = lambda x: x**alpha
+
+    importance_weights = np.asarray(importance_weights, dtype=float)
+
+    if nb_breakpoints is None:
+        nb_breakpoints = n if linear else exact_nb_breakpoints(importance_weights) or n
+    if not linear and not on_breakpoints(importance_weights, nb_breakpoints):
+        print("Warning: the importance weights are not multiples of 1/%d, the compact model only approximates "
+              "the WOWA (see WOWA_compact_LP)." % nb_breakpoints)
+
+    # Weights of the quantiles of the distribution of satisfactions: w_k = phi(1 - (k-1)/m) - phi(1 - k/m)
+    breakpoints = np.arange(1, nb_breakpoints + 1) / nb_breakpoints
+    weights = np.array([phi(1 - beta + 1/nb_breakpoints) - phi(1 - beta) for beta in breakpoints])
+    weights_differences = weights - np.append(weights[1:], 0)
+
+    if np.any(weights_differences < -1e-12):
+        print("Error: phi must be convex.")
+    # Differences that are only rounding errors are zero, otherwise a tiny negative one leaves r unbounded
+    weights_differences[np.abs(weights_differences) <= 1e-12] = 0
 
-        # Create binary variables x_ij (if x_ij is 1, the item j is attributed to agent i)
-        x = m.addMVar(shape=(n,p), vtype=GRB.BINARY, name="x")
+    try:
+        build_start = time.perf_counter()
 
-        # For all agents, we sum the value of the items they are attributed
-        z = m.addMVar(shape=n, vtype=GRB.CONTINUOUS, name="z")
-        m.addConstrs((z[i] == x[i] @ utilities[i] for i in range(n)), name="c_z")
+        # Create a new model
+        m = config.new_model("WOWA_compact")
 
-        # We ensure that each item is only attributed once
-        nb_attributions_per_item = np.ones(p)
-        m.addConstrs((sum(x[:,j]) <= nb_attributions_per_item[j] for j in range(p)), name="c_nbattitems")
+        #### Constraints of the original problem (without linearisation) ####
 
-        if one_to_one:
-            # We ensure that each agent receives only one item
-            nb_attributions_per_agent = np.ones(n)
-            m.addConstrs((sum(x[i]) <= nb_attributions_per_agent[i] for i in range(n)), name="c_nbattagents")
+        x, z = add_assignment_constraints(m, n, p, utilities, one_to_one)
 
         #### WOWA and linearisation constraints ####
 
-        # The value y_A of a subset of agents A is the sum of the utilities of the selected projects for those agents
-        for subset_index, subset_agents in enumerate(combinations):
-            for i in subset_agents:
-                m.addConstr(z[i] >= y[subset_index], name="y_"+str(subset_index)+"_"+str(i))
+        # WOWA(z) = sum_k w'_k * m * L(beta_k), with w'_k = w_k - w_{k+1} >= 0 and L(beta) the integral of the
+        # quantile function of the satisfactions (distributed according to the importance weights) up to beta
+        # L(beta_k) = max beta_k*r_k - sum_i p_i d_ik  s.t.  d_ik >= r_k - z_i, d_ik >= 0
+        with timer(m, "variables"):
+            r = m.addMVar(shape=nb_breakpoints, lb=-GRB.INFINITY, vtype=GRB.CONTINUOUS, name="r")
+            d = m.addMVar(shape=nb_breakpoints*n, vtype=GRB.CONTINUOUS, name="d")
+
+        # Set objective
+        with timer(m, "objective"):
+            obj = nb_breakpoints * ((weights_differences * breakpoints) @ r
+                                    - np.kron(weights_differences, importance_weights) @ d)
+            m.setObjective(obj, GRB.MAXIMIZE)
 
-        m.write("wowa.lp")
+        # d_ki >= r_k - z_i, at index k*n + i
+        with timer(m, "constraints"):
+            R = sp.kron(sp.eye(nb_breakpoints), np.ones((n, 1))).tocsr()
+            T = sp.kron(np.ones((nb_breakpoints, 1)), sp.eye(n)).tocsr()
+            m.addConstr(d - R @ r + T @ z >= 0, name="c_rd")
 
-        # Optimize model
-        m.optimize()
+        build_time = time.perf_counter() - build_start
 
-        print("X: ", x.X)
-        print("Y: ", y.X)
-        print("Z: ", z.X)
-        print('Obj: %g' % m.objVal)
+        result = optimize(m, config, z, {"x": x.reshape(n, p), "r": r, "z": z}, build_time)
 
     except gp.GurobiError as e:
         print('Error code ' + str(e.errno) + ": " + str(e))
+        result = SolveResult(None, None, None, None)
+
+    # WOWA of the allocation, the objective of the model being that of the interpolated phi
+    result.surrogate_objective = result.objective
+    if result.solution is not None:
+        result.objective = float(WOWA_values(result.solution, importance_weights, phi=phi))
+
+    if presolve:
+        result = reduction.restore_result(result, ["x"])
+
+    return result
+
+
+
+# -------- Persistent solver -------- #
+
+class WOWASolver(MobiusSolver):
+    """
+    Persistent WOWA allocation model (see WOWA_LP), for solving with several Mobius masses
+    (e.g. for several importance vectors p or values of alpha).
+    """
+
+    def __init__(self, n, p, utilities, one_to_one=True, config=None, linking="pairs"):
+        super().__init__("WOWA", n, config, linking)
+
+        build_start = time.perf_counter()
+
+        self.p = p
+        self.utilities = np.asarray(utilities)
+        self.one_to_one = one_to_one
+
+        self.x, self.z = add_assignment_constraints(self.m, n, p, utilities, one_to_one)
+
+        self.s = self.z
+        self.decisions = self.x
+        self.solution = self.z
+        self.variables = {"x": self.x.reshape(n, p), "z": self.z}
+
+        self.build_time += time.perf_counter() - build_start
+
+    def set_start(self, x):
+        """
+        Gives the allocation x (binary matrix of shape (n, p)) as a MIP start,
+        along with the values of the other variables that it determines.
+        """
+
+        x = np.asarray(x)
+        self.x.Start = x.reshape(-1)
+        self.set_score_start(np.sum(x * self.utilities, axis=1))
+
+    def warm_start(self):
+        """
+        Computes a heuristic allocation for the current Mobius masses (maximin assignment or greedy allocation,
+        improved by local search on the WOWA, see heuristics.heuristic_allocation) and gives it as a MIP start.
+
+        :return x: heuristic allocation
+        :rtype: ndarray[int]
+        """
 
-    except AttributeError:
-        print('Encountered an attribute error')
+        mobius_masses = self.mobius_masses
+        with timer(self.m, "start"):
+            x = heuristic_allocation(self.utilities,
+                                     lambda satisfactions: choquet_values(satisfactions, mobius_masses),
+                                     self.one_to_one)
+            self.set_start(x)
 
-    return z.X, m.Runtime
\ No newline at end of file
+        return x
@@ -0,0 +1,395 @@
+import time
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import milp, Bounds, LinearConstraint
+
+import gurobipy as gp
+from gurobipy import GRB
+
+# -------- Solver backends -------- #
+# The models are built with the matrix API of gurobipy (addMVar, sparse matrix @ MVar, .Obj, .Start, .X...).
+# HighsModel implements the part of that interface used by the builders on a model in matrix form, solved by the
+# open-source HiGHS solver through scipy.optimize.milp, so that the same builders run without a Gurobi license
+# (see SolverConfig(backend="highs")). HiGHS has no MIP start and no callback: the start values are ignored,
+# and so are the callbacks (incumbent streaming, telemetry samples, lazy constraints).
+
+BACKENDS = ["gurobi", "highs"]
+
+# Status of scipy.optimize.milp -> Gurobi status
+HIGHS_STATUS = {0: GRB.OPTIMAL, 1: GRB.TIME_LIMIT, 2: GRB.INFEASIBLE, 3: GRB.UNBOUNDED, 4: GRB.NUMERIC}
+
+def fromlist(variables):
+    """
+    Block of variables of a list of single variables, for either backend (as gurobipy.MVar.fromlist).
+    """
+
+    if len(variables) > 0 and isinstance(variables[0], MatrixVariables):
+        return MatrixVariables.fromlist(variables)
+    return gp.MVar.fromlist(variables)
+
+# -------- Matrix expressions -------- #
+
+class MatrixVariables:
+    """
+    Variables of a HighsModel, as a numpy array of column indices (counterpart of gurobipy.MVar):
+    they can be reshaped and combined with matrices, and their attributes (X, Obj, Start, LB, UB) are arrays of the
+    same shape.
+    """
+
+    # Operations with numpy arrays are left to the methods of this class (e.g. matrix @ variables)
+    __array_ufunc__ = None
+
+    def __init__(self, model, indices):
+        self.model = model
+        self.indices = np.asarray(indices, dtype=np.int64)
+
+    @classmethod
+    def fromlist(cls, variables):
+        return cls(variables[0].model, np.array([var.indices for var in variables]).reshape(-1))
+
+    @property
+    def shape(self):
+        return self.indices.shape
+
+    @property
+    def size(self):
+        return self.indices.size
+
+    def reshape(self, *shape):
+        return MatrixVariables(self.model, self.indices.reshape(*shape))
+
+    def tolist(self):
+        return [MatrixVariables(self.model, index) for index in self.indices.reshape(-1)]
+
+    def _get(self, values):
+        return values[self.indices].copy()
+
+    def _set(self, values, new_values):
+        values[self.indices] = new_values
+
+    X = property(lambda self: self._get(self.model.solution))
+    Obj = property(lambda self: self._get(self.model.obj), lambda self, values: self._set(self.model.obj, values))
+    Start = property(lambda self: self._get(self.model.start),
+                     lambda self, values: self._set(self.model.start, values))
+    LB = property(lambda self: self._get(self.model.lb), lambda self, values: self._set(self.model.lb, values))
+    UB = property(lambda self: self._get(self.model.ub), lambda self, values: self._set(self.model.ub, values))
+
+    def expression(self):
+        columns = self.indices.reshape(-1)
+        rows = np.arange(len(columns))
+        return MatrixExpression(self.model, len(columns), rows, columns, np.ones(len(columns)), np.zeros(len(columns)))
+
+    def __rmatmul__(self, matrix):
+        # One row for a vector (scalar expression), one row per row of a matrix
+        if not sp.issparse(matrix):
+            matrix = np.atleast_2d(np.asarray(matrix, dtype=float))
+        coefficients = sp.coo_matrix(matrix)
+        if coefficients.shape[1] != self.size:
+            raise ValueError("incompatible shapes for matrix multiplication: %s and %s" % (coefficients.shape,
+                                                                                           self.shape))
+        return MatrixExpression(self.model, coefficients.shape[0], coefficients.row,
+                                self.indices.reshape(-1)[coefficients.col], coefficients.data,
+                                np.zeros(coefficients.shape[0]))
+
+    def __add__(self, other):
+        return self.expression() + other
+
+    def __radd__(self, other):
+        return self.expression() + other
+
+    def __sub__(self, other):
+        return self.expression() - other
+
+    def __rsub__(self, other):
+        return other - self.expression()
+
+    def __neg__(self):
+        return -self.expression()
+
+    def __mul__(self, scalar):
+        return self.expression() * scalar
+
+    def __rmul__(self, scalar):
+        return self.expression() * scalar
+
+    def __le__(self, other):
+        return self.expression() <= other
+
+    def __ge__(self, other):
+        return self.expression() >= other
+
+    def __eq__(self, other):
+        return self.expression() == other
+
+    __hash__ = None
+
+class MatrixExpression:
+    """
+    Linear expressions A @ x + b of the variables of a HighsModel, one per row, with A stored in coordinate format.
+    """
+
+    __array_ufunc__ = None
+
+    def __init__(self, model, nb_rows, rows, columns, values, constant):
+        self.model = model
+        self.nb_rows = nb_rows
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.columns = np.asarray(columns, dtype=np.int64)
+        self.values = np.asarray(values, dtype=float)
+        self.constant = np.broadcast_to(np.asarray(constant, dtype=float), (nb_rows,)).copy()
+
+    def _coerce(self, other):
+        if isinstance(other, MatrixVariables):
+            other = other.expression()
+        if isinstance(other, MatrixExpression):
+            if other.nb_rows != self.nb_rows:
+                raise ValueError("incompatible numbers of rows: %d and %d" % (self.nb_rows, other.nb_rows))
+            return other
+        return MatrixExpression(self.model, self.nb_rows, [], [], [], np.asarray(other, dtype=float).reshape(-1))
+
+    def __add__(self, other):
+        other = self._coerce(other)
+        return MatrixExpression(self.model, self.nb_rows, np.concatenate([self.rows, other.rows]),
+                                np.concatenate([self.columns, other.columns]),
+                                np.concatenate([self.values, other.values]), self.constant + other.constant)
+
+    def __radd__(self, other):
+        return self + other
+
+    def __neg__(self):
+        return self * -1
+
+    def __sub__(self, other):
+        return self + -self._coerce(other)
+
+    def __rsub__(self, other):
+        return -self + other
+
+    def __mul__(self, scalar):
+        scalar = float(scalar)
+        return MatrixExpression(self.model, self.nb_rows, self.rows, self.columns, self.values * scalar,
+                                self.constant * scalar)
+
+    def __rmul__(self, scalar):
+        return self * scalar
+
+    def __le__(self, other):
+        return MatrixInequality(self - other, "<")
+
+    def __ge__(self, other):
+        return MatrixInequality(self - other, ">")
+
+    def __eq__(self, other):
+        return MatrixInequality(self - other, "=")
+
+    __hash__ = None
+
+    def matrix(self, nb_columns):
+        return sp.csr_matrix((self.values, (self.rows, self.columns)), shape=(self.nb_rows, nb_columns))
+
+class MatrixInequality:
+    """
+    Constraints expression (sense) 0, before they are added to a model.
+    """
+
+    def __init__(self, expression, sense):
+        self.expression = expression
+        self.sense = sense
+
+class MatrixConstraints:
+    """
+    Constraints of a HighsModel (counterpart of gurobipy.MConstr), whose right-hand side can be changed.
+    """
+
+    def __init__(self, model, rows, sense):
+        self.model = model
+        self.rows = rows
+        self.sense = sense
+
+    @property
+    def RHS(self):
+        bounds = self.model.row_ub if self.sense == "<" else self.model.row_lb
+        return bounds[self.rows].copy()
+
+    @RHS.setter
+    def RHS(self, rhs):
+        if self.sense in ("<", "="):
+            self.model.row_ub[self.rows] = rhs
+        if self.sense in (">", "="):
+            self.model.row_lb[self.rows] = rhs
+
+# -------- HiGHS model -------- #
+
+class HighsParams:
+    """
+    Parameters of a HighsModel: OutputFlag, TimeLimit, MIPGap and Presolve (on unless 0, as for Gurobi) are passed
+    to HiGHS, the others are kept but have no effect.
+    """
+
+    def __init__(self):
+        self.OutputFlag = 1
+        self.TimeLimit = np.inf
+        self.MIPGap = 1e-4
+        # Without presolve, HiGHS returns suboptimal solutions of the Choquet models as optimal
+        self.Presolve = -1
+
+class HighsModel:
+    """
+    Model in matrix form solved by HiGHS (scipy.optimize.milp), with the attributes and methods of gurobipy.Model
+    used by the builders.
+
+    :param name: name of the model
+    :type name: str
+    """
+
+    def __init__(self, name=""):
+        self.ModelName = name
+        self.ModelSense = GRB.MINIMIZE
+        self.Params = HighsParams()
+
+        # Columns
+        self.obj = np.zeros(0)
+        self.lb = np.zeros(0)
+        self.ub = np.zeros(0)
+        self.start = np.full(0, np.nan)
+        self.integrality = np.zeros(0, dtype=np.int64)
+        self.objective_constant = 0
+
+        # Rows, and blocks of the constraint matrix (one per call to addConstr)
+        self.blocks = []
+        self.row_lb = np.zeros(0)
+        self.row_ub = np.zeros(0)
+
+        # Result of the last resolution
+        self.Status = GRB.LOADED
+        self.SolCount = 0
+        self.Runtime = 0
+        self.ObjVal = None
+        self.ObjBound = None
+        self.MIPGap = None
+        self.NodeCount = 0
+        self.solution = np.full(0, np.nan)
+
+    @property
+    def NumVars(self):
+        return len(self.obj)
+
+    @property
+    def NumConstrs(self):
+        return len(self.row_lb)
+
+    @property
+    def NumNZs(self):
+        return sum(len(block.values) for block in self.blocks)
+
+    @property
+    def IsMIP(self):
+        return int(np.any(self.integrality > 0))
+
+    def addMVar(self, shape, lb=0.0, ub=GRB.INFINITY, obj=0.0, vtype=GRB.CONTINUOUS, name=""):
+        size = int(np.prod(shape))
+        indices = np.arange(self.NumVars, self.NumVars + size).reshape(shape)
+
+        if vtype == GRB.BINARY:
+            lb, ub = np.maximum(lb, 0), np.minimum(ub, 1)
+        # GRB.INFINITY (1e100) stands for an infinite bound
+        lb = np.where(np.asarray(lb, dtype=float) <= -GRB.INFINITY, -np.inf, lb)
+        ub = np.where(np.asarray(ub, dtype=float) >= GRB.INFINITY, np.inf, ub)
+
+        self.obj = np.concatenate([self.obj, np.broadcast_to(obj, size)])
+        self.lb = np.concatenate([self.lb, np.broadcast_to(lb, size)])
+        self.ub = np.concatenate([self.ub, np.broadcast_to(ub, size)])
+        self.start = np.concatenate([self.start, np.full(size, np.nan)])
+        self.integrality = np.concatenate([self.integrality, np.full(size, int(vtype in (GRB.BINARY, GRB.INTEGER)))])
+        self.solution = np.concatenate([self.solution, np.full(size, np.nan)])
+
+        return MatrixVariables(self, indices)
+
+    def addVar(self, lb=0.0, ub=GRB.INFINITY, obj=0.0, vtype=GRB.CONTINUOUS, name=""):
+        return self.addMVar((), lb, ub, obj, vtype, name)
+
+    def addConstr(self, inequality, name=""):
+        if not isinstance(inequality, MatrixInequality):
+            raise ValueError("unsupported constraint " + str(inequality))
+
+        expression = inequality.expression
+        rows = np.arange(self.NumConstrs, self.NumConstrs + expression.nb_rows)
+        rhs = -expression.constant
+
+        infinite = np.full(len(rhs), np.inf)
+
+        self.blocks.append(expression)
+        self.row_lb = np.concatenate([self.row_lb, rhs if inequality.sense in (">", "=") else -infinite])
+        self.row_ub = np.concatenate([self.row_ub, rhs if inequality.sense in ("<", "=") else infinite])
+
+        return MatrixConstraints(self, rows, inequality.sense)
+
+    def setObjective(self, expression, sense=None):
+        if isinstance(expression, MatrixVariables):
+            expression = expression.expression()
+        if expression.nb_rows != 1:
+            raise ValueError("the objective must be a scalar expression")
+
+        self.obj = np.zeros(self.NumVars)
+        np.add.at(self.obj, expression.columns, expression.values)
+        self.objective_constant = expression.constant[0]
+        if sense is not None:
+            self.ModelSense = sense
+
+    def setAttr(self, name, variables, values):
+        setattr(fromlist(variables), name, values)
+
+    def setParam(self, name, value):
+        setattr(self.Params, name, value)
+
+    def update(self):
+        pass
+
+    def write(self, filename):
+        print("Error: the HiGHS backend cannot write models, %s was not written." % filename)
+
+    def dispose(self):
+        pass
+
+    def optimize(self, callback=None):
+        """
+        Solves the model with HiGHS (the callback is ignored).
+        """
+
+        start = time.perf_counter()
+
+        constraints = None
+        if self.NumConstrs > 0:
+            matrix = sp.vstack([block.matrix(self.NumVars) for block in self.blocks], format="csr")
+            constraints = LinearConstraint(matrix, self.row_lb, self.row_ub)
+
+        options = {"disp": bool(self.Params.OutputFlag), "mip_rel_gap": self.Params.MIPGap,
+                   "presolve": bool(self.Params.Presolve)}
+        if np.isfinite(self.Params.TimeLimit):
+            options["time_limit"] = self.Params.TimeLimit
+
+        # milp minimises, and ModelSense is 1 to minimise and -1 to maximise
+        result = milp(self.ModelSense * self.obj, integrality=self.integrality, bounds=Bounds(self.lb, self.ub),
+                      constraints=constraints, options=options)
+
+        self.Runtime = time.perf_counter() - start
+        self.Status = HIGHS_STATUS.get(result.status, GRB.NUMERIC)
+        self.NodeCount = getattr(result, "mip_node_count", 0) or 0
+
+        if result.x is None:
+            self.SolCount = 0
+            self.ObjVal = self.ObjBound = self.MIPGap = None
+            self.solution = np.full(self.NumVars, np.nan)
+            return
+
+        self.SolCount = 1
+        self.solution = result.x
+        self.ObjVal = float(self.obj @ result.x + self.objective_constant)
+
+        dual_bound = getattr(result, "mip_dual_bound", None)
+        if self.IsMIP and dual_bound is not None:
+            self.ObjBound = float(self.ModelSense * dual_bound + self.objective_constant)
+            self.MIPGap = float(getattr(result, "mip_gap", 0) or 0)
+        else:
+            self.ObjBound = self.ObjVal
+            self.MIPGap = 0
@@ -0,0 +1,286 @@
+import os
+import csv
+import json
+import time
+import random
+import datetime
+import tempfile
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+import gurobipy as gp
+
+from utils import *
+from OWA import OWA_LP
+from WOWA import WOWA_LP
+from Choquet import choquet_lp, choquet_core_lp
+from runner import run_instances
+from solver_config import SolverConfig
+from telemetry import Telemetry
+
+# -------- Benchmark of a single instance -------- #
+
+# Phases whose wall time is recorded for each instance (build_time includes the presolve of the items and the
+# heuristic MIP start of the function of the model, and solve_time is the Gurobi runtime)
+PHASES = ["generation_time", "build_time", "write_time", "solve_time", "total_time"]
+
+# Finer phases of the construction and resolution, recorded by the telemetry (see telemetry.Telemetry)
+TELEMETRY_PHASES = ["variables_time", "constraints_time", "objective_time", "start_time", "presolve_time",
+                    "root_time", "branching_time"]
+
+# Default grid of the benchmark suite: sizes (n, p) for each model
+DEFAULT_GRID = {
+    "OWA": [(5, 25), (10, 50), (15, 75)],
+    "WOWA": [(5, 25), (8, 40), (10, 50)],
+    "Choquet": [(2, 5), (5, 10), (10, 20)],
+}
+
+def peak_rss():
+    """
+    Peak resident set size of the process, in kilobytes (None if it cannot be measured on this platform).
+    """
+
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+def benchmark_instance(model, n, p, k=None, one_to_one=True, write_lp=True, presolve=True, warm_start=True):
+    """
+    Generates a random instance of the given model and size, solves it with the function of the model (OWA_LP,
+    WOWA_LP, choquet_lp or choquet_core_lp), and records the time taken by each phase along with statistics on the
+    model and its resolution.
+
+    The peak memory of the process only grows, so peak_rss_increase_kb (the increase of the peak during the
+    instance) is only the memory of the instance when it is the first one solved by the process (see run_benchmark).
+
+    :param model: OWA / WOWA / Choquet / Choquet_core (cutting planes on the core, see ChoquetCoreSolver)
+    :param n: number of agents or objectives
+    :param p: number of items or projects
+    :param k: for Choquet, generate k-additive capacities if given
+    :param one_to_one: for OWA and WOWA, indicates whether only one item is to be attributed per agent
+    :param write_lp: also measure the time taken to write the model to a .lp file
+    :param presolve: presolve the items before building the model (see presolve.presolve_items)
+    :param warm_start: for OWA and WOWA, start branch-and-bound from a heuristic allocation
+
+    :type model: str
+    :type n: int
+    :type p: int
+    :type k: int
+    :type one_to_one: bool
+    :type write_lp: bool
+    :type presolve: bool
+    :type warm_start: bool
+
+    :return record: measures for the instance
+    :rtype: dict
+    """
+
+    total_start = time.perf_counter()
+    rss_start = peak_rss()
+
+    # Generation of the instance
+    start = time.perf_counter()
+    if model == "OWA":
+        utilities = generate_OWA_problem(n, p)
+        weights = OWA_weights_generator(n)
+    elif model == "WOWA":
+        utilities = generate_OWA_problem(n, p)
+        importance_weights = WOWA_importance_weights_generator(n)
+        mobius_masses = WOWA_mobius_mass_generator(importance_weights, random.randint(1, 10))
+    elif model in ("Choquet", "Choquet_core"):
+        utilities, costs, mobius_masses = generate_Choquet_problem(n, p, k)
+    else:
+        raise ValueError("unknown model " + str(model))
+    generation_time = time.perf_counter() - start
+
+    # Construction, export (to a file of its own, so that parallel benchmarks do not overwrite each other's)
+    # and resolution of the model
+    telemetry = Telemetry(sample_interval=np.inf)
+    with tempfile.TemporaryDirectory() as directory:
+        config = SolverConfig.production(telemetry=telemetry)
+        if write_lp:
+            config.export = os.path.join(directory, model.lower() + ".lp")
+
+        start = time.perf_counter()
+        if model == "OWA":
+            result = OWA_LP(n, p, utilities, weights, one_to_one, config=config, warm_start=warm_start,
+                            presolve=presolve)
+        elif model == "WOWA":
+            result = WOWA_LP(n, p, utilities, mobius_masses, one_to_one, config=config, warm_start=warm_start,
+                             presolve=presolve)
+        elif model == "Choquet":
+            result = choquet_lp(n, p, costs, utilities, mobius_masses, config=config, presolve=presolve)
+        else:
+            result = choquet_core_lp(n, p, costs, utilities, mobius_masses, config=config, presolve=presolve)
+        elapsed = time.perf_counter() - start
+
+    if len(telemetry.runs) == 0:
+        raise RuntimeError("the %s model of size (%d, %d) was not solved" % (model, n, p))
+    run = telemetry.runs[-1]
+
+    write_time = run.get("export_time", 0) if write_lp else None
+    solve_time = run["runtime"]
+
+    record = {
+        "model": model,
+        "n": n,
+        "p": p,
+        "k": k,
+        "generation_time": generation_time,
+        "build_time": elapsed - solve_time - (write_time or 0),
+        "write_time": write_time,
+        "solve_time": solve_time,
+        "total_time": time.perf_counter() - total_start,
+        "runtime": run["runtime"],
+        "peak_rss_increase_kb": None if rss_start is None else peak_rss() - rss_start,
+        "nb_variables": run["nb_variables"],
+        "nb_constraints": run["nb_constraints"],
+        "nb_nonzeros": run["nb_nonzeros"],
+        "node_count": run["nodes"],
+        "status": run["status"],
+        "objective": result.objective,
+        "mip_gap": result.gap,
+    }
+    record.update({phase: run.get(phase) or 0 for phase in TELEMETRY_PHASES})
+
+    return record
+
+# -------- Benchmark suite -------- #
+
+def run_benchmark(model, sizes, nb_instances=10, k=None, one_to_one=True, seed=0, max_workers=1, write_lp=True,
+                  presolve=True, warm_start=True):
+    """
+    Benchmarks nb_instances random instances of the model for each size (n, p).
+    Each instance is solved in a new worker process (see runner.run_instances), one at a time if max_workers=1,
+    so that its peak memory is measured on its own; the instances only depend on the seed.
+
+    :return records: one record per instance (see benchmark_instance)
+    :rtype: list[dict]
+    """
+
+    arguments = [(model, n, p, k, one_to_one, write_lp, presolve, warm_start) for (n, p) in sizes]
+    results = run_instances(benchmark_instance, arguments, nb_instances, max_workers, seed=seed, isolate=True)
+
+    records = []
+    for size_results in results:
+        for instance_index, record in enumerate(size_results):
+            record["instance"] = instance_index
+            records.append(record)
+
+    return records
+
+def benchmark_suite(grid=DEFAULT_GRID, nb_instances=3, seed=0, max_workers=1, output=None, baseline=None,
+                    tolerance=0.2):
+    """
+    Benchmarks every model of the grid, saves the records, and compares them to a baseline if one is given.
+
+    :param grid: sizes (n, p) to benchmark for each model
+    :param output: base name of the result files (default: benchmark_<date>)
+    :param baseline: path of the JSON results of a previous run to compare to
+    :param tolerance: relative slowdown above which a phase is flagged as a regression
+
+    :return records, regressions: measures of each instance, and the regressions found (see compare_to_baseline)
+    """
+
+    records = []
+    for model, sizes in grid.items():
+        records.extend(run_benchmark(model, sizes, nb_instances, seed=seed, max_workers=max_workers))
+
+    if output is None:
+        output = "benchmark_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    save_results(records, output)
+
+    regressions = []
+    if baseline is not None:
+        regressions = compare_to_baseline(records, load_results(baseline), tolerance)
+
+    return records, regressions
+
+# -------- Results -------- #
+
+def save_results(records, basename):
+    """
+    Saves the records to basename.json (with information on the environment) and basename.csv.
+    """
+
+    metadata = {
+        "date": datetime.datetime.now().isoformat(),
+        "gurobi_version": ".".join(str(v) for v in gp.gurobi.version()),
+        "numpy_version": np.__version__,
+        "nb_cores": os.cpu_count(),
+    }
+    with open(basename + ".json", "w") as file:
+        json.dump({"metadata": metadata, "records": records}, file, indent=1)
+
+    columns = []
+    for record in records:
+        columns.extend(key for key in record if key not in columns)
+    with open(basename + ".csv", "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(records)
+
+def load_results(filepath):
+    """
+    Loads the records saved by save_results in a JSON file.
+    """
+
+    with open(filepath) as file:
+        return json.load(file)["records"]
+
+def summarize(records, metrics=PHASES + ["runtime"]):
+    """
+    Median of each metric over the instances of each (model, n, p).
+
+    :rtype: dict{tuple: dict{str: float}}
+    """
+
+    groups = dict()
+    for record in records:
+        groups.setdefault((record["model"], record["n"], record["p"]), []).append(record)
+
+    summary = dict()
+    for key, group in groups.items():
+        summary[key] = dict()
+        for metric in metrics:
+            values = [record[metric] for record in group if record.get(metric) is not None]
+            summary[key][metric] = float(np.median(values)) if len(values) > 0 else None
+
+    return summary
+
+def compare_to_baseline(records, baseline_records, tolerance=0.2, min_delta=0.01, metrics=PHASES + ["runtime"]):
+    """
+    Flags the metrics whose median over a (model, n, p) is more than (1 + tolerance) times the one of the baseline,
+    ignoring differences smaller than min_delta seconds.
+
+    :return regressions: one dict per regression, with the model, size, metric, baseline and current values
+    :rtype: list[dict]
+    """
+
+    summary = summarize(records, metrics)
+    baseline_summary = summarize(baseline_records, metrics)
+
+    regressions = []
+    for key in summary:
+        if key not in baseline_summary:
+            continue
+        for metric in metrics:
+            current = summary[key][metric]
+            previous = baseline_summary[key][metric]
+            if current is None or previous is None:
+                continue
+            if current > previous * (1 + tolerance) and current - previous > min_delta:
+                regressions.append({"model": key[0], "n": key[1], "p": key[2], "metric": metric,
+                                    "baseline": previous, "current": current})
+                print(f"Regression: {key[0]} n={key[1]} p={key[2]} {metric}: {previous:.4f}s -> {current:.4f}s")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    baseline = "benchmark_baseline.json"
+    benchmark_suite(baseline=baseline if os.path.exists(baseline) else None)
@@ -0,0 +1,140 @@
+import numpy as np
+
+from utils import *
+from OWA import OWASolver
+from WOWA import WOWASolver
+from evaluation import OWA_values, choquet_values
+
+# -------- Breakpoint search over a parameter -------- #
+# The optimal allocation of an OWA or WOWA problem is piecewise constant in alpha. Instead of solving at every
+# value of a grid, the sweep solves at the ends of an interval, locates the value where the two optimal
+# allocations are worth the same by evaluating them (without solving), and solves once at that crossing point:
+# if no other allocation is better there, the crossing is taken as a breakpoint, otherwise the new allocation
+# splits the interval in two and the search continues on both halves.
+
+def breakpoint_sweep(solve, evaluate, alpha_min, alpha_max, tolerance=1e-6, tie_tolerance=1e-6):
+    """
+    Intervals of the parameter on which each allocation is optimal.
+
+    The allocations are always compared through evaluate, never through the objective reported by solve (which
+    may be that of a relaxation, e.g. WOWA_LP with negative Mobius masses). The values are not linear in the
+    parameter (e.g. x^alpha), so the result is not exact: the breakpoints are located by bisection to within
+    tolerance, and an allocation that is only optimal strictly between two solved values whose allocations are
+    optimal at their crossing point can be missed.
+
+    :param solve: function solving the problem for a value of the parameter, returning a SolveResult
+    :param evaluate: function giving the objective of a solution (satisfactions) for a value of the parameter
+    :param alpha_min: lower end of the interval of the parameter
+    :param alpha_max: upper end of the interval of the parameter
+    :param tolerance: precision of the breakpoints (intervals narrower than this are not split any further)
+    :param tie_tolerance: difference of objective below which two solutions are equally good
+
+    :type solve: function
+    :type evaluate: function
+    :type alpha_min: float
+    :type alpha_max: float
+    :type tolerance: float
+    :type tie_tolerance: float
+
+    :return intervals, nb_solves: list of (start, end, result) covering [alpha_min, alpha_max] in increasing order,
+        with result the SolveResult of a value of the interval, and the number of resolutions
+    :rtype: list[tuple[float, float, SolveResult]], int
+    """
+
+    nb_solves = [0]
+
+    def solve_at(alpha):
+        nb_solves[0] += 1
+        result = solve(alpha)
+        if result.solution is None:
+            raise ValueError("no solution found for alpha = %g (status %s)" % (alpha, result.status))
+        return result
+
+    def value(result, alpha):
+        return float(evaluate(result.solution, alpha))
+
+    def split(a, result_a, b, result_b):
+        # One of the allocations is optimal at both ends
+        if value(result_a, b) >= value(result_b, b) - tie_tolerance:
+            return [(a, b, result_a)]
+        if value(result_b, a) >= value(result_a, a) - tie_tolerance:
+            return [(a, b, result_b)]
+
+        # Crossing point of the two allocations, by bisection on the sign of the difference of their values
+        low, high = a, b
+        while high - low > tolerance:
+            middle = (low + high) / 2
+            if value(result_a, middle) >= value(result_b, middle):
+                low = middle
+            else:
+                high = middle
+        crossing = (low + high) / 2
+        if b - a <= tolerance or crossing <= a or crossing >= b:
+            return [(a, crossing, result_a), (crossing, b, result_b)]
+
+        result_crossing = solve_at(crossing)
+        if value(result_crossing, crossing) <= max(value(result_a, crossing), value(result_b, crossing)) \
+                + tie_tolerance:
+            return [(a, crossing, result_a), (crossing, b, result_b)]
+
+        return split(a, result_a, crossing, result_crossing) + split(crossing, result_crossing, b, result_b)
+
+    intervals = split(alpha_min, solve_at(alpha_min), alpha_max, solve_at(alpha_max))
+
+    # Neighbouring intervals of the same allocation
+    merged = [intervals[0]]
+    for start, end, result in intervals[1:]:
+        if np.array_equal(merged[-1][2].solution, result.solution):
+            merged[-1] = (merged[-1][0], end, merged[-1][2])
+        else:
+            merged.append((start, end, result))
+
+    return merged, nb_solves[0]
+
+def OWA_alpha_breakpoints(n, p, utilities, alpha_min=1, alpha_max=10, one_to_one=True, formulation="big_M",
+                          config=None, tolerance=1e-6):
+    """
+    Intervals of alpha on which each allocation is optimal for the OWA with the weights of
+    OWA_weights_generator(n, alpha), solved with a single model (see OWASolver and breakpoint_sweep).
+    Parameters as in OWA_LP.
+
+    :rtype: list[tuple[float, float, SolveResult]], int
+    """
+
+    if config is not None and config.backend != "gurobi":
+        # The weights of OWA_weights_generator are non-increasing
+        formulation = "compact"
+    solver = OWASolver(n, p, utilities, one_to_one, formulation, config)
+
+    def solve(alpha):
+        solver.set_weights(OWA_weights_generator(n, alpha))
+        return solver.solve()
+
+    def evaluate(satisfactions, alpha):
+        return OWA_values(satisfactions, OWA_weights_generator(n, alpha))
+
+    return breakpoint_sweep(solve, evaluate, alpha_min, alpha_max, tolerance)
+
+def WOWA_alpha_breakpoints(n, p, utilities, importance_weights, alpha_min=1, alpha_max=10, one_to_one=True,
+                           config=None, tolerance=1e-6):
+    """
+    Intervals of alpha on which each allocation is optimal for the WOWA with the Mobius masses of
+    WOWA_mobius_mass_generator(importance_weights, alpha), solved with a single model (see WOWASolver and
+    breakpoint_sweep). Parameters as in WOWA_LP.
+    For non-integer alpha, some Mobius masses can be negative and the objective of the model is then only a
+    relaxation: the allocations are compared with their Choquet integral, and may not be optimal.
+
+    :rtype: list[tuple[float, float, SolveResult]], int
+    """
+
+    solver = WOWASolver(n, p, utilities, one_to_one, config)
+
+    def solve(alpha):
+        solver.set_mobius_masses(WOWA_mobius_mass_generator(importance_weights, alpha))
+        return solver.solve()
+
+    def evaluate(satisfactions, alpha):
+        # Same (rounded) Mobius masses as the model
+        return choquet_values(satisfactions, WOWA_mobius_mass_generator(importance_weights, alpha))
+
+    return breakpoint_sweep(solve, evaluate, alpha_min, alpha_max, tolerance)
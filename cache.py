@@ -0,0 +1,206 @@
+import os
+import copy
+import inspect
+import pickle
+import hashlib
+import tempfile
+from collections import OrderedDict
+import numpy as np
+
+from gurobipy import GRB
+
+# -------- Solution cache -------- #
+# The results are addressed by a hash of the content of the instance: the name of the model and all the arguments
+# of its function (utilities, costs, weights or Mobius masses, one_to_one, budget...), whatever their type
+# (list or ndarray, int or float), so that a repeated instance is recognised without solving it again.
+
+def _feed(digest, value, decimals):
+    """
+    Adds a canonical encoding of value to the hash digest.
+    """
+
+    if value is None:
+        digest.update(b"N")
+    elif isinstance(value, str):
+        digest.update(b"S" + value.encode() + b"\0")
+    elif isinstance(value, dict):
+        digest.update(b"D%d:" % len(value))
+        for key, item in sorted(value.items(), key=lambda pair: repr(pair[0])):
+            _feed(digest, key, decimals)
+            _feed(digest, item, decimals)
+    elif isinstance(value, (bool, int, float, list, tuple, np.ndarray, np.number, np.bool_)):
+        try:
+            array = np.asarray(value)
+        except ValueError:  # ragged lists
+            array = np.empty(0, dtype=object)
+        if array.dtype.kind not in "biuf":
+            digest.update(b"L%d:" % len(value))
+            for item in value:
+                _feed(digest, item, decimals)
+        else:
+            # Rounding makes the key insensitive to the last bits of computed weights and masses
+            array = np.ascontiguousarray(np.round(array.astype(np.float64), decimals)) + 0.0
+            digest.update(b"A" + repr(array.shape).encode() + array.tobytes())
+    elif hasattr(value, "__dict__") and not callable(value):
+        # e.g. Choquet_graph.Graph
+        digest.update(b"O" + type(value).__name__.encode())
+        _feed(digest, vars(value), decimals)
+    else:
+        raise TypeError("cannot hash an argument of type " + type(value).__name__)
+
+def instance_key(model, *arguments, decimals=12, **keywords):
+    """
+    Key of an instance: SHA-256 of the model and of the content of its arguments.
+
+    :param model: name of the model, e.g. "OWA"
+    :param arguments: arguments that determine the result (e.g. those of OWA_LP, except config)
+    :param decimals: number of decimals of the numbers taken into account
+    :param keywords: keyword arguments that determine the result
+
+    :raise TypeError: if an argument cannot be hashed (e.g. a function phi)
+    :rtype: str
+    """
+
+    digest = hashlib.sha256()
+    _feed(digest, model, decimals)
+    _feed(digest, list(arguments), decimals)
+    _feed(digest, keywords, decimals)
+
+    return digest.hexdigest()
+
+
+class SolutionCache:
+    """
+    Cache of the optimal results of the solvers, kept in memory with LRU eviction and, if a directory is given,
+    in files shared between processes (one pickle per key, written atomically).
+
+        cache = SolutionCache(directory="solutions")
+        result = cache.solve("OWA", OWA_LP, n, p, utilities, weights, one_to_one=True)
+
+    :param max_size: maximal number of results kept in memory
+    :param directory: directory of the on-disk store (None to only keep the results in memory)
+
+    :type max_size: int
+    :type directory: str
+    """
+
+    def __init__(self, max_size=1024, directory=None):
+        self.max_size = max_size
+        self.directory = directory
+        self.results = OrderedDict()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self.results)
+
+    def __repr__(self):
+        return "SolutionCache(size=%d, hits=%d, disk_hits=%d, misses=%d)" % (len(self), self.hits, self.disk_hits,
+                                                                             self.misses)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pkl")
+
+    def _remember(self, key, result):
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+
+    def get(self, key):
+        """
+        Result stored for the key (a copy, None if there is none), counted as a hit or a miss.
+
+        :rtype: SolveResult
+        """
+
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+        elif self.directory is not None:
+            try:
+                with open(self._path(key), "rb") as file:
+                    result = pickle.load(file)
+                self._remember(key, result)
+                self.disk_hits += 1
+            except (OSError, EOFError, pickle.UnpicklingError):
+                result = None
+
+        if result is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return copy.deepcopy(result)
+
+    def put(self, key, result):
+        """
+        Stores the result if it is optimal (the results of interrupted resolutions depend on their limits).
+        """
+
+        if result is None or result.solution is None or result.status != GRB.OPTIMAL:
+            return
+
+        result = copy.deepcopy(result)
+        self._remember(key, result)
+
+        if self.directory is not None:
+            # Written to a temporary file first, so that the other processes never read a partial file
+            descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as file:
+                pickle.dump(result, file)
+            os.replace(temporary_path, self._path(key))
+
+    def get_or_solve(self, key, solve):
+        """
+        Result stored for the key, or the result of solve() (then stored).
+
+        :param solve: function without arguments returning a SolveResult
+        """
+
+        result = self.get(key)
+        if result is None:
+            result = solve()
+            self.put(key, result)
+
+        return result
+
+    def solve(self, model, function, *arguments, config=None, **keywords):
+        """
+        Result of function(*arguments, config=config, **keywords), taken from the cache if the instance was already
+        solved. Instances whose arguments cannot be hashed are always solved.
+        The key is computed on the arguments bound to the parameters of the function, with their default values,
+        so that the same instance has the same key whether its arguments are given by position or by keyword,
+        or omitted when they have their default value.
+
+        :param model: name of the model, part of the key
+        :param function: solver, e.g. OWA_LP
+        """
+
+        try:
+            bound = inspect.signature(function).bind(*arguments, **keywords)
+            bound.apply_defaults()
+            parameters = {name: value for name, value in bound.arguments.items() if name != "config"}
+            key = instance_key(model, parameters)
+        except TypeError:
+            return function(*arguments, config=config, **keywords)
+
+        return self.get_or_solve(key, lambda: function(*arguments, config=config, **keywords))
+
+    def clear(self):
+        """
+        Empties the memory (the on-disk store is kept) and resets the counters.
+        """
+
+        self.results.clear()
+        self.hits = self.disk_hits = self.misses = 0
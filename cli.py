@@ -0,0 +1,309 @@
+import time
+
+# Start of the process, for the measure of the startup time (see the startup command)
+_START = time.perf_counter()
+
+import os
+import sys
+import ast
+import json
+import argparse
+
+# -------- Command-line entry point -------- #
+# The solver modules (and so gurobipy) and matplotlib are imported by the commands that need them, not at startup,
+# so that a process spawned to solve a single instance only pays for what it uses:
+#
+#   python cli.py solve owa owa_example.txt --alpha 2
+#   python cli.py solve choquet choquet_example.txt --masses 0 0.2 0.3 0.5
+#   python cli.py benchmark --models OWA Choquet --instances 3
+#   python cli.py plot benchmark_20230124_011142.json
+#   python cli.py question 1_1 --arg plot_figures=True
+#   python cli.py startup
+
+# Modules whose import is too slow to be paid by every process
+HEAVY_MODULES = ["gurobipy", "matplotlib"]
+
+# -------- Solve -------- #
+
+def _config(args):
+    from solver_config import SolverConfig
+
+    options = {"backend": args.backend, "time_limit": args.time_limit, "mip_gap": args.mip_gap}
+    return SolverConfig.debug(**options) if args.verbose else SolverConfig.production(**options)
+
+def _print_result(result, args):
+    if args.json:
+        print(json.dumps({
+            "solution": None if result.solution is None else result.solution.tolist(),
+            "objective": result.objective,
+            "bound": result.bound,
+            "gap": result.gap,
+            "status": result.status,
+            "runtime": result.runtime,
+            "build_time": result.build_time,
+        }))
+    elif result.solution is None:
+        print("No solution found (status %s)" % result.status)
+    else:
+        print("Solution:", result.solution)
+        print("Objective: %g" % result.objective)
+        print("Status: %s, runtime: %.4fs" % (result.status, result.runtime))
+
+    return 0 if result.solution is not None else 1
+
+def solve_owa(args):
+    from utils import parse_OWA_problem, OWA_weights_generator
+    from OWA import OWA_LP
+
+    nb_agents, nb_items, utilities = parse_OWA_problem(args.file)
+    weights = OWA_weights_generator(nb_agents, args.alpha)
+    result = OWA_LP(nb_agents, nb_items, utilities, weights, not args.one_to_many, args.formulation, _config(args))
+
+    return _print_result(result, args)
+
+def solve_wowa(args):
+    import numpy as np
+    from utils import parse_OWA_problem, WOWA_mobius_mass_generator
+
+    nb_agents, nb_items, utilities = parse_OWA_problem(args.file)
+    p = np.full(nb_agents, 1 / nb_agents) if args.importance is None else np.array(args.importance)
+    if len(p) != nb_agents:
+        print("Error: %d importance weights given for %d agents." % (len(p), nb_agents))
+        return 2
+
+    if args.compact:
+        from WOWA import WOWA_compact_LP
+        result = WOWA_compact_LP(nb_agents, nb_items, utilities, p, alpha=args.alpha,
+                                 one_to_one=not args.one_to_many, config=_config(args))
+    else:
+        from WOWA import WOWA_LP
+        result = WOWA_LP(nb_agents, nb_items, utilities, WOWA_mobius_mass_generator(p, args.alpha),
+                         not args.one_to_many, _config(args), linking=args.linking)
+
+    return _print_result(result, args)
+
+def solve_choquet(args):
+    import random
+    import numpy as np
+    from utils import parse_Choquet_problem, belief_function_generator
+
+    nb_objectives, nb_projects, utilities, costs = parse_Choquet_problem(args.file)
+    if args.masses is None:
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+        mobius_masses = belief_function_generator(nb_objectives)
+    else:
+        mobius_masses = np.array(args.masses)
+
+    if args.core:
+        from Choquet import choquet_core_lp
+        result = choquet_core_lp(nb_objectives, nb_projects, costs, utilities, mobius_masses, config=_config(args),
+                                 budget=args.budget)
+    else:
+        from Choquet import choquet_lp
+        result = choquet_lp(nb_objectives, nb_projects, costs, utilities, mobius_masses, config=_config(args),
+                            budget=args.budget, linking=args.linking)
+
+    return _print_result(result, args)
+
+def solve_graph(args):
+    import numpy as np
+    from Choquet_graph import choquet_graph_lp
+
+    # JSON file: {"traveling_time": one nb_nodes x nb_nodes matrix per scenario (999 for missing arcs),
+    #             "mobius_masses": dense vector in the order of powerset, "source": 0, "target": last node}
+    with open(args.file) as file:
+        instance = json.load(file)
+    traveling_time = np.array(instance["traveling_time"])
+    result = choquet_graph_lp(len(traveling_time), traveling_time, np.array(instance["mobius_masses"]),
+                              config=_config(args), source=instance.get("source", 0),
+                              target=instance.get("target"), linking=args.linking)
+
+    return _print_result(result, args)
+
+# -------- Benchmark and plots -------- #
+
+def benchmark(args):
+    from benchmark import DEFAULT_GRID, benchmark_suite, summarize
+
+    grid = {model: DEFAULT_GRID[model] for model in args.models}
+    records, regressions = benchmark_suite(grid, args.instances, args.seed, args.workers, args.output, args.baseline,
+                                           args.tolerance)
+
+    for (model, n, p), metrics in summarize(records).items():
+        print(f"{model} n={n} p={p}: " + ", ".join(f"{metric} {value:.4f}" for metric, value in metrics.items()
+                                                   if value is not None))
+    for regression in regressions:
+        print("Regression:", regression)
+
+    return 1 if len(regressions) > 0 else 0
+
+def plot(args):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    # Records saved by benchmark.save_results (read directly, without importing the solvers)
+    with open(args.file) as file:
+        records = json.load(file)["records"]
+
+    runtimes = dict()
+    for record in records:
+        runtimes.setdefault((record.get("model", ""), record["n"]), dict()).setdefault(record["p"], []).append(
+            record[args.metric])
+
+    for (model, n), by_size in sorted(runtimes.items()):
+        sizes = sorted(by_size)
+        plt.plot(sizes, [sum(by_size[p]) / len(by_size[p]) for p in sizes], marker="o", label=f"{model} n={n}")
+    plt.title("Average " + args.metric + " by size")
+    plt.xlabel("Size in number of items or projects p")
+    plt.ylabel(args.metric + " (seconds)")
+    plt.legend()
+
+    output = os.path.splitext(args.file)[0] + "_" + args.metric + ".png" if args.output is None else args.output
+    plt.savefig(output)
+    print("Saved", output)
+
+    return 0
+
+# -------- Experiments -------- #
+
+def question(args):
+    import random
+    import numpy as np
+    import main
+
+    function = getattr(main, "question_" + args.name, None)
+    if function is None:
+        names = sorted(name[len("question_"):] for name in dir(main) if name.startswith("question_"))
+        print("Error: unknown question %s, available: %s" % (args.name, ", ".join(names)))
+        return 2
+
+    keywords = dict()
+    for argument in args.arg:
+        key, value = argument.split("=", 1)
+        keywords[key] = ast.literal_eval(value)
+
+    main.SHOW_FIGURES = not args.no_show
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    function(**keywords)
+
+    return 0
+
+def startup(args):
+    """
+    Measures the wall time of a process that starts, parses its arguments and exits, and the heavy modules it
+    imported on the way.
+    """
+
+    import subprocess
+
+    if args.probe:
+        print(json.dumps({"startup_time": time.perf_counter() - _START,
+                          "heavy_modules": [name for name in HEAVY_MODULES if name in sys.modules]}))
+        return 0
+
+    wall_times = []
+    for i in range(args.runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "startup", "--probe"],
+                                capture_output=True, text=True, check=True).stdout
+        wall_times.append(time.perf_counter() - start)
+    probe = json.loads(output)
+
+    print("Process wall time: mean %.4fs, min %.4fs over %d runs" % (sum(wall_times) / len(wall_times),
+                                                                      min(wall_times), args.runs))
+    print("Imports and argument parsing: %.4fs" % probe["startup_time"])
+    print("Heavy modules imported: %s" % (", ".join(probe["heavy_modules"]) or "none"))
+
+    return 1 if len(probe["heavy_modules"]) > 0 else 0
+
+# -------- Arguments -------- #
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Multi-objective Optimisation")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    # Options of all the resolutions
+    solve_options = argparse.ArgumentParser(add_help=False)
+    solve_options.add_argument("--backend", choices=["gurobi", "highs"], default="gurobi")
+    solve_options.add_argument("--time-limit", type=float, help="maximal time of the resolution (seconds)")
+    solve_options.add_argument("--mip-gap", type=float, help="relative gap at which to stop")
+    solve_options.add_argument("--verbose", action="store_true", help="print the variables and write the model")
+    solve_options.add_argument("--json", action="store_true", help="print the result as JSON")
+
+    solve_parser = commands.add_parser("solve", help="solve an instance")
+    models = solve_parser.add_subparsers(dest="model", required=True)
+
+    owa = models.add_parser("owa", parents=[solve_options], help="OWA allocation (file as owa_example.txt)")
+    owa.add_argument("file")
+    owa.add_argument("--alpha", type=float, default=2, help="weights of OWA_weights_generator")
+    owa.add_argument("--formulation", choices=["big_M", "compact"], default="big_M")
+    owa.add_argument("--one-to-many", action="store_true", help="agents may get several items")
+    owa.set_defaults(handler=solve_owa)
+
+    wowa = models.add_parser("wowa", parents=[solve_options], help="WOWA allocation (file as owa_example.txt)")
+    wowa.add_argument("file")
+    wowa.add_argument("--alpha", type=float, default=2, help="phi(x) = x^alpha")
+    wowa.add_argument("--importance", type=float, nargs="+", help="importance weights p (default: uniform)")
+    wowa.add_argument("--compact", action="store_true", help="use WOWA_compact_LP")
+    wowa.add_argument("--linking", choices=["pairs", "chain"], default="pairs")
+    wowa.add_argument("--one-to-many", action="store_true", help="agents may get several items")
+    wowa.set_defaults(handler=solve_wowa)
+
+    choquet = models.add_parser("choquet", parents=[solve_options],
+                                help="Choquet project selection (file as choquet_example.txt)")
+    choquet.add_argument("file")
+    choquet.add_argument("--masses", type=float, nargs="+",
+                         help="Mobius masses in the order of powerset (default: random belief function)")
+    choquet.add_argument("--seed", type=int, default=0, help="seed of the random belief function")
+    choquet.add_argument("--budget", type=float, help="default: half of the total cost")
+    choquet.add_argument("--core", action="store_true", help="use choquet_core_lp")
+    choquet.add_argument("--linking", choices=["pairs", "chain"], default="pairs")
+    choquet.set_defaults(handler=solve_choquet)
+
+    graph = models.add_parser("graph", parents=[solve_options],
+                              help="robust Choquet shortest path (JSON file with traveling_time and mobius_masses)")
+    graph.add_argument("file")
+    graph.add_argument("--linking", choices=["pairs", "chain"], default="pairs")
+    graph.set_defaults(handler=solve_graph)
+
+    benchmark_parser = commands.add_parser("benchmark", help="run the benchmark suite")
+    benchmark_parser.add_argument("--models", nargs="+", choices=["OWA", "WOWA", "Choquet"],
+                                  default=["OWA", "WOWA", "Choquet"])
+    benchmark_parser.add_argument("--instances", type=int, default=3)
+    benchmark_parser.add_argument("--seed", type=int, default=0)
+    benchmark_parser.add_argument("--workers", type=int, default=1)
+    benchmark_parser.add_argument("--output", help="base name of the result files")
+    benchmark_parser.add_argument("--baseline", help="JSON results of a previous run to compare to")
+    benchmark_parser.add_argument("--tolerance", type=float, default=0.2)
+    benchmark_parser.set_defaults(handler=benchmark)
+
+    plot_parser = commands.add_parser("plot", help="plot saved benchmark results")
+    plot_parser.add_argument("file", help="JSON file saved by the benchmark")
+    plot_parser.add_argument("--metric", default="runtime")
+    plot_parser.add_argument("--output", help="image file (default: next to the results)")
+    plot_parser.set_defaults(handler=plot)
+
+    question_parser = commands.add_parser("question", help="run an experiment of main.py, e.g. 1_1 or 2_3")
+    question_parser.add_argument("name")
+    question_parser.add_argument("--arg", action="append", default=[],
+                                 help="keyword argument of the experiment, e.g. --arg nb_agents_list=[5,10]")
+    question_parser.add_argument("--seed", type=int, default=0)
+    question_parser.add_argument("--no-show", action="store_true", help="only save the figures")
+    question_parser.set_defaults(handler=question)
+
+    startup_parser = commands.add_parser("startup", help="measure the startup time of the command line")
+    startup_parser.add_argument("--runs", type=int, default=10)
+    startup_parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    startup_parser.set_defaults(handler=startup)
+
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import numpy as np
+
+from subsets import *
+
+# -------- Evaluation of candidate solutions -------- #
+# The evaluators take a matrix of satisfaction vectors (one candidate per row, shape (k, n)), or a single vector,
+# and return one value per candidate, without building any model.
+
+# Above this number of criteria, Choquet integrals are computed from the sparse Mobius masses
+# instead of the dense capacity (2^n values)
+MAX_DENSE_CRITERIA = 20
+
+def allocation_satisfactions(allocations, utilities):
+    """
+    Satisfaction of each agent for each allocation.
+
+    :param allocations: binary matrices x (agent i gets item j if x_ij = 1), of shape (k, n, p), or a single one
+    :param utilities: U, of shape (n, p)
+
+    :type allocations: ndarray[int]
+    :type utilities: ndarray[int]
+
+    :return satisfactions: matrix of shape (k, n) (vector of shape (n,) for a single allocation)
+    :rtype: ndarray[float]
+    """
+
+    return np.einsum("...ij,ij->...i", np.asarray(allocations, dtype=float), np.asarray(utilities, dtype=float))
+
+def project_scores(selections, utilities):
+    """
+    Score on each objective of each selection of projects.
+
+    :param selections: binary vectors z (project j is selected if z_j = 1), of shape (k, p), or a single one
+    :param utilities: U, of shape (n, p)
+
+    :type selections: ndarray[int]
+    :type utilities: ndarray[int]
+
+    :return scores: matrix of shape (k, n) (vector of shape (n,) for a single selection)
+    :rtype: ndarray[float]
+    """
+
+    return np.asarray(selections, dtype=float) @ np.asarray(utilities, dtype=float).T
+
+def lorenz_vectors(satisfactions):
+    """
+    Lorenz vector (cumulative sums of the satisfactions in increasing order) of each candidate.
+    """
+
+    return np.cumsum(np.sort(satisfactions, axis=-1), axis=-1)
+
+def OWA_values(satisfactions, weights):
+    """
+    OWA of each candidate.
+
+    :param weights: [w_1, w_2, ..., w_n] in order of increasing ordered components (as in OWA_LP)
+    """
+
+    return np.sort(satisfactions, axis=-1) @ np.asarray(weights, dtype=float)
+
+def WOWA_values(satisfactions, importance_weights, alpha=None, phi=None):
+    """
+    WOWA of each candidate, with phi(x) = x^alpha by default:
+    WOWA(z) = sum_i z_(i) * (phi(p_(i) + ... + p_(n)) - phi(p_(i+1) + ... + p_(n))), z_(1) <= ... <= z_(n).
+    This is the exact value: the Mobius masses of WOWA_mobius_mass_generator are rounded, so the objective of
+    WOWA_LP may differ slightly from it.
+
+    :param importance_weights: vector p of importance weights
+    :param alpha: value to be used in phi
+    :param phi: vectorized convex function on [0, 1] with phi(0) = 0 and phi(1) = 1 (replaces alpha)
+    """
+
+    if phi is None:
+        phi = lambda x: x**alpha
+
+    satisfactions = np.asarray(satisfactions, dtype=float)
+    order = np.argsort(satisfactions, axis=-1)
+    sorted_satisfactions = np.take_along_axis(satisfactions, order, axis=-1)
+
+    # Importance of the agents at least as satisfied as the i-th least satisfied one
+    sorted_importance = np.asarray(importance_weights, dtype=float)[order]
+    upper_importance = np.cumsum(sorted_importance[..., ::-1], axis=-1)[..., ::-1]
+    weights = phi(upper_importance) - phi(np.maximum(upper_importance - sorted_importance, 0))
+
+    return np.sum(sorted_satisfactions * weights, axis=-1)
+
+def choquet_values(satisfactions, mobius_masses, combinations=None):
+    """
+    Choquet integral of each candidate, sum_A m(A) * min_{i in A} z_i.
+
+    Up to MAX_DENSE_CRITERIA criteria, the capacity is computed once with the zeta transform, and each candidate
+    costs a sort: C(z) = sum_i (z_(i) - z_(i-1)) * v({(i), ..., (n)}).
+    Otherwise, the minimum over each subset with a non-zero mass is taken directly.
+
+    :param mobius_masses: either a dense vector of masses (in the order of combinations),
+        or a dict {subset: mass} whose subsets are tuples of elements or bitmasks
+    :param combinations: bitmasks of the subsets of a dense vector of masses (default: powerset_bitmasks(n))
+    """
+
+    satisfactions = np.asarray(satisfactions, dtype=float)
+    n = satisfactions.shape[-1]
+    masks, masses = sparse_mobius_masses(mobius_masses, n, combinations)
+
+    if n > MAX_DENSE_CRITERIA:
+        members = membership_matrix(masks, n)
+        minima = np.where(members, satisfactions[..., None, :], np.inf).min(axis=-1)
+        return minima @ masses
+
+    dense_masses = np.zeros(2**n)
+    np.add.at(dense_masses, masks, masses)
+    capacities = zeta_transform(dense_masses)
+
+    order = np.argsort(satisfactions, axis=-1)
+    sorted_satisfactions = np.take_along_axis(satisfactions, order, axis=-1)
+    increments = np.diff(sorted_satisfactions, axis=-1, prepend=0)
+
+    # Bitmask of the criteria at least as satisfied as the i-th least satisfied one
+    upper_sets = np.cumsum((1 << order)[..., ::-1], axis=-1)[..., ::-1]
+
+    return np.sum(increments * capacities[upper_sets], axis=-1)
+
+# -------- Lorenz dominance -------- #
+
+def lorenz_dominates(a, b, tolerance=1e-9):
+    """
+    Indicates whether a Lorenz-dominates b (L(a) >= L(b) componentwise, with at least one strict inequality).
+    a and b are broadcast against each other, e.g. a[:, None] and b[None, :] give the matrix of all pairs.
+    """
+
+    lorenz_a = lorenz_vectors(a)
+    lorenz_b = lorenz_vectors(b)
+
+    return np.all(lorenz_a >= lorenz_b - tolerance, axis=-1) & np.any(lorenz_a > lorenz_b + tolerance, axis=-1)
+
+def lorenz_dominance_matrix(satisfactions, tolerance=1e-9):
+    """
+    Boolean matrix whose entry (i, j) indicates whether candidate i Lorenz-dominates candidate j.
+    """
+
+    lorenz = lorenz_vectors(satisfactions)
+    weakly = np.all(lorenz[:, None, :] >= lorenz[None, :, :] - tolerance, axis=-1)
+    strictly = np.any(lorenz[:, None, :] > lorenz[None, :, :] + tolerance, axis=-1)
+
+    return weakly & strictly
+
+def lorenz_non_dominated(satisfactions, tolerance=1e-9, chunk_size=1024):
+    """
+    Indicates which candidates are not Lorenz-dominated by any other,
+    comparing chunk_size candidates at a time with all the others to bound the memory used.
+
+    :rtype: ndarray[bool]
+    """
+
+    lorenz = lorenz_vectors(np.atleast_2d(satisfactions))
+    non_dominated = np.ones(len(lorenz), dtype=bool)
+
+    for start in range(0, len(lorenz), chunk_size):
+        chunk = lorenz[start:start + chunk_size]
+        weakly = np.all(lorenz[:, None, :] >= chunk[None, :, :] - tolerance, axis=-1)
+        strictly = np.any(lorenz[:, None, :] > chunk[None, :, :] + tolerance, axis=-1)
+        non_dominated[start:start + chunk_size] = ~np.any(weakly & strictly, axis=0)
+
+    return non_dominated
+
+# -------- Evaluation of a batch -------- #
+
+def evaluate(satisfactions, weights=None, importance_weights=None, alpha=None, phi=None, mobius_masses=None,
+             combinations=None):
+    """
+    Evaluates a batch of candidates with every aggregator whose parameters are given.
+
+    :param satisfactions: satisfaction vectors, of shape (k, n)
+    :param weights: OWA weights
+    :param importance_weights: WOWA importance weights (with alpha or phi)
+    :param mobius_masses: Mobius masses of the Choquet integral (with combinations for a dense vector)
+
+    :return values: "lorenz", "non_dominated", and "OWA", "WOWA", "Choquet" when their parameters are given
+    :rtype: dict{str: ndarray}
+    """
+
+    satisfactions = np.atleast_2d(np.asarray(satisfactions, dtype=float))
+
+    values = {
+        "lorenz": lorenz_vectors(satisfactions),
+        "non_dominated": lorenz_non_dominated(satisfactions),
+    }
+    if weights is not None:
+        values["OWA"] = OWA_values(satisfactions, weights)
+    if importance_weights is not None:
+        values["WOWA"] = WOWA_values(satisfactions, importance_weights, alpha, phi)
+    if mobius_masses is not None:
+        values["Choquet"] = choquet_values(satisfactions, mobius_masses, combinations)
+
+    return values
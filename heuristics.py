@@ -0,0 +1,214 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+# -------- Heuristic allocations -------- #
+# Fast allocations used as MIP starts by OWA_LP and WOWA_LP. An allocation is given by the owner of each item
+# (-1 if it is not attributed), and its value by a function scoring a matrix of satisfaction vectors
+# (one per row), e.g. lambda satisfactions: evaluation.OWA_values(satisfactions, weights).
+
+def maximin_assignment(utilities):
+    """
+    One-to-one assignment maximising the satisfaction of the least satisfied agent (bottleneck assignment),
+    then the total satisfaction among such assignments.
+    The largest feasible threshold is found by binary search, each step being a linear_sum_assignment.
+
+    :param utilities: U, of shape (n, p)
+    :type utilities: ndarray[int]
+
+    :return owners: agent to which each item is attributed (-1 if none)
+    :rtype: ndarray[int]
+    """
+
+    utilities = np.asarray(utilities, dtype=float)
+    n, p = utilities.shape
+
+    thresholds = np.unique(utilities)
+    penalty = np.sum(np.abs(utilities)) + 1
+
+    if n <= p:
+        # Largest threshold t such that every agent can get an item of utility at least t
+        low, high = 0, len(thresholds) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            allowed = utilities >= thresholds[middle]
+            rows, columns = linear_sum_assignment(allowed.astype(float), maximize=True)
+            if np.all(allowed[rows, columns]):
+                low = middle
+            else:
+                high = middle - 1
+        profits = np.where(utilities >= thresholds[low], utilities, utilities - penalty)
+    else:
+        # Some agents get nothing anyway
+        profits = utilities
+
+    rows, columns = linear_sum_assignment(profits, maximize=True)
+
+    owners = np.full(p, -1)
+    owners[columns] = rows
+    return owners
+
+def greedy_allocation(utilities, value_function):
+    """
+    Allocation of every item (several items per agent): the items are attributed by decreasing best utility,
+    each to the agent for which the value of the allocation increases the most.
+
+    :return owners: agent to which each item is attributed
+    :rtype: ndarray[int]
+    """
+
+    utilities = np.asarray(utilities, dtype=float)
+    n, p = utilities.shape
+
+    satisfactions = np.zeros(n)
+    owners = np.full(p, -1)
+    for j in np.argsort(-utilities.max(axis=0), kind="stable"):
+        # Satisfactions if agent i gets the item, for every agent i
+        candidates = satisfactions + np.diag(utilities[:, j])
+        i = np.argmax(value_function(candidates))
+        owners[j] = i
+        satisfactions[i] += utilities[i, j]
+
+    return owners
+
+def local_search(utilities, owners, value_function, one_to_one=True, max_iterations=1000, tolerance=1e-9,
+                 max_swaps=1000, max_work=2 * 10**7):
+    """
+    Best-improvement local search on the value of the allocation.
+    In the one-to-one case, the moves swap the items of two agents or give an agent an unattributed item instead of
+    its own. Otherwise, the moves give an item to another agent or swap two items of different agents (at most
+    max_swaps swaps, drawn at random among the pairs of items, per iteration).
+    All the moves of an iteration are evaluated in a single call to value_function, on a matrix of
+    O(n^2 (n + p)) satisfactions in the one-to-one case and O(n (n p + max_swaps)) otherwise: the search stops
+    once max_work satisfactions have been evaluated, so that its cost stays below that of the resolution it
+    warm-starts on large instances.
+
+    :param utilities: U, of shape (n, p)
+    :param owners: initial allocation (agent to which each item is attributed, -1 if none)
+    :param value_function: function returning the value of each row of a matrix of satisfaction vectors
+    :param one_to_one: indicates whether only one item is to be attributed per agent
+    :param max_swaps: maximal number of swaps of two items evaluated per iteration (not one-to-one)
+    :param max_work: maximal number of satisfactions evaluated by the whole search
+
+    :return owners: improved allocation
+    :rtype: ndarray[int]
+    """
+
+    utilities = np.asarray(utilities, dtype=float)
+    n, p = utilities.shape
+    owners = np.array(owners)
+
+    # Column of zeros for agents without item
+    padded_utilities = np.hstack([utilities, np.zeros((n, 1))])
+
+    work = 0
+    for iteration in range(max_iterations):
+        if work >= max_work:
+            break
+
+        satisfactions = satisfactions_of(utilities, owners)
+        value = value_function(satisfactions[None, :])[0]
+
+        if one_to_one:
+            items = np.full(n, p)
+            items[owners[owners >= 0]] = np.flatnonzero(owners >= 0)
+            free_items = np.flatnonzero(owners < 0)
+
+            # Swaps between agents i and j
+            I, J = np.triu_indices(n, 1)
+            swaps = np.tile(satisfactions, (len(I), 1))
+            swaps[np.arange(len(I)), I] = padded_utilities[I, items[J]]
+            swaps[np.arange(len(I)), J] = padded_utilities[J, items[I]]
+
+            # Agent i takes the free item f
+            A, F = np.repeat(np.arange(n), len(free_items)), np.tile(free_items, n)
+            replacements = np.tile(satisfactions, (len(A), 1))
+            replacements[np.arange(len(A)), A] = utilities[A, F]
+
+            candidates = np.vstack([swaps, replacements])
+        else:
+            # Item j goes to agent k
+            K, F = np.repeat(np.arange(n), p), np.tile(np.arange(p), n)
+            moves = np.tile(satisfactions, (len(K), 1))
+            rows = np.arange(len(K))
+            owned = owners[F] >= 0
+            moves[rows[owned], owners[F][owned]] -= utilities[owners[F][owned], F[owned]]
+            moves[rows, K] += utilities[K, F]
+
+            # Swaps of the items j and l of two agents: all the pairs of items would be O(p^2) candidates,
+            # so at most max_swaps of them are drawn at random
+            if p * (p - 1) // 2 > max_swaps:
+                J, L = np.random.default_rng(iteration).integers(p, size=(2, max_swaps))
+            else:
+                J, L = np.triu_indices(p, 1)
+            different = (owners[J] >= 0) & (owners[L] >= 0) & (owners[J] != owners[L])
+            J, L = J[different], L[different]
+            swaps = np.tile(satisfactions, (len(J), 1))
+            rows = np.arange(len(J))
+            swaps[rows, owners[J]] += utilities[owners[J], L] - utilities[owners[J], J]
+            swaps[rows, owners[L]] += utilities[owners[L], J] - utilities[owners[L], L]
+
+            candidates = np.vstack([moves, swaps])
+
+        if len(candidates) == 0:
+            break
+        values = value_function(candidates)
+        work += candidates.size
+        best = np.argmax(values)
+        if values[best] <= value + tolerance:
+            break
+
+        if one_to_one:
+            if best < len(I):
+                i, j = I[best], J[best]
+                items[i], items[j] = items[j], items[i]
+            else:
+                i, f = A[best - len(I)], F[best - len(I)]
+                items[i] = f
+            owners = np.full(p, -1)
+            owners[items[items < p]] = np.flatnonzero(items < p)
+        elif best < len(K):
+            owners[F[best]] = K[best]
+        else:
+            j, l = J[best - len(K)], L[best - len(K)]
+            owners[j], owners[l] = owners[l], owners[j]
+
+    return owners
+
+def heuristic_allocation(utilities, value_function, one_to_one=True, max_iterations=1000):
+    """
+    Maximin assignment (one-to-one) or greedy allocation, improved by local search on value_function.
+
+    :return x: binary matrix of the allocation, of shape (n, p)
+    :rtype: ndarray[int]
+    """
+
+    if one_to_one:
+        owners = maximin_assignment(utilities)
+    else:
+        owners = greedy_allocation(utilities, value_function)
+
+    owners = local_search(utilities, owners, value_function, one_to_one, max_iterations)
+
+    return allocation_matrix(owners, len(utilities))
+
+def satisfactions_of(utilities, owners):
+    """
+    Satisfaction of each agent for an allocation given by the owner of each item.
+    """
+
+    utilities = np.asarray(utilities, dtype=float)
+    attributed = np.flatnonzero(owners >= 0)
+
+    return np.bincount(owners[attributed], weights=utilities[owners[attributed], attributed],
+                       minlength=len(utilities))
+
+def allocation_matrix(owners, n):
+    """
+    Binary matrix x of shape (n, p) of an allocation given by the owner of each item.
+    """
+
+    x = np.zeros((n, len(owners)), dtype=int)
+    attributed = np.flatnonzero(owners >= 0)
+    x[owners[attributed], attributed] = 1
+
+    return x
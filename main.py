@@ -10,6 +10,27 @@ from WOWA import *
 from Choquet import *
 from Choquet_graph import *
 from utils import *
+from subsets import *
+from runner import *
+from benchmark import *
+from solver_config import *
+from pareto import *
+from cache import *
+from breakpoints import *
+
+# Figures are displayed without blocking; set to False to only save them (e.g. on a server)
+SHOW_FIGURES = True
+
+def show_figures():
+    """
+    Displays the current figures without blocking, or closes them if SHOW_FIGURES is False.
+    """
+
+    if SHOW_FIGURES:
+        plt.show(block=False)
+        plt.pause(0.1)
+    else:
+        plt.close("all")
 
 
 def solve_OWA_problem(filepath=None, nb_agents=None, alpha=None, one_to_one=True, verbose=False):
@@ -31,7 +52,8 @@ def solve_OWA_problem(filepath=None, nb_agents=None, alpha=None, one_to_one=True
         print(utilities)
     # weights = np.array([1/5, 1/5, 1/5, 1/5, 1/5])
     weights = OWA_weights_generator(nb_agents, alpha)
-    solution, runtime = OWA_LP(nb_agents, nb_items, utilities, weights, one_to_one)
+    config = SolverConfig.debug() if verbose else SolverConfig.production()
+    solution = OWA_LP(nb_agents, nb_items, utilities, weights, one_to_one, config=config).solution
 
     if verbose:
         print("____________________________")
@@ -40,11 +62,11 @@ def solve_OWA_problem(filepath=None, nb_agents=None, alpha=None, one_to_one=True
 
         plt.title("Satisfaction of each agent")
         plt.bar(["Agent " + str(i) for i in range(nb_agents)], solution)
-        plt.show()
+        show_figures()
 
         plt.title("Lorenz vector of the OWA solution")
         plt.bar(["Component " + str(i) for i in range(nb_agents)], lorenz_vector(solution))
-        plt.show()
+        show_figures()
 
 
 def question_1_1(alpha_min=1, alpha_max=10, plot_figures=False):
@@ -69,12 +91,13 @@ def question_1_1(alpha_min=1, alpha_max=10, plot_figures=False):
     runtimes = []
     alpha_list = range(alpha_min, alpha_max + 1, (alpha_max + 1 - alpha_min) // 10)
     print(alpha_list)
-    # Experiments
+    # Experiments (the model is built once, only the weights change)
+    solver = OWASolver(nb_agents, nb_items, utilities, one_to_one=True)
+    results = solver.sweep([OWA_weights_generator(nb_agents, alpha) for alpha in alpha_list])
     for exp in range(len(alpha_list)):
         alpha = alpha_list[exp]
-        weights = OWA_weights_generator(nb_agents, alpha)
-        solution, runtime = OWA_LP(nb_agents, nb_items, utilities, weights, one_to_one=True)
-        runtimes.append(runtime)
+        solution = results[exp].solution
+        runtimes.append(results[exp].runtime)
         ax1.bar([i + width + exp * (1 / 12) for i in range(nb_agents)], solution, width=width, color=colours[exp],
                 label="alpha = " + str(alpha))
         ax2.bar([i + width + exp * (1 / 12) for i in range(nb_agents)], lorenz_vector(solution), width=width,
@@ -103,31 +126,92 @@ def question_1_1(alpha_min=1, alpha_max=10, plot_figures=False):
         plt.figure(3)
         plt.plot(alpha_list, runtimes)
         plt.savefig("question_1_1_runtimes.png")
-        plt.show()
+        show_figures()
+
+def question_1_1_breakpoints(alpha_min=1, alpha_max=10):
+    """
+    Intervals of alpha on which each allocation is optimal for the given example, found by a breakpoint search
+    instead of a grid of values of alpha (see breakpoints.OWA_alpha_breakpoints).
+    """
+
+    nb_agents, nb_items, utilities = parse_OWA_problem("owa_example.txt")
+    intervals, nb_solves = OWA_alpha_breakpoints(nb_agents, nb_items, utilities, alpha_min, alpha_max,
+                                                 config=SolverConfig.production())
 
-def question_1_2(nb_agents_list=[5, 10, 15], one_to_one=True):
+    print("____________________________")
+    print("Utilities:", utilities)
+    for start, end, result in intervals:
+        print(f"alpha in [{start:.6f}, {end:.6f}]: satisfactions {result.solution}")
+    print(f"{len(intervals)} allocations found with {nb_solves} resolutions")
+
+
+def question_1_2(nb_agents_list=[5, 10, 15], one_to_one=True, parallel=False, max_workers=None):
     """
     Analysis of execution time for OWA problems of various sizes.
+
+    :param parallel: solve the instances in parallel worker processes (see runner.run_instances)
+    :param max_workers: number of worker processes if parallel (default: number of cores)
     """
 
-    avg_times = [] # average execution time for each pair (n,p)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    records = run_benchmark("OWA", [(nb_agents, 5 * nb_agents) for nb_agents in nb_agents_list], nb_instances=10,
+                            one_to_one=one_to_one, max_workers=max_workers if parallel else 1)
+    save_results(records, "question_1_2_" + timestamp)
+
+    # average execution time for each pair (n,p)
+    avg_times = [np.mean([record["runtime"] for record in records if record["n"] == nb_agents])
+                 for nb_agents in nb_agents_list]
+
+    plt.title("Average execution times for OWA problems of various sizes")
+    plt.xlabel("Size in number of agents n (with nb_items = 5*n)")
+    plt.ylabel("Average Gurobi Runtime for 10 instances (seconds)")
+    plt.plot(nb_agents_list, avg_times)
+    plt.savefig("question_1_2_" + timestamp + ".png")
+    show_figures()
+
+
+def question_1_2_formulations(nb_agents_list=[5, 10, 15], one_to_one=True):
+    """
+    Comparison of the execution times of the big-M and compact OWA formulations on the same instances.
+    """
+
+    formulations = ["big_M", "compact"]
+    avg_times = {formulation: [] for formulation in formulations}
     for nb_agents in nb_agents_list:
         nb_items = 5 * nb_agents
-        times = []
+        times = {formulation: [] for formulation in formulations}
         for i in range(10):
             utilities = generate_OWA_problem(nb_agents, nb_items)
             weights = OWA_weights_generator(nb_agents)
-            solution, runtime = OWA_LP(nb_agents, nb_items, utilities, weights, one_to_one=one_to_one)
-            times.append(runtime)
-        avg_times.append(np.mean(times))
+            values = []
+            for formulation in formulations:
+                result = OWA_LP(nb_agents, nb_items, utilities, weights, one_to_one=one_to_one,
+                                formulation=formulation, config=SolverConfig.production())
+                times[formulation].append(result.runtime)
+                values.append(weights @ np.sort(result.solution))
+            if not np.isclose(values[0], values[1]):
+                print("Warning: the formulations found different OWA values:", values)
+        for formulation in formulations:
+            avg_times[formulation].append(np.mean(times[formulation]))
 
-    np.savetxt("question_1_2_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + ".csv", avg_times)
-    plt.title("Average execution times for OWA problems of various sizes")
+    print("____________________________")
+    for i in range(len(nb_agents_list)):
+        print(f"n={nb_agents_list[i]}: " + ", ".join(f"{formulation} {avg_times[formulation][i]:.4f}s"
+                                                  for formulation in formulations))
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    np.savetxt("question_1_2_formulations_" + timestamp + ".csv",
+               np.column_stack([nb_agents_list] + [avg_times[formulation] for formulation in formulations]),
+               header="nb_agents," + ",".join(formulations), delimiter=",")
+    plt.title("Average execution times of the OWA formulations")
     plt.xlabel("Size in number of agents n (with nb_items = 5*n)")
     plt.ylabel("Average Gurobi Runtime for 10 instances (seconds)")
-    plt.plot(nb_agents_list, avg_times)
-    plt.savefig("question_1_2_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + ".png")
-    plt.show()
+    for formulation in formulations:
+        plt.plot(nb_agents_list, avg_times[formulation], label=formulation)
+    plt.legend()
+    plt.savefig("question_1_2_formulations_" + timestamp + ".png")
+    show_figures()
 
 
 def question_1_3(alpha_list=[2, 5], plot_figures=False):
@@ -163,13 +247,21 @@ def question_1_3(alpha_list=[2, 5], plot_figures=False):
             p_sublist.append(new_p)
         p_list.append(p_sublist)
 
+    # The model is built once, only the Mobius masses change, and the vectors p met several times
+    # (e.g. the uniform one, reached from every extremum) are solved once
+    solver = WOWASolver(nb_agents, nb_items, utilities, one_to_one=True)
+    cache = SolutionCache()
+
     for alpha_i in range(len(alpha_list)):
         alpha = alpha_list[alpha_i]
+        # Mobius masses of every vector p of the sweep, in a single call
+        all_mobius_masses = WOWA_mobius_mass_generator(p_list, alpha)
         for extremum_i in range(nb_agents):
             for exp in range(nb_agents):
                 p = p_list[extremum_i][exp]
-                mobius_masses = WOWA_mobius_mass_generator(p, alpha)
-                solution, runtime = WOWA_LP(nb_agents, nb_items, utilities, mobius_masses, one_to_one=True)
+                mobius_masses = all_mobius_masses[extremum_i][exp]
+                key = instance_key("WOWA", nb_agents, nb_items, utilities, mobius_masses, True)
+                solution = cache.get_or_solve(key, lambda: solver.sweep([mobius_masses])[0]).solution
                 axes[alpha_i][extremum_i].bar([i + width + exp * (1 / 6) for i in range(nb_agents)], solution, width=width, color=colours[exp])
                 print("_______")
                 print("p:", p)
@@ -177,6 +269,7 @@ def question_1_3(alpha_list=[2, 5], plot_figures=False):
 
     print("____________________________")
     print("Utilities:", utilities)
+    print(cache)
 
     if plot_figures:
         for alpha_i in range(len(alpha_list)):
@@ -190,60 +283,82 @@ def question_1_3(alpha_list=[2, 5], plot_figures=False):
 
                 figures[alpha_i].colorbar(mpl.cm.ScalarMappable(norm=norm, cmap=cmap), ax=[axes[alpha_i][extremum_i]], label='step')
             plt.savefig("question_1_3_plot_"+str(alpha_i)+".png")
-        plt.show()
+        show_figures()
 
 
-def question_1_4(nb_agents_list=[5, 10, 15]):
+def question_1_4(nb_agents_list=[5, 10, 15], compact=False, parallel=False, max_workers=None):
     """
     Analysis of execution time for WOWA problems of various sizes.
+
+    :param compact: use the polynomial-size WOWA model built from p and alpha instead of the Mobius masses
+        (with random importance weights, it only approximates the WOWA, see WOWA_compact_LP)
+    :param parallel: solve the instances in parallel worker processes (see runner.run_instances)
+    :param max_workers: number of worker processes if parallel (default: number of cores)
     """
 
-    avg_times = [] # average execution time for each pair (n,p)
-    for nb_agents in nb_agents_list:
-        nb_items = 5 * nb_agents
-        times = []
-        for i in range(10):
-            utilities = generate_OWA_problem(nb_agents, nb_items)
-            p = WOWA_importance_weights_generator(nb_agents)
-            alpha = random.randint(1, 10)
-            mobius_masses = WOWA_mobius_mass_generator(p, alpha)
-            print("Utilities: ", utilities)
-            print("p: ", p)
-            print("alpha: ", alpha)
-            print("mobius_masses: ", mobius_masses)
-            solution, runtime = WOWA_LP(nb_agents, nb_items, utilities, mobius_masses, one_to_one=True)
-            times.append(runtime)
-        avg_times.append(np.mean(times))
-
-    np.savetxt("question_1_4_"+datetime.datetime.now().strftime("%Y%m%d_%H%M%S")+".csv", avg_times)
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    if compact:
+        records = []
+        for nb_agents in nb_agents_list:
+            nb_items = 5 * nb_agents
+            for i in range(10):
+                utilities = generate_OWA_problem(nb_agents, nb_items)
+                p = WOWA_importance_weights_generator(nb_agents)
+                alpha = random.randint(1, 10)
+                print("Utilities: ", utilities)
+                print("p: ", p)
+                print("alpha: ", alpha)
+                result = WOWA_compact_LP(nb_agents, nb_items, utilities, p, alpha=alpha, one_to_one=True,
+                                         config=SolverConfig.production())
+                records.append({"model": "WOWA_compact", "n": nb_agents, "p": nb_items, "instance": i,
+                                "runtime": result.runtime})
+    else:
+        records = run_benchmark("WOWA", [(nb_agents, 5 * nb_agents) for nb_agents in nb_agents_list], nb_instances=10,
+                                max_workers=max_workers if parallel else 1)
+    save_results(records, "question_1_4_" + timestamp)
+
+    # average execution time for each pair (n,p)
+    avg_times = [np.mean([record["runtime"] for record in records if record["n"] == nb_agents])
+                 for nb_agents in nb_agents_list]
+
     plt.title("Average execution times for WOWA problems of various sizes")
     plt.xlabel("Size in number of agents n (with nb_items = 5*n)")
     plt.ylabel("Gurobi Runtime (seconds)")
     plt.plot(nb_agents_list, avg_times)
-    plt.savefig("question_1_4_"+datetime.datetime.now().strftime("%Y%m%d_%H%M%S")+".png")
-    plt.show()
+    plt.savefig("question_1_4_" + timestamp + ".png")
+    show_figures()
 
 
-def question_2_2(nb_tests=10):
+def question_2_2(nb_tests=10, use_front=True):
     """
     Analysis of some solutions found for the given Choquet example using the Choquet integral.
+
+    :param use_front: score the Pareto front of the instance (computed once) instead of solving with Gurobi
     """
 
     filepath = "choquet_example.txt"
     nb_objectives, nb_projects, utilities, costs = parse_Choquet_problem(filepath)
 
-    all_mobius_masses = []
+    if use_front:
+        solver = pareto_front(utilities, costs)
+    else:
+        # The model is built once, only the Mobius masses change
+        solver = ChoquetSolver(nb_objectives, nb_projects, costs, utilities)
+
+    all_mobius_masses = [belief_function_generator(nb_objectives) for i in range(nb_tests)]
     all_solutions = []
     all_times = []
-    for i in range(nb_tests):
-        mobius_masses = belief_function_generator(nb_objectives)
-        solution, time = choquet_lp(nb_objectives, nb_projects, costs, utilities, mobius_masses)
-        all_mobius_masses.append(mobius_masses)
-        all_solutions.append(solution)
-        all_times.append(time)
+    for result in solver.sweep(all_mobius_masses):
+        all_solutions.append(result.solution)
+        all_times.append(result.runtime)
 
     max_mean_mobius_masses = np.array([0, 0.5, 0.5, 0])
-    max_mean_solution, time = choquet_lp(nb_objectives, nb_projects, costs, utilities, mobius_masses)
+    if use_front:
+        max_mean_solution = solver.solve(max_mean_mobius_masses).solution
+    else:
+        solver.set_mobius_masses(max_mean_mobius_masses)
+        max_mean_solution = solver.solve().solution
 
     np.set_printoptions(formatter={'float': lambda x: "{0:0.3f}".format(x)})
     print("____________ Question 2.2 ____________")
@@ -264,49 +379,42 @@ def question_2_2(nb_tests=10):
     print("\nMean execution time: ", mean(all_times))
 
 
-def question_2_3(n_list=[2, 5, 10], p_list=[5, 10, 15, 20]):
+def question_2_3(n_list=[2, 5, 10], p_list=[5, 10, 15, 20], k=None, parallel=False, max_workers=None,
+                 model="Choquet"):
     """
     Analysis of execution time for Choquet problems of various sizes.
 
     :param n_list: list of nb_objectives to test
     :param p_list: list of nb_projects to test
+    :param k: if given, k-additive capacities are generated instead of general belief functions
+    :param parallel: solve the instances in parallel worker processes (see runner.run_instances)
+    :param max_workers: number of worker processes if parallel (default: number of cores)
+    :param model: "Choquet" (one variable per subset), or "Choquet_core" (cuts on the core of the capacity,
+        whose size does not depend on the number of subsets)
     
     :type n_list: list[int]
     :type p_list: list[int]
+    :type k: int
+    :type parallel: bool
+    :type max_workers: int
+    :type model: str
     """
     
     nb_instances = 10  # nombre de matrices à générer aléatoirement
     dict_mean_time = {}  # dictionnaire du temps moyen d'exécution pour un couple (n,p)
 
-    f = open("question_2_3.txt", "w")
-
     print("========== (2.3) START ==========")
 
-    for n in n_list:
-        for p in p_list:
-            list_times = []  # liste des temps d'exécution pour les instances de taille (n, p)
-
-            # générer toutes les combinaisons de projets possibles
-            objectives_list = [i for i in range(n)]
-            combinations = powerset(objectives_list)
+    # génération et optimisation de l'intégrale de choquet pour toutes les tailles (n, p)
+    sizes = [(n, p) for n in n_list for p in p_list]
+    records = run_benchmark(model, sizes, nb_instances, k=k, max_workers=max_workers if parallel else 1)
 
-            for i in range(nb_instances):
-                print(f"---------- n={n} p={p} u={i} ----------")
-                
-                utilities, costs, mobius_masses = generate_Choquet_problem(n, p)
+    # enregistrer les mesures dans un fichier
+    save_results(records, "question_2_3")
 
-                # optimisation de l'intégrale de choquet
-                solution, time = choquet_lp(n, p, costs, utilities, mobius_masses, combinations)
-
-                # ajout du temps d'exécution dans la liste
-                list_times.append(time)
-
-            # ajout de la moyenne du temps d'exécution pour le couple (n, p)
-            dict_mean_time[(n, p)] = mean(list_times)
-
-            # enregistrer la valeur dans un fichier
-            f.write(str(n) + "," + str(p) + "," + str(dict_mean_time[(n, p)]) + "\n")
-            print(f"Temps d'exécution moyen pour ({n}, {p}) : {dict_mean_time[(n, p)]}")
+    # moyenne du temps d'exécution pour chaque couple (n, p)
+    for (n, p) in sizes:
+        dict_mean_time[(n, p)] = mean([record["runtime"] for record in records if (record["n"], record["p"]) == (n, p)])
 
     print("========== (2.3) END ==========")
 
@@ -316,7 +424,12 @@ def question_2_3(n_list=[2, 5, 10], p_list=[5, 10, 15, 20]):
         for p in p_list:
             print(f"({n}, {p}) : {dict_mean_time[(n, p)]}")
 
-    f.close()
+    # répartition moyenne du temps entre la construction du modèle et les phases de la résolution
+    print("Temps moyen par phase : ")
+    for (n, p) in sizes:
+        size_records = [record for record in records if (record["n"], record["p"]) == (n, p)]
+        print(f"({n}, {p}) : " + ", ".join(f"{phase} {mean([record[phase] for record in size_records]):.4f}"
+                                           for phase in TELEMETRY_PHASES))
 
     plt.title("Average execution times for Choquet problems of various sizes")
     plt.xlabel("Size in number of projects p")
@@ -325,7 +438,7 @@ def question_2_3(n_list=[2, 5, 10], p_list=[5, 10, 15, 20]):
         plt.plot(p_list, [dict_mean_time[(n, p)] for p in p_list])
     plt.legend([str(i)+" objectives" for i in n_list])
     plt.savefig("question_2_3_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + "_obj.png")
-    plt.show()
+    show_figures()
     plt.clf()
 
     plt.title("Average execution times for Choquet problems of various sizes")
@@ -335,27 +448,59 @@ def question_2_3(n_list=[2, 5, 10], p_list=[5, 10, 15, 20]):
         plt.plot(n_list, [dict_mean_time[(n, p)] for n in n_list])
     plt.legend([str(i) + " projects" for i in p_list])
     plt.savefig("question_2_3_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + "_proj.png")
-    plt.show()
+    show_figures()
 
 
-def plot_question_2_3():
-    f = open("question_2_3.txt", "r")
-    lines = f.readlines()
+def question_2_3_linking(n_list=[5, 10, 15], p=20, nb_instances=10):
+    """
+    Comparison of the pairwise and chained constraints linking the variables y_A to the scores
+    (see Choquet.MobiusSolver) on the same Choquet instances: number of constraints, build and solve times.
+    """
+
+    linkings = ["pairs", "chain"]
+    for n in n_list:
+        nb_constraints = {linking: 0 for linking in linkings}
+        build_times = {linking: [] for linking in linkings}
+        runtimes = {linking: [] for linking in linkings}
+        for i in range(nb_instances):
+            utilities, costs, mobius_masses = generate_Choquet_problem(n, p)
+            values = []
+            for linking in linkings:
+                solver = ChoquetSolver(n, p, costs, utilities, config=SolverConfig.production(), linking=linking)
+                solver.set_mobius_masses(mobius_masses)
+                result = solver.solve()
+                nb_constraints[linking] = solver.m.NumConstrs
+                build_times[linking].append(result.build_time)
+                runtimes[linking].append(result.runtime)
+                values.append(result.objective)
+            if not np.isclose(values[0], values[1]):
+                print("Warning: the linkings found different Choquet values:", values)
+
+        print(f"n={n}, p={p}: " + ", ".join(f"{linking} {nb_constraints[linking]} constraints, "
+                                           f"build {np.mean(build_times[linking]):.4f}s, "
+                                           f"solve {np.mean(runtimes[linking]):.4f}s" for linking in linkings))
+
+
+def plot_question_2_3(filepath="question_2_3.json"):
+    """
+    Plots the average runtimes of the results saved by question_2_3.
+    """
+
+    records = load_results(filepath)
 
     n_list = []
     p_list = []
     runtimes = {}
 
-    for line in lines:
-        split_line = line.strip("\n").split(",")
-        n = int(split_line[0])
-        p = int(split_line[1])
-        time = float(split_line[2])
+    for record in records:
+        n = record["n"]
+        p = record["p"]
         if n not in n_list:
             n_list.append(n)
         if p not in p_list:
             p_list.append(p)
-        runtimes[(n, p)] = time
+        runtimes.setdefault((n, p), []).append(record["runtime"])
+    runtimes = {size: mean(times) for size, times in runtimes.items()}
 
     plt.title("Average execution times for Choquet problems of various sizes")
     plt.xlabel("Size in number of objectives n")
@@ -374,8 +519,6 @@ def plot_question_2_3():
     plt.legend([str(i) + " objectives" for i in n_list])
     plt.savefig("question_2_3_times_size_objectives.png")
 
-    f.close()
-
 def question_graph():
 
     n = 2 # Number of scenarios (number of objectives)
@@ -397,28 +540,22 @@ def question_graph():
 
     mobius_masses = np.array([0, 1/3, 1/3, 1/3])
 
-    solution, runtime = choquet_graph_lp(n, np.array(traveling_time), mobius_masses)
+    graph = Graph.from_dense(traveling_time)
+    result = choquet_graph_lp(n, graph, mobius_masses, config=SolverConfig.debug())
+
+    print("Path: ", [(graph.tails[arc], graph.heads[arc]) for arc in np.flatnonzero(result.solution > 0.5)])
 
-    print(solution)
+    # Same problem with the label-setting algorithm
+    result = choquet_shortest_path(graph, mobius_masses)
+    print("Path (label setting): ", [(graph.tails[arc], graph.heads[arc]) for arc in np.flatnonzero(result.solution)])
+    print("Traveling times: ", -result.variables["s"], "Obj: ", result.objective)
 
 # -------- Main -------- #
 
 if __name__ == "__main__":
-    print("Multi-objective Optimisation")
-
-    seed = 0
-    random.seed(seed)
-
-    # solve_OWA_problem("owa_example.txt", alpha=1, verbose=True)
-    # solve_OWA_problem()
-    # question_1_1(alpha_max=10, plot_figures=True)
-    # question_1_2([i for i in range(3, 30)])
-    # question_1_2(one_to_one=False)
-    # question_1_3(plot_figures=True)
-    # question_1_4()
-
-    # question_2_2(10)
-    # question_2_3()
-    # plot_question_2_3()
+    # The experiments are chosen on the command line, e.g. python main.py question 1_1 (see cli.py, which also
+    # solves single instances without importing this module and matplotlib)
+    import sys
+    from cli import main
 
-    # question_graph()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,167 @@
+import time
+from collections import OrderedDict
+import numpy as np
+
+from gurobipy import GRB
+
+from evaluation import choquet_values
+from solver_config import SolveResult
+
+# -------- Pareto front of the project selection problem -------- #
+# Every Choquet integral (of a monotone capacity) is maximised by a selection of projects whose scores are
+# Pareto-optimal, so once the front of an instance (utilities, costs, budget) is known, the optimal selection for any
+# capacity is found by scoring the front with evaluation.choquet_values instead of solving choquet_lp.
+
+# Fronts already computed, by instance, the least recently used being evicted beyond MAX_CACHED_FRONTS
+# (see pareto_front)
+FRONT_CACHE = OrderedDict()
+MAX_CACHED_FRONTS = 32
+
+def non_dominated(scores, costs=None, chunk_size=256):
+    """
+    Indicates which labels are not dominated by any other: a label dominates another if its scores are at least as
+    high and its cost at most as high, one of them strictly (of identical labels, only the first one is kept).
+
+    The labels are sorted by decreasing scores (lexicographically) and increasing cost, so that a label can only be
+    dominated by a label before it, and then by one of the non-dominated labels before it: each chunk of chunk_size
+    labels is only compared with the front found so far and with itself.
+
+    :param scores: scores of each label on each objective, of shape (L, n)
+    :param costs: cost of each label (ignored if None)
+
+    :rtype: ndarray[bool]
+    """
+
+    scores = np.asarray(scores, dtype=float)
+    costs = np.zeros(len(scores)) if costs is None else np.asarray(costs, dtype=float)
+
+    # Stable sort, so that identical labels stay in their order
+    order = np.lexsort((costs,) + tuple(-scores[:, i] for i in reversed(range(scores.shape[1]))))
+    scores, costs = scores[order], costs[order]
+
+    keep = np.zeros(len(scores), dtype=bool)
+    front = np.zeros(0, dtype=int)
+
+    for start in range(0, len(scores), chunk_size):
+        chunk = np.arange(start, min(start + chunk_size, len(scores)))
+        candidates = np.concatenate([front, chunk])
+        # Entry (a, b): the candidate a weakly dominates the label b of the chunk
+        weakly = (np.all(scores[candidates, None, :] >= scores[None, chunk, :], axis=-1)
+                  & (costs[candidates, None] <= costs[None, chunk]))
+        strictly = (np.any(scores[candidates, None, :] > scores[None, chunk, :], axis=-1)
+                    | (costs[candidates, None] < costs[None, chunk]))
+        earlier = candidates[:, None] < chunk[None, :]
+        keep[chunk] = ~np.any(weakly & (strictly | earlier), axis=0)
+        front = np.concatenate([front, chunk[keep[chunk]]])
+
+    unsorted_keep = np.zeros(len(scores), dtype=bool)
+    unsorted_keep[order] = keep
+
+    return unsorted_keep
+
+class ParetoFront:
+    """
+    Pareto-optimal selections of projects of an instance, with their scores and costs.
+
+    :param selections: binary matrix with one selection of projects per row
+    :param scores: scores of each selection on each objective
+    :param costs: cost of each selection
+    :param build_time: time taken to compute the front (seconds)
+    """
+
+    def __init__(self, selections, scores, costs, build_time=None):
+        self.selections = selections
+        self.scores = scores
+        self.costs = costs
+        self.build_time = build_time
+
+    def __len__(self):
+        return len(self.selections)
+
+    def solve(self, mobius_masses, combinations=None):
+        """
+        Best selection of the front for the Choquet integral with the given Mobius masses (as in choquet_lp).
+
+        :rtype: SolveResult
+        """
+
+        start = time.perf_counter()
+        values = choquet_values(self.scores, mobius_masses, combinations)
+        best = np.argmax(values)
+        runtime = time.perf_counter() - start
+
+        return SolveResult(self.selections[best], values[best], runtime, GRB.OPTIMAL, self.build_time,
+                           {"z": self.selections[best], "s": self.scores[best]}, bound=values[best], gap=0)
+
+    def sweep(self, all_mobius_masses, combinations=None):
+        """
+        Best selection of the front for each vector of Mobius masses.
+
+        :return results: list of results (see solve) for each vector of Mobius masses
+        """
+
+        return [self.solve(mobius_masses, combinations) for mobius_masses in all_mobius_masses]
+
+def pareto_front(utilities, costs, budget=None, use_cache=True):
+    """
+    Pareto front of the selections of projects within the budget, maximising the score on each objective.
+
+    Dynamic program over the projects: the labels (selections of the projects seen so far) are extended with the
+    next project when it fits in the budget, and the labels dominated in (scores, cost) are discarded, since
+    any completion of them is dominated by the same completion of their dominant. The front is then filtered
+    on the scores alone. The size of the front can grow quickly with the number of objectives.
+
+    :param utilities: U, of shape (n, p)
+    :param costs: costs for each project (integers)
+    :param budget: maximal cost of a selection (default: half of the total cost, as in ChoquetSolver)
+    :param use_cache: return the front computed earlier for the same instance if there is one
+        (among the MAX_CACHED_FRONTS most recently used)
+
+    :type utilities: ndarray[int]
+    :type costs: ndarray[int]
+    :type budget: int
+    :type use_cache: bool
+
+    :rtype: ParetoFront
+    """
+
+    utilities = np.asarray(utilities)
+    costs = np.asarray(costs)
+    if budget is None:
+        budget = sum(costs) / 2
+
+    key = (utilities.shape, utilities.tobytes(), costs.tobytes(), float(budget))
+    if use_cache and key in FRONT_CACHE:
+        FRONT_CACHE.move_to_end(key)
+        return FRONT_CACHE[key]
+
+    build_start = time.perf_counter()
+
+    n, p = utilities.shape
+
+    # Labels: selection, score on each objective and cost (starting from the empty selection)
+    selections = np.zeros((1, p), dtype=int)
+    scores = np.zeros((1, n), dtype=utilities.dtype)
+    label_costs = np.zeros(1, dtype=costs.dtype)
+
+    for j in range(p):
+        fits = label_costs + costs[j] <= budget
+        extended = selections[fits].copy()
+        extended[:, j] = 1
+
+        selections = np.vstack([selections, extended])
+        scores = np.vstack([scores, scores[fits] + utilities[:, j]])
+        label_costs = np.concatenate([label_costs, label_costs[fits] + costs[j]])
+
+        keep = non_dominated(scores, label_costs)
+        selections, scores, label_costs = selections[keep], scores[keep], label_costs[keep]
+
+    keep = non_dominated(scores)
+    front = ParetoFront(selections[keep], scores[keep], label_costs[keep], time.perf_counter() - build_start)
+
+    if use_cache:
+        FRONT_CACHE[key] = front
+        while len(FRONT_CACHE) > MAX_CACHED_FRONTS:
+            FRONT_CACHE.popitem(last=False)
+
+    return front
@@ -0,0 +1,166 @@
+import time
+import numpy as np
+
+# -------- Presolve -------- #
+# Removes the projects (Choquet) or items (OWA, WOWA) that an optimal solution can do without, before the model is
+# built, and maps the solution of the reduced instance back to the original indices.
+# Only reductions that keep an optimal solution are made, for aggregators that are non-decreasing in the scores
+# (non-negative OWA weights, capacities): a column j is dominated by a column k if k is at least as good for every
+# agent/objective (and at most as costly), ties being broken by index. If j has at least as many dominators as the
+# maximal number of columns of a solution, one of them is unused in any solution containing j, and can replace it.
+
+class Presolve:
+    """
+    Reduction of an instance: kept columns (projects or items) and number of columns removed for each reason.
+
+    :param nb_columns: number of columns of the original instance
+    :param kept: indices of the columns kept, in increasing order
+    :param removed: number of columns removed for each reason
+    :param runtime: time taken by the presolve (seconds)
+    """
+
+    def __init__(self, nb_columns, kept, removed, runtime=None):
+        self.nb_columns = nb_columns
+        self.kept = kept
+        self.removed = removed
+        self.runtime = runtime
+
+    @property
+    def nb_removed(self):
+        return self.nb_columns - len(self.kept)
+
+    def __repr__(self):
+        details = ", ".join("%d %s" % (number, reason) for reason, number in self.removed.items() if number > 0)
+        return "Presolve: removed %d of %d columns%s" % (self.nb_removed, self.nb_columns,
+                                                          " (" + details + ")" if details else "")
+
+    def restore(self, values):
+        """
+        Maps values of the reduced instance (one per kept column, along the last axis) back to the original columns,
+        with 0 for the removed ones.
+        """
+
+        values = np.asarray(values)
+        restored = np.zeros(values.shape[:-1] + (self.nb_columns,), dtype=values.dtype)
+        restored[..., self.kept] = values
+
+        return restored
+
+    def restore_incumbents(self, config):
+        """
+        Copy of the solver configuration whose incumbent callback receives solutions mapped back to the original
+        columns (for solutions indexed by column, e.g. selected projects).
+        """
+
+        if config.on_incumbent is None:
+            return config
+
+        on_incumbent = config.on_incumbent
+        return config.copy(on_incumbent=lambda solution, objective, bound, runtime:
+                           on_incumbent(self.restore(solution), objective, bound, runtime))
+
+    def restore_result(self, result, names, solution=False):
+        """
+        Maps the given variables (and the solution if solution is True) of a SolveResult back to the original columns.
+        """
+
+        result.presolve = self
+        if result.solution is None:
+            return result
+
+        if solution:
+            result.solution = self.restore(result.solution)
+        for name in names:
+            if name in result.variables:
+                result.variables[name] = self.restore(result.variables[name])
+
+        return result
+
+def dominator_counts(utilities, costs=None, chunk_size=256):
+    """
+    Number of columns that dominate each column: at least as good on every row, at most as costly,
+    and strictly better somewhere or of smaller index.
+
+    :param utilities: U, of shape (n, p)
+    :param costs: cost of each column (ignored if None)
+
+    :rtype: ndarray[int]
+    """
+
+    columns = np.asarray(utilities, dtype=float).T
+    p = len(columns)
+    costs = np.zeros(p) if costs is None else np.asarray(costs, dtype=float)
+    indices = np.arange(p)
+
+    counts = np.zeros(p, dtype=np.int64)
+    for start in range(0, p, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        # Entry (k, j): column k dominates the column j of the chunk
+        weakly = (np.all(columns[:, None, :] >= columns[None, chunk, :], axis=-1)
+                  & (costs[:, None] <= costs[None, chunk]))
+        strictly = (np.any(columns[:, None, :] > columns[None, chunk, :], axis=-1)
+                    | (costs[:, None] < costs[None, chunk]))
+        earlier = indices[:, None] < indices[None, chunk]
+        counts[chunk] = np.sum(weakly & (strictly | earlier), axis=0)
+
+    return counts
+
+def presolve_projects(utilities, costs, budget):
+    """
+    Removes the projects that do not fit in the budget, that are worth nothing, or that are dominated by at least as
+    many projects as a selection can contain.
+
+    :type utilities: ndarray[int]
+    :type costs: ndarray[int]
+    :type budget: float
+
+    :return utilities, costs, presolve: reduced instance and its reduction
+    :rtype: ndarray[int], ndarray[int], Presolve
+    """
+
+    start = time.perf_counter()
+
+    utilities = np.asarray(utilities)
+    costs = np.asarray(costs)
+    p = len(costs)
+
+    too_expensive = costs > budget
+    worthless = np.all(utilities <= 0, axis=0) & ~too_expensive
+
+    # Maximal number of projects of a selection: the cheapest ones
+    capacity = np.searchsorted(np.cumsum(np.sort(costs)), budget, side="right")
+    dominated = (dominator_counts(utilities, costs) >= max(capacity, 1)) & ~too_expensive & ~worthless
+
+    kept = np.flatnonzero(~(too_expensive | worthless | dominated))
+    presolve = Presolve(p, kept, {"too expensive": int(np.sum(too_expensive)), "worthless": int(np.sum(worthless)),
+                                  "dominated": int(np.sum(dominated))}, time.perf_counter() - start)
+
+    return utilities[:, kept], costs[kept], presolve
+
+def presolve_items(utilities, one_to_one=True):
+    """
+    Removes the items that no agent values, and in the one-to-one case the items dominated by at least n items
+    (at most n items are attributed).
+
+    :type utilities: ndarray[int]
+    :type one_to_one: bool
+
+    :return utilities, presolve: reduced instance and its reduction
+    :rtype: ndarray[int], Presolve
+    """
+
+    start = time.perf_counter()
+
+    utilities = np.asarray(utilities)
+    n, p = utilities.shape
+
+    worthless = np.all(utilities <= 0, axis=0)
+    dominated = np.zeros(p, dtype=bool)
+    if one_to_one:
+        dominated = (dominator_counts(utilities) >= n) & ~worthless
+
+    kept = np.flatnonzero(~(worthless | dominated))
+    presolve = Presolve(p, kept, {"worthless": int(np.sum(worthless)), "dominated": int(np.sum(dominated))},
+                        time.perf_counter() - start)
+
+    return utilities[:, kept], presolve
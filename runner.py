@@ -0,0 +1,125 @@
+import os
+import random
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+import gurobipy as gp
+
+from utils import *
+from OWA import OWA_LP
+from WOWA import WOWA_LP
+from Choquet import choquet_lp
+from solver_config import SolverConfig
+
+# -------- Instances -------- #
+# Each function generates a random instance of the given size (with the random generators seeded by the runner),
+# solves it and returns the runtime of the solver. The backend (see SolverConfig) can be chosen with
+# functools.partial, e.g. partial(OWA_instance, backend="highs") to run without Gurobi licenses.
+
+def OWA_instance(nb_agents, one_to_one=True, backend="gurobi"):
+    nb_items = 5 * nb_agents
+    utilities = generate_OWA_problem(nb_agents, nb_items)
+    weights = OWA_weights_generator(nb_agents)
+    result = OWA_LP(nb_agents, nb_items, utilities, weights, one_to_one=one_to_one,
+                    config=SolverConfig.production(backend=backend))
+    return result.runtime
+
+def WOWA_instance(nb_agents, backend="gurobi"):
+    nb_items = 5 * nb_agents
+    utilities = generate_OWA_problem(nb_agents, nb_items)
+    p = WOWA_importance_weights_generator(nb_agents)
+    alpha = random.randint(1, 10)
+    mobius_masses = WOWA_mobius_mass_generator(p, alpha)
+    result = WOWA_LP(nb_agents, nb_items, utilities, mobius_masses, one_to_one=True,
+                     config=SolverConfig.production(backend=backend))
+    return result.runtime
+
+def Choquet_instance(n, p, k=None, backend="gurobi"):
+    utilities, costs, mobius_masses = generate_Choquet_problem(n, p, k)
+    result = choquet_lp(n, p, costs, utilities, mobius_masses, config=SolverConfig.production(backend=backend))
+    return result.runtime
+
+# -------- Runner -------- #
+
+def instance_seed(seed, size_index, instance_index):
+    """
+    Seed of an instance, which only depends on its position in the experiment (not on the worker that runs it).
+    """
+
+    return int(np.random.SeedSequence(seed, spawn_key=(size_index, instance_index)).generate_state(1)[0])
+
+def _init_worker(threads):
+    # Each worker gets its share of the cores, and the Gurobi logs of parallel solves would be unreadable
+    gp.setParam("OutputFlag", 0)
+    gp.setParam("Threads", threads)
+
+def _run_instance(instance_function, arguments, seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    return instance_function(*arguments)
+
+def run_instances(instance_function, sizes, nb_instances=10, max_workers=None, threads_per_worker=None, seed=0,
+                  isolate=False):
+    """
+    Solves nb_instances random instances for each size in parallel.
+
+    :param instance_function: function generating and solving an instance (e.g. OWA_instance)
+    :param sizes: arguments of instance_function for each size, e.g. [(5,), (10,)] or [(n, p) for n in n_list for p in p_list]
+    :param nb_instances: number of instances for each size
+    :param max_workers: number of worker processes (default: number of cores)
+    :param threads_per_worker: Gurobi Threads parameter of each worker (default: cores divided among the workers)
+    :param seed: seed of the experiment, from which the seed of each instance is derived
+    :param isolate: solve each instance in a new worker process, e.g. to measure its peak memory on its own
+
+    :type instance_function: function
+    :type sizes: list[tuple]
+    :type nb_instances: int
+    :type max_workers: int
+    :type threads_per_worker: int
+    :type seed: int
+    :type isolate: bool
+
+    :return results: for each size (in the order of sizes), the list of the values returned by instance_function
+    :rtype: list[list]
+    """
+
+    nb_cores = os.cpu_count() or 1
+    if max_workers is None:
+        max_workers = nb_cores
+    if threads_per_worker is None:
+        threads_per_worker = max(1, nb_cores // max_workers)
+
+    jobs = [[(instance_function, tuple(arguments), instance_seed(seed, size_index, instance_index))
+             for instance_index in range(nb_instances)]
+            for size_index, arguments in enumerate(sizes)]
+
+    if isolate:
+        # A new worker process for each instance (ProcessPoolExecutor only supports it from Python 3.11, and not
+        # with the fork start method)
+        with multiprocessing.Pool(max_workers, _init_worker, (threads_per_worker,), maxtasksperchild=1) as pool:
+            futures = [[pool.apply_async(_run_instance, job) for job in size_jobs] for size_jobs in jobs]
+            return [[future.get() for future in size_futures] for size_futures in futures]
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(threads_per_worker,)) as executor:
+        futures = [[executor.submit(_run_instance, *job) for job in size_jobs] for size_jobs in jobs]
+
+        results = [[future.result() for future in size_futures] for size_futures in futures]
+
+    return results
+
+def run_experiments(instance_function, sizes, nb_instances=10, max_workers=None, threads_per_worker=None, seed=0):
+    """
+    Solves nb_instances random instances for each size in parallel (see run_instances),
+    and averages their runtimes by size.
+
+    :param instance_function: function generating and solving an instance, returning its runtime (e.g. OWA_instance)
+
+    :return avg_times: average runtime for each size, in the order of sizes
+    :rtype: list[float]
+    """
+
+    results = run_instances(instance_function, sizes, nb_instances, max_workers, threads_per_worker, seed)
+
+    return [np.mean(times) for times in results]
@@ -0,0 +1,183 @@
+import os
+import asyncio
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import gurobipy as gp
+
+from OWA import OWA_LP
+from WOWA import WOWA_LP, WOWA_compact_LP
+from Choquet import choquet_lp, choquet_core_lp
+from Choquet_graph import choquet_graph_lp
+from solver_config import SolverConfig
+
+# -------- Jobs -------- #
+# A job is the name of a model and the arguments of its function, e.g. ("OWA", (n, p, utilities, weights), {}).
+# The workers solve them with their own persistent Gurobi environment (no printing, no export and no log), so that
+# the cost of starting an environment is paid once per worker instead of once per job.
+
+SOLVERS = {
+    "OWA": OWA_LP,
+    "WOWA": WOWA_LP,
+    "WOWA_compact": WOWA_compact_LP,
+    "Choquet": choquet_lp,
+    "Choquet_core": choquet_core_lp,
+    "Choquet_graph": choquet_graph_lp,
+}
+
+# Configuration and solution cache of the jobs of the current worker process (see _init_worker): each worker
+# process has its own, the in-process LocalSolveService keeps them on the instance instead
+_worker_config = None
+_worker_cache = None
+
+def _worker_configuration(threads, backend, config_options):
+    env = None
+    if backend == "gurobi":
+        env = gp.Env(empty=True)
+        env.setParam("OutputFlag", 0)
+        env.setParam("Threads", threads)
+        env.start()
+
+    return SolverConfig.production(env=env, backend=backend, **config_options)
+
+def _init_worker(threads, backend, config_options, cache=None):
+    global _worker_config, _worker_cache
+
+    _worker_config = _worker_configuration(threads, backend, config_options)
+    _worker_cache = cache
+
+def _solve(config, cache, model, arguments, keywords):
+    if model not in SOLVERS:
+        raise ValueError("unknown model " + str(model))
+
+    if cache is not None:
+        return cache.solve(model, SOLVERS[model], *arguments, config=config, **keywords)
+    return SOLVERS[model](*arguments, config=config, **keywords)
+
+def _solve_job(model, arguments, keywords):
+    return _solve(_worker_config, _worker_cache, model, arguments, keywords)
+
+# -------- Service -------- #
+
+class SolveService:
+    """
+    Local solve service: worker processes that each hold a persistent Gurobi environment and solve the OWA, WOWA
+    and Choquet jobs submitted through an asyncio API.
+
+    At most max_pending jobs are submitted to the workers at the same time: solve waits for a free slot before
+    submitting its job, so that callers producing jobs faster than they are solved are slowed down instead of
+    filling the queue of the workers.
+
+        async with SolveService(max_workers=4) as service:
+            results = await service.solve_many([("OWA", (n, p, utilities, weights), {}) for utilities in instances])
+
+    :param max_workers: number of worker processes (default: number of cores)
+    :param max_pending: maximal number of jobs submitted to the workers at the same time (default: 2 * max_workers)
+    :param threads_per_worker: Gurobi Threads parameter of each worker (default: cores divided among the workers)
+    :param backend: backend of the workers (see SolverConfig)
+    :param config_options: other options of the configuration of the jobs, e.g. {"time_limit": 10}
+        (see SolverConfig; they must be picklable)
+    :param cache: cache of the results of the jobs (see cache.SolutionCache), copied to each worker: give it a
+        directory for the workers to share their results
+
+    :type max_workers: int
+    :type max_pending: int
+    :type threads_per_worker: int
+    :type backend: str
+    :type config_options: dict
+    :type cache: SolutionCache
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, threads_per_worker=None, backend="gurobi",
+                 config_options=None, cache=None):
+        nb_cores = os.cpu_count() or 1
+        self.max_workers = nb_cores if max_workers is None else max_workers
+        self.max_pending = 2 * self.max_workers if max_pending is None else max_pending
+        self.threads_per_worker = max(1, nb_cores // self.max_workers) if threads_per_worker is None \
+            else threads_per_worker
+        self.backend = backend
+        self.config_options = dict() if config_options is None else dict(config_options)
+        self.cache = cache
+
+        self.executor = None
+        self.slots = None
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                   initargs=(self.threads_per_worker, self.backend, self.config_options, self.cache))
+
+    def _job_function(self):
+        # Function run by the executor for each job
+        return _solve_job
+
+    def start(self):
+        """
+        Starts the workers (done by the first call to solve if needed).
+        """
+
+        if self.executor is None:
+            self.executor = self._new_executor()
+            self.slots = asyncio.Semaphore(self.max_pending)
+
+    def close(self, wait=True):
+        """
+        Stops the workers, after the submitted jobs if wait.
+        """
+
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+            self.executor = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    async def solve(self, model, *arguments, **keywords):
+        """
+        Solves a job once a slot is free, e.g. await service.solve("Choquet", n, p, costs, utilities, mobius_masses).
+
+        :param model: name of the model (key of SOLVERS)
+        :param arguments: positional arguments of the function of the model
+        :param keywords: keyword arguments of the function of the model (except config)
+
+        :rtype: SolveResult
+        """
+
+        self.start()
+        async with self.slots:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self._job_function(), model,
+                                                                    arguments, keywords)
+
+    async def solve_many(self, jobs):
+        """
+        Solves the jobs (model, arguments, keywords) concurrently, within the bound of max_pending.
+
+        :return results: results in the order of jobs
+        :rtype: list[SolveResult]
+        """
+
+        return await asyncio.gather(*(self.solve(model, *arguments, **keywords) for model, arguments, keywords in jobs))
+
+
+class LocalSolveService(SolveService):
+    """
+    In-process stand-in for SolveService, with the same API: the jobs are solved one at a time by a thread of the
+    current process, with a single persistent environment. For tests and debugging (no pickling of the jobs,
+    exceptions and breakpoints in the current process). The configuration and the cache belong to the instance,
+    so that several services can run side by side in the same process.
+    """
+
+    def __init__(self, max_pending=1, threads_per_worker=None, backend="gurobi", config_options=None, cache=None):
+        super().__init__(1, max_pending, threads_per_worker, backend, config_options, cache)
+        self.config = None
+
+    def _new_executor(self):
+        if self.config is None:
+            self.config = _worker_configuration(self.threads_per_worker, self.backend, self.config_options)
+        return ThreadPoolExecutor(max_workers=1)
+
+    def _job_function(self):
+        return partial(_solve, self.config, self.cache)
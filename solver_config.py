@@ -0,0 +1,261 @@
+import numpy as np
+
+import gurobipy as gp
+from gurobipy import GRB
+
+from telemetry import timer
+from backends import BACKENDS, HighsModel
+
+# -------- Solver configuration -------- #
+
+class SolverConfig:
+    """
+    Configuration shared by all the solvers (OWA, WOWA, Choquet and Choquet graph).
+
+    :param verbose: print the values of the variables and the objective after each resolution
+    :param export: None/False to not write the model, True to write it to "<model name>.lp" in the current directory,
+        or the path of the file to write it to (give each concurrent call its own path)
+    :param log_to_console: keep the Gurobi log (OutputFlag)
+    :param params: other Gurobi parameters, e.g. {"Threads": 1}
+    :param env: Gurobi environment in which the models are created (default environment if None)
+    :param time_limit: maximal time of each resolution (seconds), after which the best solution found is returned
+    :param mip_gap: relative gap between the best solution and the best bound at which to stop
+    :param on_incumbent: function called with (solution, objective, bound, runtime) each time a better solution
+        is found during a resolution (Gurobi only)
+    :param telemetry: records the time spent in each phase of the construction and resolution of the models,
+        and the trace of their search (see telemetry.Telemetry)
+    :param backend: "gurobi", or "highs" to solve the models with the open-source HiGHS solver of SciPy, without
+        license (no MIP start, callback or export, see backends.py)
+
+    :type verbose: bool
+    :type export: bool | str
+    :type log_to_console: bool
+    :type params: dict
+    :type env: gurobipy.Env
+    :type time_limit: float
+    :type mip_gap: float
+    :type on_incumbent: function
+    :type telemetry: Telemetry
+    :type backend: str
+    """
+
+    def __init__(self, verbose=False, export=None, log_to_console=True, params=None, env=None, time_limit=None,
+                 mip_gap=None, on_incumbent=None, telemetry=None, backend="gurobi"):
+        if backend not in BACKENDS:
+            raise ValueError("unknown backend " + str(backend))
+
+        self.verbose = verbose
+        self.export = export
+        self.log_to_console = log_to_console
+        self.params = dict() if params is None else dict(params)
+        self.env = env
+        self.time_limit = time_limit
+        self.mip_gap = mip_gap
+        self.on_incumbent = on_incumbent
+        self.telemetry = telemetry
+        self.backend = backend
+
+    @classmethod
+    def production(cls, **kwargs):
+        """
+        No printing, no export and no Gurobi log.
+        """
+
+        return cls(verbose=False, export=None, log_to_console=False, **kwargs)
+
+    @classmethod
+    def debug(cls, **kwargs):
+        """
+        Prints the variables, writes the model to "<model name>.lp" and keeps the Gurobi log.
+        """
+
+        return cls(verbose=True, export=True, log_to_console=True, **kwargs)
+
+    def copy(self, **changes):
+        """
+        Same configuration, with the given attributes changed.
+        """
+
+        config = SolverConfig(self.verbose, self.export, self.log_to_console, self.params, self.env,
+                              self.time_limit, self.mip_gap, self.on_incumbent, self.telemetry, self.backend)
+        for attribute, value in changes.items():
+            setattr(config, attribute, value)
+
+        return config
+
+    def new_model(self, name):
+        """
+        Creates a model in the configured environment (or a HighsModel), with the configured parameters.
+        """
+
+        if self.backend == "highs":
+            m = HighsModel(name)
+        else:
+            m = gp.Model(name, env=self.env)
+        if not self.log_to_console:
+            m.Params.OutputFlag = 0
+        for param, value in self.params.items():
+            m.setParam(param, value)
+        if self.telemetry is not None:
+            # Time spent in each phase of the construction (see telemetry.timer)
+            m._timers = dict()
+
+        return m
+
+    def set_limits(self, m):
+        """
+        Applies the time limit and the gap target to the model (before each resolution, so that they can be changed
+        between the resolutions of a persistent solver).
+        """
+
+        if self.time_limit is not None:
+            m.Params.TimeLimit = self.time_limit
+        if self.mip_gap is not None:
+            m.Params.MIPGap = self.mip_gap
+
+    def export_model(self, m):
+        if self.export is True:
+            m.write(m.ModelName.lower() + ".lp")
+        elif self.export:
+            m.write(self.export)
+
+# -------- Solver result -------- #
+
+class SolveResult:
+    """
+    Result of a resolution.
+
+    :param solution: values returned by the solver (satisfaction of each agent for OWA/WOWA,
+        selected projects for Choquet, arcs taken for the Choquet graph), None if no solution was found;
+        the best solution found if the resolution stopped early (see status)
+    :param objective: value of the objective, None if no solution was found
+    :param runtime: Gurobi runtime (seconds)
+    :param status: Gurobi status code (GRB.OPTIMAL, or e.g. GRB.TIME_LIMIT if stopped by the time limit)
+    :param build_time: time taken to build the model (seconds)
+    :param variables: values of the main variables of the model by name (e.g. "x", "z"), if a solution was found
+    :param presolve: reduction of the instance before the model was built (see presolve.py), if any
+    :param bound: best bound on the objective
+    :param gap: relative gap between the objective and the bound
+
+    :type solution: ndarray
+    :type objective: float
+    :type runtime: float
+    :type status: int
+    :type build_time: float
+    :type variables: dict{str: ndarray}
+    :type presolve: Presolve
+    :type bound: float
+    :type gap: float
+    """
+
+    def __init__(self, solution, objective, runtime, status, build_time=None, variables=None, presolve=None,
+                 bound=None, gap=None):
+        self.solution = solution
+        self.objective = objective
+        self.runtime = runtime
+        self.status = status
+        self.build_time = build_time
+        self.variables = dict() if variables is None else variables
+        self.presolve = presolve
+        self.bound = bound
+        self.gap = gap
+
+    def __repr__(self):
+        return "SolveResult(objective=%s, bound=%s, status=%s, runtime=%s, solution=%s)" % (
+            self.objective, self.bound, self.status, self.runtime, self.solution)
+
+    @property
+    def optimal(self):
+        return self.status == GRB.OPTIMAL
+
+def optimize(m, config, solution, variables=None, build_time=None, callback=None):
+    """
+    Exports the model if configured, optimizes it, and gathers the result.
+
+    :param m: model to optimize
+    :param config: solver configuration
+    :param solution: variables whose values are the solution of the result
+    :param variables: main variables of the model by name, whose values are kept in the result (and printed if verbose)
+    :param build_time: time taken to build the model
+    :param callback: Gurobi callback, e.g. to add lazy constraints (returning True when it rejects a solution)
+
+    :type m: gurobipy.Model
+    :type config: SolverConfig
+    :type solution: gurobipy.MVar
+    :type variables: dict{str: gurobipy.MVar}
+    :type build_time: float
+    :type callback: function
+
+    :rtype: SolveResult
+    """
+
+    if variables is None:
+        variables = dict()
+
+    # The pending modifications of the model are applied by update (and written by the export)
+    with timer(m, "update"):
+        m.update()
+    with timer(m, "export"):
+        config.export_model(m)
+    config.set_limits(m)
+
+    if config.on_incumbent is not None:
+        callback = incumbent_callback(solution, config.on_incumbent, callback)
+    if config.telemetry is not None:
+        run = config.telemetry.start_run(m)
+        callback = config.telemetry.callback(run, callback)
+
+    # Optimize model
+    m.optimize(callback)
+
+    if config.telemetry is not None:
+        config.telemetry.end_run(m, run)
+
+    try:
+        bound = m.ObjBound if m.IsMIP else m.ObjVal
+    except (gp.GurobiError, AttributeError):
+        # No bound available (e.g. infeasible model, or stopped before the root relaxation)
+        bound = None
+
+    if m.SolCount == 0:
+        if config.verbose:
+            print("No solution found (status %d)" % m.Status)
+        return SolveResult(None, None, m.Runtime, m.Status, build_time, bound=bound)
+
+    gap = m.MIPGap if m.IsMIP else 0
+    values = {name: np.array(var.X) for name, var in variables.items()}
+
+    if config.verbose:
+        if build_time is not None:
+            print('Build time: %g' % build_time)
+        for name, value in values.items():
+            print(name.upper() + ": ", value)
+        print('Obj: %g' % m.ObjVal)
+        if m.Status != GRB.OPTIMAL:
+            print('Stopped with status %d, bound: %g, gap: %g' % (m.Status, bound, gap))
+
+    return SolveResult(np.array(solution.X), m.ObjVal, m.Runtime, m.Status, build_time, values, bound=bound, gap=gap)
+
+def incumbent_callback(solution, on_incumbent, callback=None):
+    """
+    Gurobi callback that calls on_incumbent(solution values, objective, bound, runtime) for each improving solution,
+    after the given callback (whose rejected solutions are skipped). Returns whether the solution was rejected,
+    like the given callback, so that it can itself be wrapped (see Telemetry.callback).
+    """
+
+    best = [None]
+
+    def streaming_callback(m, where):
+        rejected = callback(m, where) if callback is not None else False
+
+        if where == GRB.Callback.MIPSOL and not rejected:
+            objective = m.cbGet(GRB.Callback.MIPSOL_OBJ)
+            # ModelSense is 1 to minimise and -1 to maximise
+            if best[0] is None or (objective - best[0]) * m.ModelSense < 0:
+                best[0] = objective
+                on_incumbent(np.array(m.cbGetSolution(solution.tolist())), objective,
+                             m.cbGet(GRB.Callback.MIPSOL_OBJBND), m.cbGet(GRB.Callback.RUNTIME))
+
+        return rejected
+
+    return streaming_callback
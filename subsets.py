@@ -0,0 +1,240 @@
+import itertools
+import numpy as np
+import scipy.sparse as sp
+
+# -------- SUBSETS AS BITMASKS -------- #
+# A subset A of {0, ..., n-1} is represented by the integer sum_{i in A} 2^i.
+# Collections of subsets are ndarrays of bitmasks, ordered as in utils.powerset unless stated otherwise,
+# so that vectors of Mobius masses line up with them.
+
+def powerset_bitmasks(n):
+    """
+    Generates the bitmasks (bit i set if element i is in the subset) of all subsets of {0, ..., n-1},
+    in the same order as powerset([i for i in range(n)]): by cardinality, then lexicographically.
+    """
+
+    masks = np.arange(2**n, dtype=np.int64)
+    reversed_masks = np.zeros(2**n, dtype=np.int64)
+    for i in range(n):
+        reversed_masks |= ((masks >> i) & 1) << (n - 1 - i)
+
+    # For subsets of the same size, the lexicographically smaller one has the larger reversed bitmask
+    order = np.lexsort((-reversed_masks, cardinalities(masks, n)))
+    return masks[order]
+
+def subset_sums(weights):
+    """
+    Computes the sum of the weights of every subset, indexed by bitmask (along the last axis).
+
+    :param weights: vector of weights (or matrix with one vector per row)
+    :type weights: ndarray[float]
+    """
+
+    weights = np.asarray(weights, dtype=float)
+    n = weights.shape[-1]
+
+    sums = np.zeros(weights.shape[:-1] + (2**n,))
+    for i in range(n):
+        # Subsets containing i are the subsets of {0, ..., i-1} with bit i added
+        sums[..., 2**i:2**(i+1)] = sums[..., :2**i] + weights[..., i:i+1]
+
+    return sums
+
+def mobius_transform(capacities):
+    """
+    Fast Mobius transform of capacities indexed by bitmask (along the last axis):
+    m(A) = sum_{B subset of A} (-1)^(|A|-|B|) v(B)
+    """
+
+    masses = np.array(capacities, dtype=float)
+    n = masses.shape[-1].bit_length() - 1
+
+    for i in range(n):
+        view = masses.reshape(masses.shape[:-1] + (2**(n-1-i), 2, 2**i))
+        view[..., 1, :] -= view[..., 0, :]
+
+    return masses
+
+def zeta_transform(masses):
+    """
+    Fast zeta transform of Mobius masses indexed by bitmask (along the last axis):
+    v(A) = sum_{B subset of A} m(B)
+    """
+
+    capacities = np.array(masses, dtype=float)
+    n = capacities.shape[-1].bit_length() - 1
+
+    for i in range(n):
+        view = capacities.reshape(capacities.shape[:-1] + (2**(n-1-i), 2, 2**i))
+        view[..., 1, :] += view[..., 0, :]
+
+    return capacities
+
+def iter_subsets(n):
+    """
+    Lazily iterates over the bitmasks of all subsets of {0, ..., n-1}, in the same order as powerset_bitmasks(n),
+    without storing them.
+    """
+
+    for size in range(n + 1):
+        for members in itertools.combinations(range(n), size):
+            yield subset_mask(members)
+
+def subset_mask(members):
+    """
+    Bitmask of the subset containing the given elements.
+    """
+
+    mask = 0
+    for i in members:
+        mask |= 1 << int(i)
+
+    return mask
+
+def subset_members(mask):
+    """
+    Elements (in increasing order) of the subset represented by the given bitmask.
+    """
+
+    mask = int(mask)
+    members = []
+    i = 0
+    while mask:
+        if mask & 1:
+            members.append(i)
+        mask >>= 1
+        i += 1
+
+    return tuple(members)
+
+def subsets_to_bitmasks(subsets):
+    """
+    Converts a list of subsets given as tuples of elements (e.g. the output of utils.powerset) to bitmasks.
+    """
+
+    return np.array([subset_mask(A) for A in subsets], dtype=np.int64)
+
+def cardinalities(masks, n):
+    """
+    Number of elements of each subset.
+    """
+
+    masks = np.asarray(masks, dtype=np.int64)
+    sizes = np.zeros(masks.shape, dtype=np.int64)
+    for i in range(n):
+        sizes += (masks >> i) & 1
+
+    return sizes
+
+def membership_matrix(masks, n):
+    """
+    Boolean matrix whose entry (k, i) indicates whether element i belongs to the k-th subset.
+    """
+
+    masks = np.asarray(masks, dtype=np.int64)
+    return ((masks[:, None] >> np.arange(n)) & 1).astype(bool)
+
+def sparse_mobius_masses(mobius_masses, n, combinations=None):
+    """
+    Converts Mobius masses to a sparse representation that only keeps the subsets with a non-zero mass.
+
+    :param mobius_masses: either a dense vector of masses (in the order of combinations),
+        or a dict {subset: mass} whose subsets are tuples of elements or bitmasks
+    :param n: number of elements
+    :param combinations: bitmasks of the subsets of a dense vector of masses (default: powerset_bitmasks(n))
+
+    :type mobius_masses: ndarray[float] | dict
+    :type n: int
+    :type combinations: ndarray[int]
+
+    :return masks, masses: bitmasks of the subsets with a non-zero mass, and their masses
+    :rtype: ndarray[int], ndarray[float]
+    """
+
+    if isinstance(mobius_masses, dict):
+        masks = np.array([A if isinstance(A, (int, np.integer)) else subset_mask(A) for A in mobius_masses.keys()],
+                         dtype=np.int64)
+        masses = np.array(list(mobius_masses.values()), dtype=float)
+    else:
+        masses = np.asarray(mobius_masses, dtype=float)
+        masks = powerset_bitmasks(n) if combinations is None else np.asarray(combinations, dtype=np.int64)
+
+    non_zero = masses != 0
+    return masks[non_zero], masses[non_zero]
+
+def linking_matrices(masks, n):
+    """
+    Sparse incidence matrices of the constraints y_A <= z_i for every subset A and every element i of A
+    (one row per pair (A, i), ordered by subset then by element), written Y @ y - Z @ z <= 0.
+
+    :return Y, Z: matrices of shape (nb_pairs, len(masks)) and (nb_pairs, n)
+    :rtype: scipy.sparse.csr_matrix, scipy.sparse.csr_matrix
+    """
+
+    subset_indices, members = np.nonzero(membership_matrix(masks, n))
+    nb_pairs = len(members)
+    ones = np.ones(nb_pairs)
+
+    Y = sp.csr_matrix((ones, (np.arange(nb_pairs), subset_indices)), shape=(nb_pairs, len(masks)))
+    Z = sp.csr_matrix((ones, (np.arange(nb_pairs), members)), shape=(nb_pairs, n))
+
+    return Y, Z
+
+def highest_elements(masks, n):
+    """
+    Largest element of each (non-empty) subset.
+    """
+
+    masks = np.asarray(masks, dtype=np.int64)
+    highest = np.zeros(masks.shape, dtype=np.int64)
+    for i in range(n):
+        highest[((masks >> i) & 1) == 1] = i
+
+    return highest
+
+def chain_closure(masks, n):
+    """
+    Bitmasks of the given subsets and of all the subsets obtained by removing their largest elements one by one
+    (A minus its largest element, then minus its two largest elements, ...), without the empty set.
+    """
+
+    masks = np.asarray(masks, dtype=np.int64)
+    prefixes = masks[None, :] & ((np.int64(1) << (np.arange(n, dtype=np.int64) + 1)) - 1)[:, None]
+    closure = np.unique(np.concatenate([masks, prefixes.reshape(-1)]))
+
+    return closure[closure != 0]
+
+def chain_linking_matrices(masks, n, all_masks):
+    """
+    Sparse incidence matrices of the constraints y_A <= z_j and y_A <= y_(A minus j) for every subset A of masks,
+    with j the largest element of A (the second constraint only when A has several elements), written
+    Y @ y - Z @ z <= 0 where y are the variables of all_masks. Chained through the subsets A minus j (which must be
+    in all_masks, see chain_closure), they imply y_A <= z_i for every i in A with at most two rows per subset,
+    instead of |A| rows for linking_matrices.
+
+    :return Y, Z: matrices of shape (nb_rows, len(all_masks)) and (nb_rows, n)
+    :rtype: scipy.sparse.csr_matrix, scipy.sparse.csr_matrix
+    """
+
+    masks = np.asarray(masks, dtype=np.int64)
+    positions = {mask: k for k, mask in enumerate(np.asarray(all_masks).tolist())}
+    subset_indices = np.array([positions[mask] for mask in masks.tolist()], dtype=np.int64)
+
+    highest = highest_elements(masks, n)
+    parents = masks & ~(np.int64(1) << highest)
+    has_parent = parents != 0
+    parent_indices = np.array([positions[mask] for mask in parents[has_parent].tolist()], dtype=np.int64)
+
+    # Rows y_A - z_j, then rows y_A - y_(A minus j)
+    nb_subsets, nb_parents = len(masks), len(parent_indices)
+    nb_rows = nb_subsets + nb_parents
+    parent_rows = np.arange(nb_subsets, nb_rows)
+
+    rows = np.concatenate([np.arange(nb_subsets), parent_rows, parent_rows])
+    columns = np.concatenate([subset_indices, subset_indices[has_parent], parent_indices])
+    values = np.concatenate([np.ones(nb_rows), -np.ones(nb_parents)])
+
+    Y = sp.csr_matrix((values, (rows, columns)), shape=(nb_rows, len(positions)))
+    Z = sp.csr_matrix((np.ones(nb_subsets), (np.arange(nb_subsets), highest)), shape=(nb_rows, n))
+
+    return Y, Z
@@ -0,0 +1,214 @@
+import csv
+import json
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import gurobipy as gp
+from gurobipy import GRB
+
+# -------- Telemetry -------- #
+# Time spent by a resolution in each phase: building the model in Python (variables, constraints, objective, start
+# solution, timed by the builders with the timer function below), and in Gurobi (presolve, root relaxation,
+# branching, located by a callback), along with a trace of the incumbent and the bound during the search.
+# The callback only samples at new incumbents and at most every sample_interval seconds otherwise, so that
+# the telemetry can be left on in production.
+
+# Columns of the samples, in the order of the CSV file
+SAMPLE_COLUMNS = ["run", "model", "event", "time", "incumbent", "bound", "gap", "nodes"]
+
+@contextmanager
+def timer(m, phase):
+    """
+    Adds the time spent in the block to the given phase of the model m, if it was created with telemetry
+    (see SolverConfig.new_model), and does nothing otherwise.
+
+    :type m: gurobipy.Model
+    :type phase: str
+    """
+
+    timers = getattr(m, "_timers", None)
+    if timers is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timers[phase] = timers.get(phase, 0) + time.perf_counter() - start
+
+class Telemetry:
+    """
+    Timers and search traces of the resolutions of every model created with it (see SolverConfig).
+
+    Each resolution is a run, recorded in runs with the time spent in each phase since the previous run of the same
+    model (the first run of a persistent solver includes the construction of the model) and its final statistics.
+    The samples form the time series of the incumbent, bound and node count of all the runs.
+
+    :param sample_interval: minimal time between two samples outside of new incumbents (seconds)
+
+    :type sample_interval: float
+    """
+
+    def __init__(self, sample_interval=0.1):
+        self.sample_interval = sample_interval
+        self.runs = []
+        self.samples = []
+
+    def start_run(self, m):
+        """
+        Records a new run of the model m, with the time spent in each phase of its construction since the previous
+        one, and returns its index.
+        """
+
+        timers = getattr(m, "_timers", None)
+        record = {"run": len(self.runs), "model": m.ModelName}
+        record.update({phase + "_time": value for phase, value in (timers or dict()).items()})
+        if timers is not None:
+            timers.clear()
+
+        self.runs.append(record)
+        return record["run"]
+
+    def callback(self, run, callback=None):
+        """
+        Gurobi callback sampling the search of the given run, after the given callback
+        (whose rejected solutions are not incumbents).
+        """
+
+        record = self.runs[run]
+        record.update(presolve_end=None, root_end=None)
+        state = {"last_sample": -np.inf, "best": None}
+
+        def sampling_callback(m, where):
+            rejected = callback(m, where) if callback is not None else False
+
+            if where in (GRB.Callback.POLLING, GRB.Callback.MESSAGE):
+                return rejected
+
+            runtime = m.cbGet(GRB.Callback.RUNTIME)
+            if where != GRB.Callback.PRESOLVE and record["presolve_end"] is None:
+                record["presolve_end"] = runtime
+
+            if where == GRB.Callback.MIP:
+                nodes = m.cbGet(GRB.Callback.MIP_NODCNT)
+                if nodes > 0 and record["root_end"] is None:
+                    record["root_end"] = runtime
+                if runtime - state["last_sample"] >= self.sample_interval:
+                    state["last_sample"] = runtime
+                    self.add_sample(run, record["model"], "progress", runtime, m.cbGet(GRB.Callback.MIP_OBJBST),
+                                    m.cbGet(GRB.Callback.MIP_OBJBND), nodes)
+
+            elif where == GRB.Callback.MIPNODE:
+                if m.cbGet(GRB.Callback.MIPNODE_NODCNT) > 0 and record["root_end"] is None:
+                    record["root_end"] = runtime
+
+            elif where == GRB.Callback.MIPSOL and not rejected:
+                objective = m.cbGet(GRB.Callback.MIPSOL_OBJ)
+                # ModelSense is 1 to minimise and -1 to maximise
+                if state["best"] is None or (objective - state["best"]) * m.ModelSense < 0:
+                    state["best"] = objective
+                    state["last_sample"] = runtime
+                    self.add_sample(run, record["model"], "incumbent", runtime, objective,
+                                    m.cbGet(GRB.Callback.MIPSOL_OBJBND), m.cbGet(GRB.Callback.MIPSOL_NODCNT))
+
+            return rejected
+
+        return sampling_callback
+
+    def end_run(self, m, run):
+        """
+        Records the final statistics of the run of the model m (once optimized), and the time spent by Gurobi in
+        each phase: presolve until the first callback outside of it, root relaxation until the first node is
+        explored, and branching for the rest (None for the backends other than Gurobi).
+        """
+
+        record = self.runs[run]
+        runtime = m.Runtime
+        presolve_end = record.pop("presolve_end", None)
+        root_end = record.pop("root_end", None)
+        presolve_end = runtime if presolve_end is None else presolve_end
+        root_end = runtime if root_end is None else max(root_end, presolve_end)
+
+        if not isinstance(m, gp.Model):
+            # The other backends have no callback (see backends.py)
+            presolve_end = root_end = None
+
+        incumbent = m.ObjVal if m.SolCount > 0 else None
+        try:
+            bound = m.ObjBound if m.IsMIP else incumbent
+        except (gp.GurobiError, AttributeError):
+            bound = None
+
+        record.update({
+            "presolve_time": presolve_end,
+            "root_time": None if root_end is None else root_end - presolve_end,
+            "branching_time": None if root_end is None else runtime - root_end,
+            "runtime": runtime,
+            "status": m.Status,
+            "objective": incumbent,
+            "bound": bound,
+            "nodes": int(m.NodeCount) if m.IsMIP else 0,
+            "nb_variables": m.NumVars,
+            "nb_constraints": m.NumConstrs,
+            "nb_nonzeros": m.NumNZs,
+        })
+        self.add_sample(run, record["model"], "end", runtime, incumbent, bound, record["nodes"])
+
+    def add_sample(self, run, model, event, runtime, incumbent, bound, nodes):
+        # Gurobi gives +-GRB.INFINITY when there is no incumbent or bound yet
+        incumbent = None if incumbent is None or abs(incumbent) >= GRB.INFINITY else float(incumbent)
+        bound = None if bound is None or abs(bound) >= GRB.INFINITY else float(bound)
+        gap = None
+        if incumbent is not None and bound is not None:
+            gap = abs(bound - incumbent) / max(abs(incumbent), 1e-10)
+
+        self.samples.append({"run": run, "model": model, "event": event, "time": runtime, "incumbent": incumbent,
+                             "bound": bound, "gap": gap, "nodes": int(nodes)})
+
+    def phase_totals(self):
+        """
+        Total time spent in each phase over all the runs, by model.
+
+        :rtype: dict{str: dict{str: float}}
+        """
+
+        totals = dict()
+        for record in self.runs:
+            model_totals = totals.setdefault(record["model"], dict())
+            for key, value in record.items():
+                if key.endswith("_time") and value is not None:
+                    model_totals[key] = model_totals.get(key, 0) + value
+
+        return totals
+
+    def save(self, basename):
+        """
+        Saves the runs and the samples to basename.json, and the samples (time series of the incumbent and bound,
+        one row per sample) to basename.csv.
+        """
+
+        with open(basename + ".json", "w") as file:
+            json.dump({"runs": self.runs, "samples": self.samples}, file, indent=1)
+
+        with open(basename + ".csv", "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=SAMPLE_COLUMNS)
+            writer.writeheader()
+            writer.writerows(self.samples)
+
+def load_telemetry(filepath):
+    """
+    Loads the telemetry saved by Telemetry.save in a JSON file.
+
+    :rtype: Telemetry
+    """
+
+    with open(filepath) as file:
+        data = json.load(file)
+
+    telemetry = Telemetry()
+    telemetry.runs = data["runs"]
+    telemetry.samples = data["samples"]
+
+    return telemetry
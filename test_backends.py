@@ -0,0 +1,95 @@
+import random
+import asyncio
+import numpy as np
+import pytest
+
+pytest.importorskip("gurobipy")
+pytest.importorskip("scipy")
+
+from utils import *
+from OWA import OWA_LP, OWASolver
+from WOWA import WOWA_LP
+from Choquet import choquet_lp
+from solver_config import SolverConfig
+from service import LocalSolveService
+
+# Gurobi and HiGHS must find the same optimal objective on the same small random instances
+
+SEEDS = range(5)
+
+def configs():
+    return SolverConfig.production(), SolverConfig.production(backend="highs")
+
+def seed(value):
+    random.seed(value)
+    np.random.seed(value)
+
+@pytest.mark.parametrize("one_to_one", [True, False])
+@pytest.mark.parametrize("instance_seed", SEEDS)
+def test_OWA_backends(instance_seed, one_to_one):
+    seed(instance_seed)
+    n, p = 4, 8
+    utilities = generate_OWA_problem(n, p)
+    weights = OWA_weights_generator(n, 2)
+
+    gurobi, highs = configs()
+    expected = OWA_LP(n, p, utilities, weights, one_to_one, config=gurobi)
+    result = OWA_LP(n, p, utilities, weights, one_to_one, config=highs)
+
+    assert result.objective == pytest.approx(expected.objective, rel=1e-6)
+
+def test_OWA_big_M_requires_gurobi():
+    with pytest.raises(ValueError):
+        OWASolver(3, 3, np.ones((3, 3)), formulation="big_M", config=SolverConfig.production(backend="highs"))
+
+def test_OWA_highs_quiet(capsys):
+    seed(0)
+    n, p = 4, 8
+    config = SolverConfig.production(backend="highs")
+    OWA_LP(n, p, generate_OWA_problem(n, p), OWA_weights_generator(n, 2), config=config)
+
+    assert capsys.readouterr().out == ""
+
+def test_OWA_increasing_weights_highs():
+    seed(0)
+    n, p = 4, 8
+    utilities = generate_OWA_problem(n, p)
+    weights = OWA_weights_generator(n, 2)[::-1]
+
+    result = OWA_LP(n, p, utilities, weights, config=SolverConfig.production(backend="highs"))
+    assert result.solution is None
+
+    async def solve():
+        async with LocalSolveService(backend="highs") as service:
+            return await service.solve_many([("OWA", (n, p, utilities, weights), {}),
+                                             ("OWA", (n, p, utilities, weights[::-1]), {})])
+
+    increasing, decreasing = asyncio.run(solve())
+    expected = OWA_LP(n, p, utilities, weights[::-1], config=SolverConfig.production())
+    assert increasing.solution is None
+    assert decreasing.objective == pytest.approx(expected.objective, rel=1e-6)
+
+@pytest.mark.parametrize("instance_seed", SEEDS)
+def test_WOWA_backends(instance_seed):
+    seed(instance_seed)
+    n, p = 4, 8
+    utilities = generate_OWA_problem(n, p)
+    mobius_masses = WOWA_mobius_mass_generator(WOWA_importance_weights_generator(n), 2)
+
+    gurobi, highs = configs()
+    expected = WOWA_LP(n, p, utilities, mobius_masses, config=gurobi)
+    result = WOWA_LP(n, p, utilities, mobius_masses, config=highs)
+
+    assert result.objective == pytest.approx(expected.objective, rel=1e-6)
+
+@pytest.mark.parametrize("instance_seed", SEEDS)
+def test_Choquet_backends(instance_seed):
+    seed(instance_seed)
+    n, p = 3, 8
+    utilities, costs, mobius_masses = generate_Choquet_problem(n, p)
+
+    gurobi, highs = configs()
+    expected = choquet_lp(n, p, costs, utilities, mobius_masses, config=gurobi)
+    result = choquet_lp(n, p, costs, utilities, mobius_masses, config=highs)
+
+    assert result.objective == pytest.approx(expected.objective, rel=1e-6)
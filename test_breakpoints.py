@@ -0,0 +1,76 @@
+import random
+import numpy as np
+import pytest
+
+pytest.importorskip("gurobipy")
+
+from utils import *
+from OWA import OWASolver
+from WOWA import WOWASolver
+from breakpoints import OWA_alpha_breakpoints, WOWA_alpha_breakpoints
+from evaluation import OWA_values, choquet_values
+from solver_config import SolverConfig
+
+# The allocation that the sweep gives for each value of a dense grid must be as good as the one found by solving
+# at that value
+
+GRID = np.linspace(1, 10, 37)
+
+def seed(value):
+    random.seed(value)
+    np.random.seed(value)
+
+def allocation_at(intervals, alpha):
+    for start, end, result in intervals:
+        if start <= alpha <= end:
+            return result.solution
+    raise AssertionError("alpha = %g is not covered" % alpha)
+
+def check_against_grid(intervals, solve, evaluate):
+    assert intervals[0][0] == GRID[0] and intervals[-1][1] == GRID[-1]
+    for (_, end, _), (start, _, _) in zip(intervals, intervals[1:]):
+        assert end == start
+
+    for alpha in GRID:
+        expected = evaluate(solve(alpha).solution, alpha)
+        assert evaluate(allocation_at(intervals, alpha), alpha) >= expected - 1e-4
+
+@pytest.mark.parametrize("instance_seed", [0, 11])
+def test_OWA_alpha_breakpoints(instance_seed):
+    seed(instance_seed)
+    n = p = 4
+    utilities = generate_OWA_problem(n, p)
+    config = SolverConfig.production()
+
+    intervals, nb_solves = OWA_alpha_breakpoints(n, p, utilities, GRID[0], GRID[-1], config=config)
+    assert nb_solves < len(GRID)
+
+    solver = OWASolver(n, p, utilities, config=config)
+
+    def solve(alpha):
+        solver.set_weights(OWA_weights_generator(n, alpha))
+        return solver.solve()
+
+    check_against_grid(intervals, solve, lambda satisfactions, alpha:
+                       OWA_values(satisfactions, OWA_weights_generator(n, alpha)))
+
+@pytest.mark.parametrize("instance_seed", [0, 11])
+def test_WOWA_alpha_breakpoints(instance_seed):
+    seed(instance_seed)
+    n = p = 4
+    utilities = generate_OWA_problem(n, p)
+    importance_weights = WOWA_importance_weights_generator(n)
+    config = SolverConfig.production()
+
+    intervals, nb_solves = WOWA_alpha_breakpoints(n, p, utilities, importance_weights, GRID[0], GRID[-1],
+                                                  config=config)
+    assert nb_solves < len(GRID)
+
+    solver = WOWASolver(n, p, utilities, config=config)
+
+    def solve(alpha):
+        solver.set_mobius_masses(WOWA_mobius_mass_generator(importance_weights, alpha))
+        return solver.solve()
+
+    check_against_grid(intervals, solve, lambda satisfactions, alpha:
+                       choquet_values(satisfactions, WOWA_mobius_mass_generator(importance_weights, alpha)))
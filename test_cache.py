@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("gurobipy")
+
+from gurobipy import GRB
+
+from cache import SolutionCache
+from solver_config import SolveResult
+
+def fake_solver(n, p, utilities, weights, one_to_one=True, config=None):
+    fake_solver.calls += 1
+    return SolveResult(np.zeros(n), 1.0 if one_to_one else 2.0, 0, GRB.OPTIMAL)
+
+def test_same_instance_same_key():
+    fake_solver.calls = 0
+    cache = SolutionCache()
+    utilities, weights = np.arange(6).reshape(2, 3), np.array([0.6, 0.4])
+
+    cache.solve("OWA", fake_solver, 2, 3, utilities, weights, True)
+    cache.solve("OWA", fake_solver, 2, 3, utilities, weights, one_to_one=True)
+    cache.solve("OWA", fake_solver, 2, 3, utilities.tolist(), weights.tolist())
+    assert (fake_solver.calls, cache.hits, cache.misses) == (1, 2, 1)
+
+    assert cache.solve("OWA", fake_solver, 2, 3, utilities, weights, one_to_one=False).objective == 2.0
+    assert fake_solver.calls == 2
@@ -0,0 +1,63 @@
+import random
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+
+from utils import *
+from heuristics import (heuristic_allocation, maximin_assignment, greedy_allocation, local_search,
+                        satisfactions_of, allocation_matrix)
+from evaluation import allocation_satisfactions, OWA_values, WOWA_values
+
+# The heuristic allocations must be feasible, and the values computed by the local search on its candidates must
+# be those of the allocations they stand for
+
+def seed(value):
+    random.seed(value)
+    np.random.seed(value)
+
+def value_functions(n):
+    weights = OWA_weights_generator(n, 3)
+    importance_weights = WOWA_importance_weights_generator(n)
+
+    return {
+        "OWA": lambda satisfactions: OWA_values(satisfactions, weights),
+        "WOWA": lambda satisfactions: WOWA_values(satisfactions, importance_weights, 2),
+    }
+
+@pytest.mark.parametrize("aggregator", ["OWA", "WOWA"])
+@pytest.mark.parametrize("one_to_one", [True, False])
+@pytest.mark.parametrize("n, p", [(4, 10), (6, 6), (6, 4), (3, 60)])
+@pytest.mark.parametrize("instance_seed", range(3))
+def test_heuristic_allocation(instance_seed, n, p, one_to_one, aggregator):
+    seed(instance_seed)
+    utilities = generate_OWA_problem(n, p)
+    value_function = value_functions(n)[aggregator]
+
+    x = heuristic_allocation(utilities, value_function, one_to_one)
+
+    assert x.shape == (n, p)
+    assert set(np.unique(x)) <= {0, 1}
+    assert np.all(x.sum(axis=0) <= 1)
+    if one_to_one:
+        assert np.all(x.sum(axis=1) <= 1)
+        assert x.sum() == min(n, p)
+    else:
+        assert np.all(x.sum(axis=0) == 1)
+
+    # Best value of the candidates evaluated by the local search
+    best_values = []
+
+    def recording_value_function(satisfactions):
+        values = value_function(satisfactions)
+        best_values.append(np.max(values))
+        return values
+
+    start = maximin_assignment(utilities) if one_to_one else greedy_allocation(utilities, value_function)
+    owners = local_search(utilities, start, recording_value_function, one_to_one)
+    assert np.array_equal(allocation_matrix(owners, n), x)
+
+    # The search only accepts improvements, so the value of its allocation is the best value it evaluated
+    value = value_function(allocation_satisfactions(x, utilities))
+    assert value == pytest.approx(max(best_values))
+    assert value >= value_function(satisfactions_of(utilities, start)) - 1e-9
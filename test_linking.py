@@ -0,0 +1,44 @@
+import random
+import numpy as np
+import pytest
+
+pytest.importorskip("gurobipy")
+
+from utils import *
+from WOWA import WOWA_LP
+from Choquet import choquet_lp
+from solver_config import SolverConfig
+
+# The chain linking (y_A <= s_j and y_A <= y_(A minus j)) must give the same optima as the pairwise linking
+
+SEEDS = range(5)
+
+def seed(value):
+    random.seed(value)
+    np.random.seed(value)
+
+@pytest.mark.parametrize("k", [None, 2])
+@pytest.mark.parametrize("instance_seed", SEEDS)
+def test_Choquet_linkings(instance_seed, k):
+    seed(instance_seed)
+    n, p = 5, 10
+    utilities, costs, mobius_masses = generate_Choquet_problem(n, p, k)
+    config = SolverConfig.production()
+
+    pairs = choquet_lp(n, p, costs, utilities, mobius_masses, config=config, linking="pairs")
+    chain = choquet_lp(n, p, costs, utilities, mobius_masses, config=config, linking="chain")
+
+    assert chain.objective == pytest.approx(pairs.objective, rel=1e-6)
+
+@pytest.mark.parametrize("instance_seed", SEEDS)
+def test_WOWA_linkings(instance_seed):
+    seed(instance_seed)
+    n, p = 5, 10
+    utilities = generate_OWA_problem(n, p)
+    mobius_masses = WOWA_mobius_mass_generator(WOWA_importance_weights_generator(n), 2)
+    config = SolverConfig.production()
+
+    pairs = WOWA_LP(n, p, utilities, mobius_masses, config=config, linking="pairs")
+    chain = WOWA_LP(n, p, utilities, mobius_masses, config=config, linking="chain")
+
+    assert chain.objective == pytest.approx(pairs.objective, rel=1e-6)
@@ -0,0 +1,52 @@
+import random
+from collections import OrderedDict
+import numpy as np
+import pytest
+
+pytest.importorskip("gurobipy")
+
+import pareto
+from utils import *
+from pareto import non_dominated, pareto_front
+from Choquet import choquet_lp
+from solver_config import SolverConfig
+
+def seed(value):
+    random.seed(value)
+    np.random.seed(value)
+
+def test_non_dominated():
+    rng = np.random.default_rng(0)
+    scores = rng.integers(0, 5, size=(300, 3))
+    costs = rng.integers(0, 5, size=300)
+
+    # Pairwise definition: dominated by a better label, or identical to an earlier one
+    weakly = np.all(scores[:, None] >= scores[None], axis=-1) & (costs[:, None] <= costs[None])
+    strictly = np.any(scores[:, None] > scores[None], axis=-1) | (costs[:, None] < costs[None])
+    earlier = np.arange(300)[:, None] < np.arange(300)[None]
+    expected = ~np.any(weakly & (strictly | earlier), axis=0)
+
+    assert np.array_equal(non_dominated(scores, costs, chunk_size=16), expected)
+
+@pytest.mark.parametrize("instance_seed", range(3))
+def test_pareto_front_choquet(instance_seed):
+    seed(instance_seed)
+    n, p = 3, 12
+    utilities, costs, mobius_masses = generate_Choquet_problem(n, p)
+
+    front = pareto_front(utilities, costs, use_cache=False)
+    expected = choquet_lp(n, p, costs, utilities, mobius_masses, config=SolverConfig.production())
+
+    assert front.solve(mobius_masses).objective == pytest.approx(expected.objective, rel=1e-6)
+
+def test_front_cache_bounded(monkeypatch):
+    monkeypatch.setattr(pareto, "FRONT_CACHE", OrderedDict())
+    monkeypatch.setattr(pareto, "MAX_CACHED_FRONTS", 2)
+    seed(0)
+    instances = [generate_Choquet_problem(2, 5)[:2] for _ in range(3)]
+
+    fronts = [pareto_front(utilities, costs) for utilities, costs in instances]
+
+    assert len(pareto.FRONT_CACHE) == 2
+    assert pareto_front(*instances[2]) is fronts[2]
+    assert pareto_front(*instances[0]) is not fronts[0]
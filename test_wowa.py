@@ -0,0 +1,53 @@
+import random
+import numpy as np
+import pytest
+
+pytest.importorskip("gurobipy")
+
+from utils import *
+from WOWA import WOWA_LP, WOWA_compact_LP, exact_nb_breakpoints
+from evaluation import WOWA_values
+from solver_config import SolverConfig
+
+# The compact model must find the WOWA of WOWA_LP when it is exact, and report the WOWA of its allocation otherwise
+
+SEEDS = range(3)
+
+def seed(value):
+    random.seed(value)
+    np.random.seed(value)
+
+def test_exact_nb_breakpoints():
+    assert exact_nb_breakpoints(np.full(4, 1 / 4)) == 4
+    assert exact_nb_breakpoints([0.5, 0.25, 0.25]) == 4
+    assert exact_nb_breakpoints([0.3, 0.7]) == 10
+    assert exact_nb_breakpoints([1 / np.pi, 1 - 1 / np.pi]) is None
+
+@pytest.mark.parametrize("instance_seed", SEEDS)
+@pytest.mark.parametrize("importance, alpha", [("uniform", 3), ("grid", 2), ("random", 1)])
+def test_WOWA_compact_exact(instance_seed, importance, alpha):
+    seed(instance_seed)
+    n, p = 4, 8
+    utilities = generate_OWA_problem(n, p)
+    importance_weights = {"uniform": np.full(n, 1 / n), "grid": np.array([0.1, 0.2, 0.3, 0.4]),
+                          "random": WOWA_importance_weights_generator(n)}[importance]
+    config = SolverConfig.production()
+
+    result = WOWA_compact_LP(n, p, utilities, importance_weights, alpha=alpha, config=config)
+    expected = WOWA_LP(n, p, utilities, WOWA_mobius_mass_generator(importance_weights, alpha), config=config)
+
+    assert result.objective == pytest.approx(result.surrogate_objective, rel=1e-6)
+    # The Mobius masses of WOWA_LP are rounded, so its allocation is compared through its exact WOWA
+    assert result.objective == pytest.approx(WOWA_values(expected.solution, importance_weights, alpha), rel=1e-3)
+    assert result.objective >= WOWA_values(expected.solution, importance_weights, alpha) - 1e-6
+
+@pytest.mark.parametrize("instance_seed", SEEDS)
+def test_WOWA_compact_objective(instance_seed):
+    seed(instance_seed)
+    n, p = 4, 8
+    utilities = generate_OWA_problem(n, p)
+    importance_weights = WOWA_importance_weights_generator(n)
+
+    result = WOWA_compact_LP(n, p, utilities, importance_weights, alpha=3, config=SolverConfig.production())
+
+    assert result.objective == pytest.approx(WOWA_values(result.solution, importance_weights, 3))
@@ -2,6 +2,8 @@ import itertools
 import numpy as np
 import random
 
+from subsets import powerset_bitmasks, subset_sums, mobius_transform
+
 # -------- UTILS -------- #
 
 def read_str(file): return file.readline().strip()
@@ -48,14 +50,18 @@ def generate_OWA_problem(nb_agents, nb_items):
 
     return np.random.randint(50, size=(nb_agents, nb_items))
 
-def generate_Choquet_problem(nb_objectives, nb_projects):
+def generate_Choquet_problem(nb_objectives, nb_projects, k=None):
     """
     Generates utilities, costs and mobius masses for a problem to be resolved with Choquet.
+    If k is given, the mobius masses are those of a k-additive capacity, as a sparse dict {subset: mass}.
     """
 
     utilities = np.random.randint(1, 21, size=(nb_objectives, nb_projects))
     costs = np.random.randint(10, 101, size=nb_projects)
-    mobius_masses = belief_function_generator(nb_objectives)
+    if k is None:
+        mobius_masses = belief_function_generator(nb_objectives)
+    else:
+        mobius_masses = k_additive_capacity_generator(nb_objectives, k)
 
     return utilities, costs, mobius_masses
 
@@ -79,29 +85,27 @@ def WOWA_mobius_mass_generator(p, alpha):
     Generates Mobius masses for the WOWA aggregator using the vector p of importance weights.
     phi(x) = x^alpha
 
-    :param p: list of importance weights
+    The capacities v(A) = phi(sum_{i in A} p_i) are computed on a bitmask-indexed array and converted
+    with the fast Mobius transform, in O(n * 2^n) instead of O(3^n).
+    A batch of importance vectors (one per row) can be given to generate the masses of a whole sweep at once.
+
+    :param p: list of importance weights, or matrix of importance weights (one vector per row)
     :param alpha: value to be used in phi
 
-    :type p: list[int]
+    :type p: list[int] | ndarray[float]
     :type alpha: int
-    """
 
-    all_subsets = powerset([i for i in range(len(p))])
+    :return mobius_masses: Mobius masses in the order of powerset (one row per importance vector if p is a matrix)
+    :rtype: ndarray[float]
+    """
 
-    capacities = dict()
-    for A in all_subsets:
-        capacity = (sum([p[i] for i in A]))**alpha
-        capacities[A] = capacity
+    p = np.asarray(p, dtype=float)
+    n = p.shape[-1]
 
-    mobius_masses = []
-    for A in all_subsets:
-        all_subsubsets = powerset(A)
-        total = 0
-        for B in all_subsubsets:
-            total += ((-1)**(len(A)-len(B))) * capacities[B]
-        mobius_masses.append(round(total, 3))
+    capacities = subset_sums(p)**alpha
+    mobius_masses = mobius_transform(capacities)[..., powerset_bitmasks(n)]
 
-    return np.array(mobius_masses)
+    return np.round(mobius_masses, 3)
 
 def belief_function_generator(nb_elements):
     """
@@ -119,6 +123,24 @@ def belief_function_generator(nb_elements):
 
     return mobius_masses
 
+def k_additive_capacity_generator(nb_elements, k):
+    """
+    Generates random Mobius masses of a k-additive belief function:
+    only the subsets of at most k elements have a (positive) mass, so that there are O(n^k) of them.
+
+    :return mobius_masses: masses of the non-empty subsets of at most k elements
+    :rtype: dict{tuple[int]: float}
+    """
+
+    subsets = []
+    for size in range(1, k + 1):
+        subsets.extend(itertools.combinations(range(nb_elements), size))
+
+    # As for belief_function_generator, the masses are greater than zero and sum to one
+    masses = np.random.dirichlet([1 for j in range(len(subsets))])
+
+    return dict(zip(subsets, masses))
+
 def powerset(full_set):
     """
     Generates the powerset (list of all subsets) of a given iterable.
@@ -131,11 +153,8 @@ def powerset(full_set):
     return combinations
 
 def lorenz_vector(x):
+    """
+    Cumulative sums of the components of x in increasing order (see evaluation.lorenz_vectors for a batch).
+    """
 
-    sorted_x = sorted(x)
-
-    lorenz = []
-    for i in range(len(x)):
-        lorenz.append(sum(sorted_x[:i+1]))
-
-    return lorenz
\ No newline at end of file
+    return np.cumsum(np.sort(x))
\ No newline at end of file